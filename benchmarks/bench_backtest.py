@@ -0,0 +1,71 @@
+# bench_backtest.py
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_backtest [--tickers 500] [--days 2500] [--repeat 5]
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import make_price_panel
+from functions.computing import compute_momentum, compute_signal_returns
+from functions.signals import generate_signals_momentum
+from functions.trading import track_strategy_chosen_signals
+
+def best_of(repeat, func, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def relative(reference_seconds, seconds):
+    ratio = reference_seconds / seconds
+    return f"{ratio:,.1f}x faster" if ratio >= 1 else f"{1 / ratio:,.1f}x slower"
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the fused backtest against the original pandas path.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    # Some missing prices, so the availability masks matter
+    prices = prices.mask(np.random.default_rng(1).random(prices.shape) < 0.02)
+    spy = make_price_panel(n_tickers=1, n_days=args.days, seed=1).iloc[:, 0]
+    signals = generate_signals_momentum(compute_momentum(prices, window=63), threshold=0.10)
+    print(f"Panel: {args.tickers} tickers x {args.days} days")
+
+    expected = reference.track_strategy_chosen_signals(prices, signals, spy)
+    timings = {"reference": best_of(args.repeat, reference.track_strategy_chosen_signals, prices, signals, spy)}
+    for backend in ("numpy", "numba"):
+        try:
+            result = track_strategy_chosen_signals(prices, signals, spy, backend=backend)
+        except ImportError as e:
+            print(f"  Skipping {backend}: {e}")
+            continue
+        pd.testing.assert_frame_equal(result, expected, rtol=1e-10)
+        timings[backend] = best_of(args.repeat, track_strategy_chosen_signals, prices, signals, spy, backend=backend)
+    print("Output matches the original track_strategy_chosen_signals.")
+
+    print("track_strategy_chosen_signals:")
+    for name, seconds in timings.items():
+        line = f"  {name:<10} {seconds * 1000:10.1f} ms"
+        if name != "reference":
+            line += f"   ({relative(timings['reference'], seconds)})"
+        print(line)
+
+    pd.testing.assert_series_equal(compute_signal_returns(prices, signals), reference.compute_signal_returns(prices, signals))
+    old = best_of(args.repeat, reference.compute_signal_returns, prices, signals)
+    new = best_of(args.repeat, compute_signal_returns, prices, signals)
+    print("compute_signal_returns:")
+    print(f"  reference  {old * 1000:10.1f} ms")
+    print(f"  current    {new * 1000:10.1f} ms   ({relative(old, new)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_memo.py
+#
+# Cold run vs. cached rerun vs. rerun with a changed stop_loss_pct through MemoizedPipeline.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_memo [--tickers 100] [--days 2500]
+
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_price_panel
+from functions.memo import MemoizedPipeline
+
+def run_pipeline(pipeline, prices, spy, stop_loss_pct):
+    momentum_df = pipeline.compute_momentum(prices, window=63)
+    zscore_df = pipeline.compute_mean_reversion(prices, window=20)
+    momentum_signals = pipeline.generate_signals_momentum(momentum_df, threshold=0.10)
+    meanrev_signals = pipeline.generate_signals_meanreversion(zscore_df, z_entry=1.0)
+    label = pipeline.build_strategy_choice_label(
+        pipeline.compute_signal_returns(prices, momentum_signals),
+        pipeline.compute_signal_returns(prices, meanrev_signals),
+    )
+    features = pipeline.build_feature_matrix(prices, momentum_df, zscore_df, vol_window=20)
+    clf = pipeline.train_strategy_chooser(features, label, verbose=False, mode='hgb')
+    signals = pipeline.generate_final_signal(clf, features, momentum_signals, meanrev_signals)
+    final_signals = pipeline.apply_stop_loss(signals, prices, stop_loss_pct=stop_loss_pct)
+    return pipeline.track_strategy_chosen_signals(prices, final_signals, spy)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the memoized pipeline cold, cached and after a parameter change.")
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=2500)
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0, nan_fraction=0.01)
+    spy = make_price_panel(n_tickers=1, n_days=args.days, seed=1).iloc[:, 0]
+    print(f"Panel: {args.tickers} tickers x {args.days} days")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = {}
+        for name, stop_loss_pct in (("cold", 0.05), ("cached rerun", 0.05), ("stop_loss_pct changed", 0.03)):
+            # A new pipeline each time, like a restarted notebook kernel
+            pipeline = MemoizedPipeline(cache_dir)
+            start = time.perf_counter()
+            results[name] = run_pipeline(pipeline, prices, spy, stop_loss_pct)
+            seconds = time.perf_counter() - start
+            print(f"  {name:<22} {seconds * 1000:10.1f} ms   ({pipeline.cache.hits} hits, {pipeline.cache.misses} misses)")
+        print(f"  cache size {pipeline.cache.size() / 1e6:.1f} MB")
+
+    pd.testing.assert_frame_equal(results["cold"], results["cached rerun"])
+    print("Cached rerun matches the cold run.")
+
+if __name__ == "__main__":
+    main()
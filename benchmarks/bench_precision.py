@@ -0,0 +1,133 @@
+# bench_precision.py
+#
+# float32 vs. float64 panels (see the dtype policy in computing.py): time and peak
+# memory of each pipeline stage, and the float32 results checked against float64
+# within the tolerances below.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_precision [--tickers 500] [--days 5000]
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import make_price_panel
+from functions.computing import as_panel_dtype, compute_mean_reversion, compute_momentum, compute_signal_returns
+from functions.risk_management import apply_stop_loss
+from functions.signals import generate_final_signal, generate_signals_meanreversion, generate_signals_momentum
+from functions.trading import build_feature_matrix, build_strategy_choice_label, track_strategy_chosen_signals
+from functions.training import train_strategy_chooser
+
+PARAMS = dict(momentum_window=63, z_window=20, vol_window=20, threshold=0.10, z_entry=1.0, stop_loss_pct=0.05)
+
+# float32 results vs. float64, as max |float32 - float64| / (atol + rtol * |float64|) <= 1.
+# float32 prices carry a relative rounding error of ~6e-8; a z-score divides it by the
+# rolling std, hence its looser absolute tolerance.
+TOLERANCES = {
+    'momentum': dict(rtol=1e-5, atol=1e-6),
+    'zscore': dict(rtol=1e-4, atol=1e-4),
+    'features': dict(rtol=1e-4, atol=1e-6),
+    'signal_returns': dict(rtol=1e-4, atol=1e-7),
+    'backtest': dict(rtol=1e-5, atol=0.0),
+}
+
+def run_stages(prices, spy, clf):
+    """
+    Runs the pipeline stage by stage; returns ({stage: output}, {stage: (seconds, peak bytes)}).
+    """
+    outputs, stats = {}, {}
+
+    def stage(name, fn):
+        tracemalloc.start()
+        start = time.perf_counter()
+        outputs[name] = fn()
+        stats[name] = (time.perf_counter() - start, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    stage('momentum', lambda: compute_momentum(prices, window=PARAMS['momentum_window']))
+    stage('zscore', lambda: compute_mean_reversion(prices, window=PARAMS['z_window']))
+    stage('features', lambda: build_feature_matrix(prices, outputs['momentum'], outputs['zscore'],
+                                                   vol_window=PARAMS['vol_window']))
+    stage('momentum_signals', lambda: generate_signals_momentum(outputs['momentum'], threshold=PARAMS['threshold']))
+    stage('meanrev_signals', lambda: generate_signals_meanreversion(outputs['zscore'], z_entry=PARAMS['z_entry']))
+    stage('signal_returns', lambda: compute_signal_returns(prices, outputs['momentum_signals']))
+    stage('final_signals', lambda: apply_stop_loss(
+        generate_final_signal(clf, outputs['features'], outputs['momentum_signals'], outputs['meanrev_signals']),
+        prices, stop_loss_pct=PARAMS['stop_loss_pct']))
+    stage('backtest', lambda: track_strategy_chosen_signals(prices, outputs['final_signals'], spy))
+    return outputs, stats
+
+def worst_error(result, expected, rtol, atol):
+    # Largest tolerance-scaled error over the cells finite in both
+    result = np.asarray(result, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    finite = np.isfinite(result) & np.isfinite(expected)
+    if not finite.any():
+        return 0.0
+    return float((np.abs(result - expected) / (atol + rtol * np.abs(expected)))[finite].max())
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float32 and float64 panels through the pipeline.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=5000)
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0, nan_fraction=0.01)
+    spy = make_price_panel(n_tickers=1, n_days=args.days, seed=1).iloc[:, 0]
+
+    # One chooser, trained on an independent float64 panel, for both precisions
+    train = make_price_panel(n_tickers=min(args.tickers, 100), n_days=2500, seed=7)
+    momentum_df = compute_momentum(train, window=PARAMS['momentum_window'])
+    zscore_df = compute_mean_reversion(train, window=PARAMS['z_window'])
+    label = build_strategy_choice_label(
+        compute_signal_returns(train, generate_signals_momentum(momentum_df, threshold=PARAMS['threshold'])),
+        compute_signal_returns(train, generate_signals_meanreversion(zscore_df, z_entry=PARAMS['z_entry'])),
+    )
+    features = build_feature_matrix(train, momentum_df, zscore_df, vol_window=PARAMS['vol_window'])
+    clf = train_strategy_chooser(features, label, verbose=False, mode='hgb')
+
+    print(f"Panel: {args.tickers} tickers x {args.days} days\n")
+    out64, stats64 = run_stages(prices, spy, clf)
+    out32, stats32 = run_stages(as_panel_dtype(prices, np.float32), spy, clf)
+
+    print(f"  {'stage':<18} {'float64':>10} {'float32':>10}   {'peak float64':>13} {'peak float32':>13}")
+    for name in stats64:
+        (t64, m64), (t32, m32) = stats64[name], stats32[name]
+        print(f"  {name:<18} {t64 * 1000:8.1f}ms {t32 * 1000:8.1f}ms   {m64 / 1e6:10.1f} MB {m32 / 1e6:10.1f} MB")
+    total64 = sum(t for t, _ in stats64.values())
+    total32 = sum(t for t, _ in stats32.values())
+    print(f"  {'total':<18} {total64 * 1000:8.1f}ms {total32 * 1000:8.1f}ms")
+
+    # Accuracy: indicators and returns directly; the backtest on the float64 signals,
+    # so that threshold flips (reported separately) do not enter its tolerance
+    backtest32 = track_strategy_chosen_signals(as_panel_dtype(prices, np.float32), out64['final_signals'], spy)
+    compared = {
+        'momentum': (out32['momentum'], out64['momentum']),
+        'zscore': (out32['zscore'], out64['zscore']),
+        'features': (out32['features'], out64['features']),
+        'signal_returns': (out32['signal_returns'], out64['signal_returns']),
+        'backtest': (backtest32, out64['backtest']),
+    }
+    print("\n  float32 vs float64 (error / tolerance, must be <= 1):")
+    failed = []
+    for name, (result, expected) in compared.items():
+        error = worst_error(result, expected, **TOLERANCES[name])
+        print(f"    {name:<16} {error:8.3f}   {TOLERANCES[name]}")
+        if error > 1:
+            failed.append(name)
+
+    for name in ('momentum_signals', 'meanrev_signals', 'final_signals'):
+        flipped = (out32[name].to_numpy() != out64[name].to_numpy()).mean()
+        print(f"    {name:<16} {flipped:8.2e} of cells differ (values at a threshold)")
+    end64 = out64['backtest']['Strategy'].iloc[-1]
+    end32 = out32['backtest']['Strategy'].iloc[-1]
+    print(f"    end-to-end final strategy value: {end64:.2f} (float64) vs {end32:.2f} (float32)")
+
+    if failed:
+        raise SystemExit(f"float32 results outside tolerance: {', '.join(failed)}")
+    print("\nfloat32 results are within tolerance of float64.")
+
+if __name__ == "__main__":
+    main()
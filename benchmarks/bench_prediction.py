@@ -0,0 +1,86 @@
+# bench_prediction.py
+#
+# Per-consumer model calls (generate_final_signal hard/soft + count_strategy_choices)
+# vs. one cached batched predict_proba shared through ChooserPredictions, and the peak
+# memory of chunked prediction.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_prediction [--tickers 100] [--days 5000] [--chunk 1000]
+
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import make_price_panel
+from functions.analysis import count_strategy_choices
+from functions.computing import compute_mean_reversion, compute_momentum, compute_signal_returns
+from functions.prediction import ChooserPredictions
+from functions.signals import generate_final_signal, generate_signals_meanreversion, generate_signals_momentum
+from functions.trading import build_feature_matrix, build_strategy_choice_label
+from functions.training import train_strategy_chooser
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-consumer predictions with the shared prediction cache.")
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=1000, help="Rows per predict_proba call for the chunked run.")
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0, nan_fraction=0.01)
+    momentum_df = compute_momentum(prices, window=63)
+    zscore_df = compute_mean_reversion(prices, window=20)
+    momentum_signals = generate_signals_momentum(momentum_df, threshold=0.10)
+    meanrev_signals = generate_signals_meanreversion(zscore_df, z_entry=1.0)
+    label = build_strategy_choice_label(
+        compute_signal_returns(prices, momentum_signals),
+        compute_signal_returns(prices, meanrev_signals),
+    )
+    features = build_feature_matrix(prices, momentum_df, zscore_df, vol_window=20)
+    clf = train_strategy_chooser(features, label, verbose=False, mode='grid')
+    print(f"Panel: {args.tickers} tickers x {args.days} days, {type(clf).__name__} chooser\n")
+
+    def per_consumer():
+        # What each consumer did before: its own predict / predict_proba on its own copy
+        X = features.loc[momentum_signals.index].ffill().replace({None: 0})
+        hard = clf.predict(X)
+        soft = clf.predict_proba(X)
+        counts = reference.count_strategy_choices(clf, features)
+        return hard, soft, counts
+
+    def shared(chooser):
+        with contextlib.redirect_stdout(io.StringIO()):
+            signals = generate_final_signal(chooser, features, momentum_signals, meanrev_signals)
+            soft = generate_final_signal(chooser, features, momentum_signals, meanrev_signals, mode='soft')
+            return signals, count_strategy_choices(chooser, features), soft
+
+    (_, _, expected_counts), t_old, peak_old = measure(per_consumer)
+    expected = reference.generate_final_signal(clf, features, momentum_signals, meanrev_signals)
+    (signals, counts, _), t_new, peak_new = measure(lambda: shared(ChooserPredictions(clf)))
+    (chunked, chunked_counts, _), t_chunked, peak_chunked = measure(
+        lambda: shared(ChooserPredictions(clf, chunk_size=args.chunk)))
+
+    print(f"  per-consumer (hard + soft + counts)  {t_old * 1000:9.1f} ms   peak {peak_old / 1e6:8.1f} MB")
+    print(f"  shared cache (hard + soft + counts)  {t_new * 1000:9.1f} ms   peak {peak_new / 1e6:8.1f} MB")
+    print(f"  shared cache, chunks of {args.chunk:<6}       {t_chunked * 1000:9.1f} ms   peak {peak_chunked / 1e6:8.1f} MB")
+
+    pd.testing.assert_frame_equal(signals, expected.astype(signals.dtypes))
+    pd.testing.assert_frame_equal(chunked, signals)
+    assert tuple(map(int, counts)) == tuple(map(int, expected_counts)) == tuple(map(int, chunked_counts))
+    print("\nSignals and choice counts match the per-consumer predictions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# bench_price_store.py
+#
+# Load times of the price store vs. the CSV cache, and checks of the incremental top-up in
+# get_sp500_data_in_date_range against a local stub fetcher (no network).
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_price_store [--tickers 500] [--days 2500] [--sample 15]
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_price_panel
+from functions.data_collection import get_sp500_data_in_date_range
+from functions.price_store import load_price_store, migrate_csv_to_price_store
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+class StubFetcher:
+    """
+    Serves closes from a local panel like yf.download would: only bars dated before
+    'published' exist, and tickers in 'broken' come back without data (as symbols that
+    fail inside a multi-ticker download do). Records every call.
+    """
+
+    def __init__(self, panel, published):
+        self.panel = panel
+        self.published = pd.Timestamp(published)
+        self.broken = set()
+        self.calls = []
+
+    def __call__(self, tickers, start, end, interval):
+        self.calls.append((tuple(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        dates = self.panel.index
+        rows = (dates >= pd.Timestamp(start)) & (dates < min(pd.Timestamp(end), self.published))
+        return self.panel.loc[rows, [t for t in tickers if t in self.panel.columns and t not in self.broken]]
+
+def check_top_up(tmp):
+    panel = make_price_panel(n_tickers=20, n_days=300, seed=3, start="2020-06-01")
+    panel["SPY"] = make_price_panel(n_tickers=1, n_days=300, seed=4, start="2020-06-01").iloc[:, 0]
+    composition_csv = os.path.join(tmp, "composition.csv")
+    # Last ticker joins the index after the start of the range
+    pd.DataFrame({
+        'date': ["2020-01-03", "2020-09-04"],
+        'tickers': [",".join(panel.columns[:-2]), ",".join(panel.columns[:-1])],
+    }).to_csv(composition_csv, index=False)
+
+    fetcher = StubFetcher(panel, published="2021-01-15")
+    kwargs = dict(composition_csv=composition_csv, data_csv=os.path.join(tmp, "none.csv"),
+                  fetcher=fetcher, store_path=os.path.join(tmp, "topup"))
+
+    def fetch(start, end):
+        fetcher.calls.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            return get_sp500_data_in_date_range(start, end, **kwargs)
+
+    # Initial download, with one ticker failing: it is requested again on the next call
+    fetcher.broken = {panel.columns[3]}
+    data = fetch("2020-06-01", "2020-12-01")
+    assert data[panel.columns[3]].isna().all() and panel.columns[-2] in data.columns
+    fetcher.broken = set()
+    data = fetch("2020-06-01", "2020-12-01")
+    assert fetcher.calls and all(tickers == (panel.columns[3],) for tickers, _, _ in fetcher.calls)
+    expected = panel.loc["2020-06-01":"2020-11-30", data.columns]
+    pd.testing.assert_frame_equal(data, expected, check_freq=False, check_names=False)
+    fetch("2020-06-01", "2020-12-01")
+    assert not fetcher.calls, "a fully covered range was downloaded again"
+
+    # Top-up past the published bars: the store ends at the last bar, not at end_date, so
+    # the same call picks up the bars published later
+    data = fetch("2020-06-01", "2021-02-01")
+    assert data.index[-1] < pd.Timestamp("2021-01-15")
+    fetcher.published = pd.Timestamp("2021-01-22")
+    data = fetch("2020-06-01", "2021-02-01")
+    assert fetcher.calls and all(start >= pd.Timestamp("2021-01-15") for _, start, _ in fetcher.calls)
+    expected = panel.loc["2020-06-01":"2021-01-21", data.columns]
+    pd.testing.assert_frame_equal(data, expected, check_freq=False, check_names=False)
+    print("Incremental top-up: failed tickers, late joiners and unpublished tail dates are fetched again.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare price store load times against the CSV cache.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--sample", type=int, default=15, help="Tickers loaded with column projection.")
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    sample = list(np.random.default_rng(0).choice(prices.columns, size=args.sample, replace=False))
+    print(f"Panel: {args.tickers} tickers x {args.days} days, projected sample: {args.sample} tickers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_csv = os.path.join(tmp, "prices.csv")
+        prices.to_csv(data_csv)
+
+        stores = {"npy": os.path.join(tmp, "prices")}
+        try:
+            import pyarrow  # noqa: F401
+            stores["parquet"] = os.path.join(tmp, "prices.parquet")
+        except ImportError:
+            print("pyarrow not installed, skipping the Parquet store")
+
+        for store_path in stores.values():
+            migrate_csv_to_price_store(data_csv, store_path)
+
+        timings = {
+            "csv (full)": best_of(lambda: pd.read_csv(data_csv, index_col=0, parse_dates=True)),
+            "csv (sample)": best_of(lambda: pd.read_csv(data_csv, index_col=0, parse_dates=True)[sample]),
+        }
+        for name, store_path in stores.items():
+            timings[f"{name} (full)"] = best_of(lambda: load_price_store(store_path))
+            timings[f"{name} (sample)"] = best_of(lambda: load_price_store(store_path, tickers=sample))
+        timings["npy (full, zero-copy)"] = best_of(lambda: load_price_store(stores["npy"], copy=False))
+
+        for name, seconds in timings.items():
+            print(f"  {name:<24} {seconds * 1000:10.1f} ms   ({timings['csv (full)'] / seconds:,.0f}x vs csv)")
+
+        print()
+        check_top_up(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_reports.py
+#
+# Per-ticker reports: get_trades_for_stock in a loop (curves only, no plots) vs. one
+# compute_equity_curves pass + a single trade-log groupby, and the time to export every
+# ticker's figure and tables with export_ticker_reports, serial vs. parallel.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_reports [--tickers 500] [--days 2500] [--n-jobs -1] [--no-figures]
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_price_panel
+from functions.analysis import (
+    build_trade_log,
+    compute_equity_curves,
+    export_ticker_reports,
+    get_trades_for_stock,
+    group_trades_by_ticker,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-ticker and batch equity curve reports.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Processes for the parallel export.")
+    parser.add_argument("--no-figures", action="store_true", help="Only export tables.")
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0, nan_fraction=0.01)
+    rng = np.random.default_rng(1)
+    # Persistent positions: each day keeps the previous signal with probability 0.95
+    changes = rng.random(prices.shape) < 0.05
+    draws = rng.integers(-1, 2, size=prices.shape)
+    signals = pd.DataFrame(np.where(changes, draws, np.nan), index=prices.index, columns=prices.columns)
+    signals = signals.ffill().fillna(0).astype(np.int8)
+    trade_log = build_trade_log(signals, prices)
+    print(f"Panel: {args.tickers} tickers x {args.days} days, {len(trade_log)} trades\n")
+
+    start = time.perf_counter()
+    per_ticker = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ticker in prices.columns:
+            per_ticker[ticker] = get_trades_for_stock(trade_log, signals, prices, ticker, plot=False)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    strategy, buy_hold = compute_equity_curves(signals, prices)
+    trades_by_ticker = group_trades_by_ticker(trade_log)
+    t_batch = time.perf_counter() - start
+
+    print(f"  get_trades_for_stock loop          {t_loop * 1000:10.1f} ms")
+    print(f"  compute_equity_curves + groupby    {t_batch * 1000:10.1f} ms   ({t_loop / t_batch:.0f}x)")
+
+    for ticker, (trades, equity_curve, buy_hold_equity) in per_ticker.items():
+        pd.testing.assert_series_equal(strategy[ticker], equity_curve, check_names=False)
+        pd.testing.assert_series_equal(buy_hold[ticker], buy_hold_equity, check_names=False)
+        assert len(trades_by_ticker[ticker]) == len(trades)
+
+    for n_jobs in (1, args.n_jobs):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            export_ticker_reports(trade_log, signals, prices, output_dir, figures=not args.no_figures, n_jobs=n_jobs)
+            print(f"  export_ticker_reports n_jobs={n_jobs:<3}    {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    print("\nBatch curves and trade groups match the per-ticker results.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_shared_panel.py
+#
+# Compares worker memory when the simulation universe is pickled into every
+# worker vs. mapped from a SharedPanel.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_shared_panel [--tickers 500] [--days 2500] [--workers 1 2 4]
+
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import make_price_panel
+from functions.computing import compute_signal_returns
+from functions.shared_panel import SharedPanel
+from functions.simulation import precompute_universe
+
+_universe = None
+
+def _init_pickled(universe):
+    global _universe
+    _universe = universe
+
+def _init_shared(handle):
+    global _universe
+    panel = SharedPanel.attach(handle)
+    _universe = {name: panel.frame(name) for name in panel.names}
+
+def _init_idle():
+    pass
+
+def _memory_mb():
+    # Linux only: private (anonymous) and peak resident memory of this process
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "VmHWM"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields["RssAnon"], fields["VmHWM"]
+
+def _sample_task(seed):
+    # Touch one 15-ticker sample the way a simulation does, then report memory
+    if _universe is not None:
+        prices = _universe['prices']
+        tickers = list(np.random.default_rng(seed).choice(prices.columns, size=15, replace=False))
+        compute_signal_returns(prices[tickers], _universe['momentum_signals'][tickers],
+                               daily_returns=_universe['daily_returns'][tickers])
+    return _memory_mb()
+
+def worker_memory(n_workers, initializer, initargs=()):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                             initializer=initializer, initargs=initargs) as executor:
+        # One task per worker so every worker reports once
+        return list(executor.map(_sample_task, range(n_workers), chunksize=1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker memory: pickled universe vs. SharedPanel.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    data_all = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    data_all = data_all.rename(columns={data_all.columns[-1]: "SPY"})
+    universe = precompute_universe(data_all)
+    matrices = {name: frame for name, frame in universe.items() if name != "benchmark"}
+    panel_mb = sum(frame.memory_usage(index=False).sum() for frame in matrices.values()) / 1e6
+    print(f"Universe: {args.tickers} tickers x {args.days} days, {len(matrices)} matrices, {panel_mb:.0f} MB")
+
+    idle_private, idle_peak = worker_memory(1, _init_idle)[0]
+    print(f"Idle worker: {idle_private:.0f} MB private, {idle_peak:.0f} MB peak RSS (subtracted below)")
+    print("Totals over all workers, in MB:\n")
+    print(f"  {'workers':>7} {'pickled private':>16} {'pickled peak':>13} {'shared private':>15} {'shared peak':>12}")
+
+    with SharedPanel.create(matrices) as panel:
+        for n_workers in args.workers:
+            row = []
+            for initializer, initargs in ((_init_pickled, (matrices,)), (_init_shared, (panel.handle,))):
+                memory = worker_memory(n_workers, initializer, initargs)
+                row.append(sum(private - idle_private for private, _ in memory))
+                row.append(sum(peak - idle_peak for _, peak in memory))
+            print(f"  {n_workers:>7} {row[0]:>16.0f} {row[1]:>13.0f} {row[2]:>15.0f} {row[3]:>12.0f}")
+
+if __name__ == "__main__":
+    main()
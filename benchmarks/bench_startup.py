@@ -0,0 +1,83 @@
+# bench_startup.py
+#
+# Cold-start cost of the functions package: import time of each module in a fresh
+# interpreter (and which heavy dependencies it loads), and time-to-first-signal for a
+# script that only needs computing and signals.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_startup [--repeat 5]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = [
+    'computing', 'signals', 'trading', 'risk_management', 'training', 'walk_forward',
+    'analysis', 'data_collection', 'simulation', 'memo',
+]
+
+HEAVY = ['sklearn', 'yfinance', 'matplotlib', 'numba', 'joblib']
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import functions.{module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# A minimal signal job: 20 tickers x 500 days of prices to momentum/mean-reversion signals
+FIRST_SIGNAL_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import numpy as np
+import pandas as pd
+from functions.computing import compute_mean_reversion, compute_momentum
+from functions.signals import generate_signals_meanreversion, generate_signals_momentum
+imported = time.perf_counter()
+rng = np.random.default_rng(0)
+prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, 20)), axis=0)),
+                      index=pd.bdate_range("2020-01-01", periods=500))
+momentum_signals = generate_signals_momentum(compute_momentum(prices, window=63), threshold=0.10)
+meanrev_signals = generate_signals_meanreversion(compute_mean_reversion(prices, window=20), z_entry=1.0)
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'signal': done - start,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_script(script):
+    """
+    Runs 'script' in a fresh interpreter from the repo root. Returns its JSON output and
+    the wall time including interpreter startup.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    return json.loads(out.stdout.strip().splitlines()[-1]), wall
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and time-to-first-signal of the functions package.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (median reported).")
+    args = parser.parse_args()
+
+    print("Cold import (median of fresh interpreters):")
+    for module in MODULES:
+        runs = [run_script(IMPORT_SCRIPT.format(module=module, heavy=HEAVY))[0] for _ in range(args.repeat)]
+        seconds = statistics.median(r['seconds'] for r in runs)
+        loaded = ", ".join(runs[-1]['loaded']) or "-"
+        print(f"  functions.{module:<18} {seconds * 1000:8.1f} ms   heavy deps loaded: {loaded}")
+
+    runs = [run_script(FIRST_SIGNAL_SCRIPT.format(heavy=HEAVY)) for _ in range(args.repeat)]
+    print("\nTime to first signal (computing + signals only):")
+    print(f"  imports            {statistics.median(r['import'] for r, _ in runs) * 1000:8.1f} ms")
+    print(f"  first signal       {statistics.median(r['signal'] for r, _ in runs) * 1000:8.1f} ms")
+    print(f"  process wall time  {statistics.median(w for _, w in runs) * 1000:8.1f} ms")
+    print(f"  heavy deps loaded: {', '.join(runs[-1][0]['loaded']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_stop_loss.py
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_stop_loss [--tickers 500] [--days 2500] [--skip-reference]
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import make_price_panel
+from functions.computing import compute_momentum
+from functions.risk_management import apply_stop_loss
+from functions.signals import generate_signals_momentum
+
+def main():
+    parser = argparse.ArgumentParser(description="Time apply_stop_loss against the original loop.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--stop-loss-pct", type=float, default=0.05)
+    parser.add_argument("--skip-reference", action="store_true", help="Do not time the original loop (slow).")
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    signals = generate_signals_momentum(compute_momentum(prices, window=63), threshold=0.10)
+    print(f"Panel: {args.tickers} tickers x {args.days} days")
+
+    timings = {}
+    results = {}
+    backends = ["numpy"]
+    try:
+        import numba  # noqa: F401
+        backends.append("numba")
+        apply_stop_loss(signals.iloc[:10], prices, args.stop_loss_pct, backend="numba")  # compile
+    except ImportError:
+        print("numba not installed, skipping the numba backend")
+
+    for backend in backends:
+        start = time.perf_counter()
+        results[backend] = apply_stop_loss(signals, prices, args.stop_loss_pct, backend=backend)
+        timings[backend] = time.perf_counter() - start
+
+    if not args.skip_reference:
+        start = time.perf_counter()
+        results["reference"] = reference.apply_stop_loss(signals, prices, args.stop_loss_pct)
+        timings["reference"] = time.perf_counter() - start
+
+        for backend in backends:
+            pd.testing.assert_frame_equal(results[backend], results["reference"])
+        print("Output identical to the original loop.")
+
+    for name, seconds in timings.items():
+        line = f"  {name:<10} {seconds:10.3f} s"
+        if "reference" in timings and name != "reference":
+            line += f"   ({timings['reference'] / seconds:,.0f}x faster)"
+        print(line)
+
+if __name__ == "__main__":
+    main()
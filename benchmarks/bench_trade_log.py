@@ -0,0 +1,51 @@
+# bench_trade_log.py
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_trade_log [--tickers 500] [--days 2500] [--skip-reference]
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import make_price_panel
+from functions.analysis import build_trade_log
+from functions.computing import compute_momentum
+from functions.signals import generate_signals_momentum
+
+def main():
+    parser = argparse.ArgumentParser(description="Time build_trade_log against the original loop.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--skip-reference", action="store_true", help="Do not time the original loop (slow).")
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    signals = generate_signals_momentum(compute_momentum(prices, window=63), threshold=0.10)
+    print(f"Panel: {args.tickers} tickers x {args.days} days")
+
+    timings = {}
+    for action_dtype in ("str", "category", "int8"):
+        start = time.perf_counter()
+        trade_log = build_trade_log(signals, prices, action_dtype=action_dtype)
+        timings[action_dtype] = time.perf_counter() - start
+        memory_mb = trade_log.memory_usage(deep=True).sum() / 1e6
+        print(f"  Action as {action_dtype:<8}: {len(trade_log)} rows, {memory_mb:.2f} MB")
+
+    if not args.skip_reference:
+        start = time.perf_counter()
+        expected = reference.build_trade_log(signals, prices)
+        timings["reference"] = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(build_trade_log(signals, prices), expected)
+        print("Output identical to the original loop.")
+
+    for name, seconds in timings.items():
+        line = f"  {name:<10} {seconds:10.3f} s"
+        if "reference" in timings and name != "reference":
+            line += f"   ({timings['reference'] / seconds:,.0f}x faster)"
+        print(line)
+
+if __name__ == "__main__":
+    main()
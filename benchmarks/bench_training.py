@@ -0,0 +1,55 @@
+# bench_training.py
+#
+# Wall time vs. CV score for each train_strategy_chooser mode, plus a model-cache hit.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_training [--tickers 15] [--days 2500] [--n-jobs -1]
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.synthetic import make_price_panel
+from functions.computing import compute_momentum, compute_mean_reversion, compute_signal_returns
+from functions.signals import generate_signals_momentum, generate_signals_meanreversion
+from functions.trading import build_strategy_choice_label, build_feature_matrix
+from functions.training import CHOOSER_MODES, search_strategy_chooser, train_strategy_chooser
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare strategy-chooser training modes.")
+    parser.add_argument("--tickers", type=int, default=15)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0)
+    momentum_df = compute_momentum(prices, window=63)
+    zscore_df = compute_mean_reversion(prices, window=20)
+    momentum_signals = generate_signals_momentum(momentum_df, threshold=0.10)
+    meanrev_signals = generate_signals_meanreversion(zscore_df, z_entry=1.0)
+    label = build_strategy_choice_label(
+        compute_signal_returns(prices, momentum_signals),
+        compute_signal_returns(prices, meanrev_signals),
+    )
+    features = build_feature_matrix(prices, momentum_df, zscore_df, vol_window=20)
+
+    X, y = features.align(label, join='inner', axis=0)
+    X = X.dropna()
+    y = y.loc[X.index]
+    print(f"Training rows: {len(X)} ({args.tickers} tickers x {args.days} days)\n")
+
+    print(f"  {'mode':<12} {'time (s)':>9} {'CV score':>9}  best params")
+    for mode in CHOOSER_MODES:
+        start = time.perf_counter()
+        _, best_params, best_score = search_strategy_chooser(X, y, mode=mode, n_jobs=args.n_jobs)
+        seconds = time.perf_counter() - start
+        print(f"  {mode:<12} {seconds:>9.2f} {best_score:>9.4f}  {best_params}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        train_strategy_chooser(features, label, n_jobs=args.n_jobs, verbose=False, mode='grid', cache_dir=cache_dir)
+        start = time.perf_counter()
+        train_strategy_chooser(features, label, n_jobs=args.n_jobs, verbose=False, mode='grid', cache_dir=cache_dir)
+        print(f"\n  cached rerun: {time.perf_counter() - start:.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_universe.py
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_universe [--tickers 1000] [--snapshots 1500] [--days 2500] [--lookups 200]
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import reference
+from benchmarks.synthetic import make_composition, make_price_panel
+from functions.universe import UniverseIndex
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare point-in-time universe lookups against re-parsing the composition CSV.")
+    parser.add_argument("--tickers", type=int, default=1000, help="Size of the ticker pool (about 80% are members).")
+    parser.add_argument("--snapshots", type=int, default=1500)
+    parser.add_argument("--days", type=int, default=2500, help="Dates in the panel to build a membership mask for.")
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    prices = make_price_panel(n_tickers=args.tickers, n_days=args.days, seed=0, start="2010-01-01")
+    composition = make_composition(prices.columns, n_snapshots=args.snapshots, seed=0)
+    rng = np.random.default_rng(0)
+    lookup_dates = rng.choice(prices.index, size=args.lookups)
+    print(f"Composition: {args.snapshots} snapshots over {args.tickers} tickers, panel: {args.days} days")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        composition_csv = os.path.join(tmp, "composition.csv")
+        composition.to_csv(composition_csv, index=False)
+
+        index = UniverseIndex.from_csv(composition_csv)
+        for date in lookup_dates[:20]:
+            assert (index.snapshot_date(date), index.members(date)) == reference.get_sp500_composition(composition_csv, date)
+
+        # Reference mask: one snapshot lookup per panel date
+        mask = index.member_mask(prices.index, prices.columns)
+        for i in rng.choice(len(prices.index), size=20):
+            _, members = reference.get_sp500_composition(composition_csv, prices.index[i])
+            assert np.array_equal(mask[i], prices.columns.isin(members))
+        print("Lookups and masks match the original get_sp500_composition.")
+
+        n_ref = min(args.lookups, 20)
+        t_ref = best_of(lambda: [reference.get_sp500_composition(composition_csv, d) for d in lookup_dates[:n_ref]], repeat=1) / n_ref
+        t_build = best_of(lambda: UniverseIndex.from_csv(composition_csv))
+        t_members = best_of(lambda: [index.members(d) for d in lookup_dates]) / args.lookups
+        t_mask = best_of(lambda: index.member_mask(prices.index, prices.columns))
+
+    print(f"  re-parse CSV per lookup   {t_ref * 1000:10.2f} ms / lookup")
+    print(f"  build UniverseIndex       {t_build * 1000:10.2f} ms (once)")
+    print(f"  UniverseIndex.members     {t_members * 1000:10.3f} ms / lookup   ({t_ref / t_members:,.0f}x faster)")
+    print(f"  member_mask for panel     {t_mask * 1000:10.2f} ms for {args.days} x {args.tickers}")
+
+if __name__ == "__main__":
+    main()
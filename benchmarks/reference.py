@@ -0,0 +1,275 @@
+# reference.py
+#
+# The original loop-based implementations, kept only so the benchmarks can
+# check the fast paths against them and time the speedup.
+
+import numpy as np
+import pandas as pd
+
+def apply_stop_loss(final_signals, price_data, stop_loss_pct=0.05):
+    """
+    Applies a daily stop-loss rule to the existing final_signals:
+      - If a long position loses more than stop_loss_pct, we close it that day (signal=0).
+      - If a short position loses more than stop_loss_pct, we close it that day (signal=0).
+    
+    final_signals : DataFrame of {-1,0,+1}, index=dates, columns=tickers
+    price_data    : DataFrame of prices, same shape or superset
+    stop_loss_pct : e.g. 0.05 for 5% max adverse move
+    
+    Returns a modified copy of final_signals with stop-loss enforced.
+    """
+    signals_sl = final_signals.copy()
+    prices = price_data.reindex(signals_sl.index, columns=signals_sl.columns).ffill()
+
+    # Store the entry price + side for each ticker
+    entry_price = {}
+    entry_side  = {}
+
+    # Ensure dates are in ascending order
+    dates = signals_sl.index.sort_values()
+
+    for i, date in enumerate(dates):
+        row_signals = signals_sl.loc[date]
+
+        for ticker, signal in row_signals.items():
+            px = prices.at[date, ticker]
+
+            # Look at the previous day's signal for that ticker
+            if i > 0:
+                prev_signal = signals_sl[ticker].iloc[i-1]
+            else:
+                prev_signal = 0
+
+            # Check if a new position was opened today
+            if signal != 0 and prev_signal == 0:
+                # record entry
+                entry_price[ticker] = px
+                entry_side[ticker]  = signal
+
+            # If we are still in a position, check stop-loss
+            if signal != 0:
+                side = entry_side.get(ticker, signal)
+                ep   = entry_price.get(ticker, px)
+
+                # If we're long, and px <= ep*(1 - stop_loss_pct), close
+                if side == 1 and px <= ep * (1 - stop_loss_pct):
+                    signals_sl.at[date, ticker] = 0
+                # If we're short, and px >= ep*(1 + stop_loss_pct), close
+                elif side == -1 and px >= ep * (1 + stop_loss_pct):
+                    signals_sl.at[date, ticker] = 0
+
+            # If signal == 0, that means we’re not holding a position now
+            # so next day, if we reopen, new entry price will be recorded.
+    
+    return signals_sl
+
+def build_trade_log(final_signals, price_data):
+    """
+    Creates a simplified "trade log" showing each time a position is opened or closed.
+    
+    final_signals: DataFrame of signals in {-1, 0, +1} (index=dates, columns=tickers)
+    price_data:    DataFrame of prices for each ticker (same shape or superset of final_signals)
+    
+    Returns a DataFrame with columns:
+      - Date
+      - Ticker
+      - Action ("OPEN_LONG", "CLOSE_LONG", "OPEN_SHORT", "CLOSE_SHORT")
+      - Price
+    """
+    # Ensure the price_data covers the same date range
+    price_data = price_data.loc[final_signals.index, final_signals.columns].ffill()
+
+    # Shift signals by 1 day to compare changes
+    prev_signals = final_signals.shift(1).fillna(0)
+
+    logs = []
+    for date in final_signals.index:
+        for ticker in final_signals.columns:
+            current_signal = final_signals.at[date, ticker]
+            previous_signal = prev_signals.at[date, ticker]
+
+            # If no change, skip
+            if current_signal == previous_signal:
+                continue
+
+            # Check transitions
+            # e.g. 0 -> +1 means "OPEN_LONG"
+            if previous_signal == 0 and current_signal == +1:
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'OPEN_LONG',
+                    'Price': price_data.at[date, ticker]
+                })
+            elif previous_signal == +1 and current_signal == 0:
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'CLOSE_LONG',
+                    'Price': price_data.at[date, ticker]
+                })
+            elif previous_signal == 0 and current_signal == -1:
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'OPEN_SHORT',
+                    'Price': price_data.at[date, ticker]
+                })
+            elif previous_signal == -1 and current_signal == 0:
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'CLOSE_SHORT',
+                    'Price': price_data.at[date, ticker]
+                })
+            # flips from +1 to -1 directly
+            elif previous_signal == +1 and current_signal == -1:
+                # close the long and open the short
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'CLOSE_LONG',
+                    'Price': price_data.at[date, ticker]
+                })
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'OPEN_SHORT',
+                    'Price': price_data.at[date, ticker]
+                })
+            elif previous_signal == -1 and current_signal == +1:
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'CLOSE_SHORT',
+                    'Price': price_data.at[date, ticker]
+                })
+                logs.append({
+                    'Date': date,
+                    'Ticker': ticker,
+                    'Action': 'OPEN_LONG',
+                    'Price': price_data.at[date, ticker]
+                })
+
+    trade_log_df = pd.DataFrame(logs)
+    trade_log_df.sort_values(by='Date', inplace=True)
+    trade_log_df.reset_index(drop=True, inplace=True)
+    return trade_log_df
+
+def generate_final_signal(clf, features, momentum_signals, meanrev_signals):
+    """
+    For each day, if clf predicts 1 -> use momentum_signals,
+                     if clf predicts 0 -> use meanrev_signals.
+    Returns a DataFrame with the chosen signals day by day.
+    """
+    # Predict
+    X = features.loc[momentum_signals.index]  # ensure same dates
+    # For days we have missing features, fill or drop
+    X = X.ffill().replace({None: 0})
+
+    predictions = clf.predict(X)
+
+    # Combine
+    final_signals = momentum_signals.copy()
+    for i, date in enumerate(final_signals.index):
+        if predictions[i] == 0:
+            # use mean-reversion signals for this day
+            final_signals.loc[date] = meanrev_signals.loc[date]
+        else:
+            # use momentum signals
+            final_signals.loc[date] = momentum_signals.loc[date]
+
+    return final_signals
+
+def compute_signal_returns(data, signal_df, daily_returns=None):
+    """
+    data: price DataFrame (each column is a ticker)
+    signal_df: signal DataFrame (matching index/tickers), with values in {-1,0,1}.
+    daily_returns: optional precomputed data.pct_change() (e.g. computed once for a whole
+                   universe and sliced per sample); 'data' is not used when given.
+
+    Returns a Series of "portfolio daily return" for each day,
+    assuming we equally weight all tickers that have a non-zero signal.
+    """
+    # Daily returns
+    if daily_returns is None:
+        daily_returns = data.pct_change()
+    daily_returns = daily_returns.shift(-1)  # shift(-1) so day t signal sees day t+1 return
+
+    # If signal is +1 and daily_return is r, that's +r. If -1, it's -r. If 0, it's 0.
+    # Average across "active" tickers
+    combined = (signal_df * daily_returns)
+
+    # equal-weight average of all active signals:
+    combined['sum'] = combined.sum(axis=1)
+    combined['count'] = (signal_df != 0).sum(axis=1).replace(0, np.nan)
+    combined['strategy_return'] = combined['sum'] / combined['count']
+
+    # per-day return:
+    return combined['strategy_return'].fillna(0.0)
+
+def track_strategy_chosen_signals(price_data, final_signals, spy_series, initial_capital=10000.0):
+    # Reindex to match signals without forward filling
+    price_data = price_data.reindex(final_signals.index)
+    
+    # Compute daily returns using available data only
+    daily_returns = price_data.pct_change().shift(-1)
+    daily_returns = daily_returns.fillna(0)
+    
+    # Ensure signals are only used when the corresponding price is available
+    final_signals_aligned = final_signals.where(price_data.notna(), 0)
+    
+    available_counts = price_data.notna().sum(axis=1).replace(0, np.nan)
+    strategy_daily_return = (final_signals_aligned * daily_returns).sum(axis=1) / available_counts
+    strategy_daily_return = strategy_daily_return.fillna(0)
+    
+    strategy_cumulative = (1 + strategy_daily_return).cumprod() * initial_capital
+    
+    # SPY Buy & Hold calculation remains as before
+    spy_aligned = spy_series.reindex(strategy_cumulative.index).ffill()
+    first_spy_price = spy_aligned.iloc[0]
+    spy_cumulative = (spy_aligned / first_spy_price) * initial_capital
+    
+    # For Equal Weight Buy & Hold, calculate returns only where data exists
+    daily_returns_eq = price_data.pct_change().fillna(0)
+    available_counts_eq = price_data.notna().sum(axis=1).replace(0, np.nan)
+    equal_weight_daily_return = daily_returns_eq.sum(axis=1) / available_counts_eq
+    equal_weight_daily_return = equal_weight_daily_return.fillna(0)
+    equal_weight_buy_hold = (1 + equal_weight_daily_return).cumprod() * initial_capital
+    
+    result_df = pd.DataFrame({
+        'Strategy': strategy_cumulative,
+        'SPY_BuyHold': spy_cumulative,
+        'EqualWeight_BuyHold': equal_weight_buy_hold
+    }, index=strategy_cumulative.index)
+    
+    return result_df
+
+def get_sp500_composition(composition_csv, date):
+    """
+    Returns (composition_date, tickers) for the last S&P 500 composition row at or before 'date'.
+    """
+    # Read the S&P 500 composition CSV.
+    composition_df = pd.read_csv(composition_csv, parse_dates=["date"])
+    composition_df.sort_values("date", inplace=True)
+
+    composition = composition_df[composition_df["date"] <= pd.to_datetime(date)].iloc[-1]
+    tickers = [t.strip() for t in composition["tickers"].split(",") if t.strip()]
+    return composition["date"], tickers
+
+def count_strategy_choices(clf, features):
+    """
+    Count how many times the classifier picks momentum (1)
+    vs. mean reversion (0), based on the 'features' DataFrame.
+    """
+
+    # Align features and drop NAs
+    X = features.dropna()
+    # Get predictions (0 = MR, 1 = Momentum)
+    predictions = clf.predict(X)
+
+    # Count how many days for each
+    n_momentum = np.sum(predictions == 1)
+    n_meanrev = np.sum(predictions == 0)
+
+    return n_momentum, n_meanrev
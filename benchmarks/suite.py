@@ -0,0 +1,304 @@
+# suite.py
+#
+# Offline benchmark suite: times every function in functions/ plus the end-to-end
+# pipeline on synthetic price panels at several scales, stores the timings as JSON
+# and compares them against an earlier run to catch regressions.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.suite [--scales small,medium] [--cases stop_loss] [--repeat 3]
+#                              [--label v1] [--compare baseline] [--threshold 1.25]
+#
+# Scales are preset names (small, medium, large, xlarge) or TICKERSxDAYS, e.g. 200x4000.
+# Results go to benchmarks/results/<label>.json; --compare takes a label or a path.
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_composition, make_price_panel
+from functions.analysis import build_trade_log, compute_equity_curves, count_strategy_choices
+from functions.computing import compute_mean_reversion, compute_momentum, compute_signal_returns, compute_stacked_signal_returns
+from functions.online import OnlineIndicatorEngine
+from functions.price_store import load_price_store, save_price_store
+from functions.prediction import ChooserPredictions
+from functions.risk_management import apply_stop_loss
+from functions.signals import compact_signals, generate_final_signal, generate_signals_meanreversion, generate_signals_momentum
+from functions.simulation import run_simulations
+from functions.sweep import build_signal_stack, run_parameter_sweep
+from functions.trading import build_feature_matrix, build_strategy_choice_label, compute_rolling_return_stats, track_strategy_chosen_signals
+from functions.training import train_strategy_chooser
+from functions.universe import UniverseIndex
+from functions.walk_forward import walk_forward_final_signal
+
+SCALES = {
+    'small': (15, 2500),
+    'medium': (100, 2500),
+    'large': (500, 5000),
+    'xlarge': (2000, 10000),
+}
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Strategy parameters used throughout (the defaults of main.ipynb)
+PARAMS = dict(momentum_window=63, threshold=0.10, z_window=20, z_entry=1.0, vol_window=20, stop_loss_pct=0.05)
+
+def parse_scale(scale):
+    """
+    Returns (name, n_tickers, n_days) for a preset name or a 'TICKERSxDAYS' string.
+    """
+    if scale in SCALES:
+        return (scale,) + SCALES[scale]
+    tickers, days = scale.lower().split('x')
+    return scale, int(tickers), int(days)
+
+def build_context(n_tickers, n_days, seed=0):
+    """
+    Synthetic prices (with NaN gaps and late listings) and every intermediate of the
+    pipeline, so each case times one function on realistic inputs.
+    """
+    prices = make_price_panel(n_tickers=n_tickers, n_days=n_days, seed=seed,
+                              nan_fraction=0.01, late_listing_fraction=0.1)
+    spy = make_price_panel(n_tickers=1, n_days=n_days, seed=seed + 1).iloc[:, 0].rename("SPY")
+
+    ctx = {'prices': prices, 'spy': spy}
+    ctx['momentum'] = compute_momentum(prices, window=PARAMS['momentum_window'])
+    ctx['zscore'] = compute_mean_reversion(prices, window=PARAMS['z_window'])
+    ctx['momentum_signals'] = generate_signals_momentum(ctx['momentum'], threshold=PARAMS['threshold'])
+    ctx['meanrev_signals'] = generate_signals_meanreversion(ctx['zscore'], z_entry=PARAMS['z_entry'])
+    ctx['momentum_returns'] = compute_signal_returns(prices, ctx['momentum_signals'])
+    ctx['meanrev_returns'] = compute_signal_returns(prices, ctx['meanrev_signals'])
+    ctx['label'] = build_strategy_choice_label(ctx['momentum_returns'], ctx['meanrev_returns'])
+    ctx['features'] = build_feature_matrix(prices, ctx['momentum'], ctx['zscore'], vol_window=PARAMS['vol_window'])
+    ctx['clf'] = train_strategy_chooser(ctx['features'], ctx['label'], verbose=False, mode='hgb')
+    ctx['signals'] = generate_final_signal(ctx['clf'], ctx['features'], ctx['momentum_signals'], ctx['meanrev_signals'])
+    ctx['final_signals'] = apply_stop_loss(ctx['signals'], prices, stop_loss_pct=PARAMS['stop_loss_pct'])
+    ctx['float_signals'] = ctx['final_signals'].astype(np.float64)
+    ctx['data_all'] = prices.assign(SPY=spy)
+    return ctx
+
+def run_pipeline(prices, spy):
+    """
+    The main.ipynb chain after the download: indicators -> signals -> label -> features ->
+    chooser -> final signals -> stop-loss -> backtest -> trade log.
+    """
+    momentum_df = compute_momentum(prices, window=PARAMS['momentum_window'])
+    zscore_df = compute_mean_reversion(prices, window=PARAMS['z_window'])
+    momentum_signals = generate_signals_momentum(momentum_df, threshold=PARAMS['threshold'])
+    meanrev_signals = generate_signals_meanreversion(zscore_df, z_entry=PARAMS['z_entry'])
+    label = build_strategy_choice_label(
+        compute_signal_returns(prices, momentum_signals),
+        compute_signal_returns(prices, meanrev_signals),
+    )
+    features = build_feature_matrix(prices, momentum_df, zscore_df, vol_window=PARAMS['vol_window'])
+    clf = train_strategy_chooser(features, label, verbose=False, mode='hgb')
+    signals = generate_final_signal(clf, features, momentum_signals, meanrev_signals)
+    final_signals = apply_stop_loss(signals, prices, stop_loss_pct=PARAMS['stop_loss_pct'])
+    result_df = track_strategy_chosen_signals(prices, final_signals, spy)
+    trade_log = build_trade_log(final_signals, prices)
+    return result_df, trade_log
+
+def _stacked_returns(ctx):
+    daily_returns = ctx['prices'].pct_change(fill_method=None).to_numpy()
+    stack = build_signal_stack(ctx['momentum'], [0.05, 0.10, 0.15], 'momentum')
+    return compute_stacked_signal_returns(daily_returns, stack)
+
+def _online_updates(ctx, n_updates=20):
+    prices = ctx['prices']
+    history, recent = prices.iloc[:-n_updates], prices.iloc[-n_updates:]
+    engine = ctx.get('online_engine')
+    if engine is None:
+        # Warm-up is not part of the timed daily cost
+        engine = ctx['online_engine'] = OnlineIndicatorEngine.from_history(history.iloc[-300:], **{
+            k: PARAMS[k] for k in ('momentum_window', 'z_window', 'vol_window', 'threshold', 'z_entry')
+        })
+    engine = copy.deepcopy(engine)
+    for date, values in zip(recent.index, recent.to_numpy(dtype=np.float64)):
+        engine.update(date, values)
+
+def _price_store_roundtrip(ctx):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'prices')
+        save_price_store(ctx['prices'], path)
+        load_price_store(path, tickers=list(ctx['prices'].columns[:15]))
+
+def _download(ctx):
+    from functions.data_collection import download_close_prices
+
+    prices = ctx['prices']
+    def local_fetcher(tickers, start, end, interval):
+        return prices[tickers]
+    download_close_prices(list(prices.columns), start=None, end=None, fetcher=local_fetcher)
+
+def _universe_mask(ctx):
+    prices = ctx['prices']
+    composition = ctx.get('composition')
+    if composition is None:
+        composition = ctx['composition'] = make_composition(prices.columns, n_snapshots=250, start=prices.index[0] - pd.Timedelta(days=7))
+    UniverseIndex.from_composition(composition).member_mask(prices.index, prices.columns)
+
+def _quiet(fn):
+    # Some helpers print; keep the suite output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+# (case name, function of the context)
+CASES = [
+    ('computing.compute_momentum', lambda c: compute_momentum(c['prices'], window=PARAMS['momentum_window'])),
+    ('computing.compute_mean_reversion', lambda c: compute_mean_reversion(c['prices'], window=PARAMS['z_window'])),
+    ('computing.compute_signal_returns', lambda c: compute_signal_returns(c['prices'], c['momentum_signals'])),
+    ('computing.compute_stacked_signal_returns', _stacked_returns),
+    ('signals.generate_signals_momentum', lambda c: generate_signals_momentum(c['momentum'], threshold=PARAMS['threshold'])),
+    ('signals.generate_signals_meanreversion', lambda c: generate_signals_meanreversion(c['zscore'], z_entry=PARAMS['z_entry'])),
+    ('signals.compact_signals', lambda c: compact_signals(c['float_signals'])),
+    # A fresh ChooserPredictions per call, so the model is evaluated rather than read from its cache
+    ('signals.generate_final_signal', lambda c: generate_final_signal(ChooserPredictions(c['clf']), c['features'], c['momentum_signals'], c['meanrev_signals'])),
+    ('trading.build_strategy_choice_label', lambda c: build_strategy_choice_label(c['momentum_returns'], c['meanrev_returns'])),
+    ('trading.compute_rolling_return_stats', lambda c: compute_rolling_return_stats(c['prices'], PARAMS['vol_window'])),
+    ('trading.build_feature_matrix', lambda c: build_feature_matrix(c['prices'], c['momentum'], c['zscore'], vol_window=PARAMS['vol_window'])),
+    ('trading.track_strategy_chosen_signals[numpy]', lambda c: track_strategy_chosen_signals(c['prices'], c['final_signals'], c['spy'])),
+    ('trading.track_strategy_chosen_signals[numba]', lambda c: track_strategy_chosen_signals(c['prices'], c['final_signals'], c['spy'], backend='numba')),
+    ('risk_management.apply_stop_loss[numpy]', lambda c: apply_stop_loss(c['signals'], c['prices'], stop_loss_pct=PARAMS['stop_loss_pct'])),
+    ('risk_management.apply_stop_loss[numba]', lambda c: apply_stop_loss(c['signals'], c['prices'], stop_loss_pct=PARAMS['stop_loss_pct'], backend='numba')),
+    ('analysis.build_trade_log', lambda c: build_trade_log(c['final_signals'], c['prices'])),
+    ('analysis.compute_equity_curves', lambda c: compute_equity_curves(c['final_signals'], c['prices'])),
+    ('analysis.count_strategy_choices', lambda c: _quiet(lambda: count_strategy_choices(ChooserPredictions(c['clf']), c['features']))),
+    ('training.train_strategy_chooser[hgb]', lambda c: train_strategy_chooser(c['features'], c['label'], verbose=False, mode='hgb')),
+    ('walk_forward.walk_forward_final_signal[hgb]', lambda c: walk_forward_final_signal(
+        c['features'], c['label'], c['momentum_signals'], c['meanrev_signals'],
+        retrain_every=252, search_mode='hgb', incremental=False)),
+    ('online.OnlineIndicatorEngine.update[20 days]', _online_updates),
+    ('sweep.run_parameter_sweep', lambda c: run_parameter_sweep(c['prices'], momentum_windows=(63, 126), thresholds=(0.05, 0.10), z_windows=(20,), z_entries=(1.0, 1.5))),
+    ('universe.UniverseIndex.member_mask', _universe_mask),
+    ('price_store.save_and_load', _price_store_roundtrip),
+    ('data_collection.download_close_prices[local]', _download),
+    ('simulation.run_simulations[2 x 15]', lambda c: run_simulations(
+        c['data_all'], n_simulations=2, sample_size=min(15, c['prices'].shape[1]), seed=0, train_mode='hgb')),
+    ('pipeline.end_to_end', lambda c: run_pipeline(c['prices'], c['spy'])),
+]
+
+def time_case(fn, ctx, repeat):
+    """
+    Best wall time of up to 'repeat' calls; cases slower than a second run once.
+    """
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        best = min(best, time.perf_counter() - start)
+        if best > 1.0:
+            break
+    return best
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': commit,
+    }
+
+def run_suite(scales, cases=None, repeat=3, log=print):
+    """
+    Times every case (optionally only those whose name contains one of 'cases') at each scale.
+    Returns a list of result dicts: scale, tickers, days, case, seconds (None if skipped), note.
+    """
+    selected = [(name, fn) for name, fn in CASES if not cases or any(c in name for c in cases)]
+    results = []
+    for scale in scales:
+        name, n_tickers, n_days = parse_scale(scale)
+        log(f"\n[{name}] {n_tickers} tickers x {n_days} days")
+        ctx = build_context(n_tickers, n_days)
+        for case, fn in selected:
+            row = {'scale': name, 'tickers': n_tickers, 'days': n_days, 'case': case, 'seconds': None, 'note': None}
+            try:
+                fn(ctx)  # warm-up: numba compilation, caches
+                row['seconds'] = time_case(fn, ctx, repeat)
+                log(f"  {case:<50} {row['seconds'] * 1000:12.2f} ms")
+            except ImportError as e:
+                row['note'] = f"skipped: {e}"
+                log(f"  {case:<50} {'skipped':>12}   ({e})")
+            results.append(row)
+    return results
+
+def save_results(results, label, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{label}.json")
+    with open(path, 'w') as f:
+        json.dump({
+            'label': label,
+            'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'environment': environment(),
+            'results': results,
+        }, f, indent=2)
+    return path
+
+def load_results(label_or_path, results_dir=RESULTS_DIR):
+    path = label_or_path if label_or_path.endswith('.json') else os.path.join(results_dir, f"{label_or_path}.json")
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(results, baseline, threshold=1.25):
+    """
+    Joins two result lists on (scale, case). Returns a DataFrame with the baseline and
+    current seconds, their ratio, and 'regression' = ratio above 'threshold'.
+    """
+    current = pd.DataFrame(results)[['scale', 'case', 'seconds']]
+    before = pd.DataFrame(baseline)[['scale', 'case', 'seconds']]
+    table = before.merge(current, on=['scale', 'case'], suffixes=('_baseline', '_current'))
+    table = table.dropna(subset=['seconds_baseline', 'seconds_current'])
+    table['ratio'] = table['seconds_current'] / table['seconds_baseline']
+    table['regression'] = table['ratio'] > threshold
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite over synthetic price panels.")
+    parser.add_argument("--scales", default="small,medium",
+                        help=f"Comma-separated presets ({', '.join(SCALES)}) or TICKERSxDAYS.")
+    parser.add_argument("--cases", default=None, help="Comma-separated substrings; only matching cases run.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--label", default=None, help="Name of the results file (default: git commit or timestamp).")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", default=None, help="Baseline results label or path to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    cases = [c.strip() for c in args.cases.split(',')] if args.cases else None
+    results = run_suite(scales, cases=cases, repeat=args.repeat)
+
+    if not args.no_save:
+        label = args.label or environment()['git_commit'] or pd.Timestamp.now().strftime('%Y%m%d-%H%M%S')
+        print(f"\nSaved {save_results(results, label, args.results_dir)}")
+
+    if args.compare:
+        baseline = load_results(args.compare, args.results_dir)
+        table = compare_results(results, baseline['results'], threshold=args.threshold)
+        print(f"\nAgainst {baseline['label']} ({baseline['environment'].get('git_commit')}):")
+        for row in table.itertuples():
+            flag = "  REGRESSION" if row.regression else ""
+            print(f"  [{row.scale}] {row.case:<50} {row.seconds_baseline * 1000:10.2f} -> {row.seconds_current * 1000:10.2f} ms"
+                  f"  ({row.ratio:5.2f}x){flag}")
+        if table['regression'].any():
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# synthetic.py
+
+import numpy as np
+import pandas as pd
+
+def make_price_panel(n_tickers=15, n_days=2500, seed=0, start="2015-01-01", nan_fraction=0.0, late_listing_fraction=0.0,
+                     freq="B"):
+    """
+    Returns a reproducible DataFrame of synthetic close prices
+    (geometric Brownian motion), index=business days, columns=tickers.
+
+    nan_fraction:          share of cells set to NaN, in gaps of 1-5 days (missing bars).
+    late_listing_fraction: share of tickers that only start trading partway through,
+                           NaN before a listing date in the first half of the panel.
+    Both default to 0, which gives a complete panel.
+    freq:                  bar frequency of the index, e.g. "5min" for intraday bars
+                           ('n_days' is then the number of bars).
+    """
+    rng = np.random.default_rng(seed)
+
+    mu    = rng.normal(0.0003, 0.0002, size=n_tickers)
+    sigma = rng.uniform(0.01, 0.03, size=n_tickers)
+    log_returns = rng.normal(mu, sigma, size=(n_days, n_tickers))
+
+    start_prices = rng.uniform(20.0, 300.0, size=n_tickers)
+    prices = start_prices * np.exp(np.cumsum(log_returns, axis=0))
+
+    if nan_fraction > 0:
+        # Gaps start at random cells and run for 1-5 days (about 3 on average)
+        starts = rng.random((n_days, n_tickers)) < nan_fraction / 3.0
+        lengths = rng.integers(1, 6, size=(n_days, n_tickers))
+        missing = np.zeros((n_days, n_tickers), dtype=bool)
+        for offset in range(5):
+            missing[offset:] |= (starts & (lengths > offset))[:n_days - offset]
+        prices[missing] = np.nan
+
+    if late_listing_fraction > 0:
+        n_late = int(round(n_tickers * late_listing_fraction))
+        late = rng.choice(n_tickers, size=n_late, replace=False)
+        listing_days = rng.integers(1, max(2, n_days // 2), size=n_late)
+        prices[:, late] = np.where(np.arange(n_days)[:, None] < listing_days, np.nan, prices[:, late])
+
+    index = pd.date_range(start=start, periods=n_days, freq=freq)
+    columns = [f"T{i:04d}" for i in range(n_tickers)]
+    return pd.DataFrame(prices, index=index, columns=columns)
+
+def make_composition(tickers, n_snapshots=500, turnover=0.01, seed=0, start="2000-01-01", freq="W-FRI"):
+    """
+    Returns a reproducible index composition DataFrame in the layout of
+    SPY_500_historical_stocks.csv (columns 'date' and comma-joined 'tickers').
+    Each snapshot swaps about 'turnover' of the members with tickers outside the index.
+    'tickers' is the full pool; about 80% of it is in the index at any time.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.asarray(tickers, dtype=object)
+    n_members = int(len(tickers) * 0.8)
+    members = rng.permutation(len(tickers))[:n_members]
+
+    rows = []
+    for date in pd.date_range(start=start, periods=n_snapshots, freq=freq):
+        rows.append({'date': date, 'tickers': ",".join(tickers[np.sort(members)])})
+        outside = np.setdiff1d(np.arange(len(tickers)), members)
+        n_swap = min(rng.binomial(n_members, turnover), len(outside))
+        if n_swap:
+            members[rng.choice(n_members, size=n_swap, replace=False)] = rng.choice(outside, size=n_swap, replace=False)
+    return pd.DataFrame(rows)
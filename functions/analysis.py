@@ -1,19 +1,69 @@
 # analysis.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+from functions.prediction import chooser_predictions
+from functions.profiling import profiled
+
+# Headless mode (set_headless): the helpers below skip their plots, and matplotlib,
+# which is only imported when a plot is drawn, is never loaded
+_headless = False
+
+def set_headless(headless=True):
+    """
+    Turns plotting off (or back on) for the analysis helpers, e.g. for scheduled batch
+    jobs and worker processes with no display. Returns the previous setting.
+    """
+    global _headless
+    previous, _headless = _headless, bool(headless)
+    return previous
+
+def _plot_equity_curves(ticker, equity_curve, buy_hold_equity=None):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(equity_curve.index, equity_curve, label=f"{ticker} Strategy")
+    if buy_hold_equity is not None:
+        plt.plot(buy_hold_equity.index, buy_hold_equity, label=f"{ticker} Buy & Hold", linestyle='--')
+    plt.title(f"Single-Ticker Strategy vs. Buy & Hold: {ticker}")
+    plt.xlabel("Date")
+    plt.ylabel("Portfolio Value ($)")
+    plt.legend()
+    plt.show()
+
+def _equity_figure(ticker, equity_curve, buy_hold_equity=None):
+    # Same chart as _plot_equity_curves, on a bare Agg canvas: no pyplot state and no
+    # display, so it can be rendered in batch jobs and worker processes
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(equity_curve.index, equity_curve, label=f"{ticker} Strategy")
+    if buy_hold_equity is not None:
+        ax.plot(buy_hold_equity.index, buy_hold_equity, label=f"{ticker} Buy & Hold", linestyle='--')
+    ax.set_title(f"Single-Ticker Strategy vs. Buy & Hold: {ticker}")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Portfolio Value ($)")
+    ax.legend()
+    return fig
+
 def count_strategy_choices(clf, features):
     """
     Count how many times the classifier picks momentum (1)
     vs. mean reversion (0), based on the 'features' DataFrame.
+    Only days with complete features are counted. Predictions come from the model's
+    shared prediction cache, so they are the same ones generate_final_signal uses.
     """
 
-    # Align features and drop NAs
-    X = features.dropna()
-    # Get predictions (0 = MR, 1 = Momentum)
-    predictions = clf.predict(X)
+    # Get predictions (0 = MR, 1 = Momentum) and keep the days without NAs
+    predictions = chooser_predictions(clf).predict(features)
+    predictions = predictions.loc[features.dropna().index].to_numpy()
 
     # Count how many days for each
     n_momentum = np.sum(predictions == 1)
@@ -24,12 +74,22 @@ def count_strategy_choices(clf, features):
 
     return n_momentum, n_meanrev
 
-def build_trade_log(final_signals, price_data):
+# Trade-log actions, in the order of their compact int8 codes
+TRADE_ACTIONS = ['OPEN_LONG', 'CLOSE_LONG', 'OPEN_SHORT', 'CLOSE_SHORT']
+OPEN_LONG, CLOSE_LONG, OPEN_SHORT, CLOSE_SHORT = range(len(TRADE_ACTIONS))
+
+@profiled
+def build_trade_log(final_signals, price_data, action_dtype='str'):
     """
     Creates a simplified "trade log" showing each time a position is opened or closed.
     
-    final_signals: DataFrame of signals in {-1, 0, +1} (index=dates, columns=tickers)
+    final_signals: DataFrame of signals in {-1, 0, +1} (index=dates, columns=tickers),
+                   int8 or float
     price_data:    DataFrame of prices for each ticker (same shape or superset of final_signals)
+    action_dtype:  encoding of the 'Action' column:
+                     'str'      -> plain strings (default)
+                     'category' -> pandas Categorical over TRADE_ACTIONS
+                     'int8'     -> int8 codes indexing TRADE_ACTIONS (most compact for large logs)
     
     Returns a DataFrame with columns:
       - Date
@@ -37,87 +97,71 @@ def build_trade_log(final_signals, price_data):
       - Action ("OPEN_LONG", "CLOSE_LONG", "OPEN_SHORT", "CLOSE_SHORT")
       - Price
     """
+    if action_dtype not in ('str', 'category', 'int8'):
+        raise ValueError(f"Unknown action_dtype: {action_dtype!r}")
+
     # Ensure the price_data covers the same date range
     price_data = price_data.loc[final_signals.index, final_signals.columns].ffill()
 
-    # Shift signals by 1 day to compare changes
-    prev_signals = final_signals.shift(1).fillna(0)
-
-    logs = []
-    for date in final_signals.index:
-        for ticker in final_signals.columns:
-            current_signal = final_signals.at[date, ticker]
-            previous_signal = prev_signals.at[date, ticker]
-
-            # If no change, skip
-            if current_signal == previous_signal:
-                continue
-
-            # Check transitions
-            # e.g. 0 -> +1 means "OPEN_LONG"
-            if previous_signal == 0 and current_signal == +1:
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'OPEN_LONG',
-                    'Price': price_data.at[date, ticker]
-                })
-            elif previous_signal == +1 and current_signal == 0:
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'CLOSE_LONG',
-                    'Price': price_data.at[date, ticker]
-                })
-            elif previous_signal == 0 and current_signal == -1:
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'OPEN_SHORT',
-                    'Price': price_data.at[date, ticker]
-                })
-            elif previous_signal == -1 and current_signal == 0:
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'CLOSE_SHORT',
-                    'Price': price_data.at[date, ticker]
-                })
-            # flips from +1 to -1 directly
-            elif previous_signal == +1 and current_signal == -1:
-                # close the long and open the short
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'CLOSE_LONG',
-                    'Price': price_data.at[date, ticker]
-                })
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'OPEN_SHORT',
-                    'Price': price_data.at[date, ticker]
-                })
-            elif previous_signal == -1 and current_signal == +1:
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'CLOSE_SHORT',
-                    'Price': price_data.at[date, ticker]
-                })
-                logs.append({
-                    'Date': date,
-                    'Ticker': ticker,
-                    'Action': 'OPEN_LONG',
-                    'Price': price_data.at[date, ticker]
-                })
-
-    trade_log_df = pd.DataFrame(logs)
+    # Shift signals by 1 day to compare changes, in the signals' own dtype (int8 stays int8)
+    current = final_signals.to_numpy()
+    if current.dtype == object:
+        current = current.astype(np.float64)
+    previous = np.zeros_like(current)
+    previous[1:] = current[:-1]
+    if previous.dtype.kind == 'f':
+        previous[np.isnan(previous)] = 0
+
+    # Transitions, e.g. 0 -> +1 means "OPEN_LONG".
+    # A flip (+1 -> -1 or -1 -> +1) closes the old side and opens the new one: two rows.
+    first_action = np.full(current.shape, -1, dtype=np.int8)
+    second_action = np.full(current.shape, -1, dtype=np.int8)
+
+    first_action[(previous == 0) & (current == 1)] = OPEN_LONG
+    first_action[(previous == 1) & (current == 0)] = CLOSE_LONG
+    first_action[(previous == 0) & (current == -1)] = OPEN_SHORT
+    first_action[(previous == -1) & (current == 0)] = CLOSE_SHORT
+
+    long_to_short = (previous == 1) & (current == -1)
+    first_action[long_to_short] = CLOSE_LONG
+    second_action[long_to_short] = OPEN_SHORT
+
+    short_to_long = (previous == -1) & (current == 1)
+    first_action[short_to_long] = CLOSE_SHORT
+    second_action[short_to_long] = OPEN_LONG
+
+    # Emit rows date by date, ticker by ticker, with the two flip rows adjacent
+    date_idx, ticker_idx = np.nonzero(first_action >= 0)
+    n_rows = 1 + (second_action[date_idx, ticker_idx] >= 0)
+    row_date = np.repeat(date_idx, n_rows)
+    row_ticker = np.repeat(ticker_idx, n_rows)
+
+    is_second = np.zeros(len(row_date), dtype=bool)
+    is_second[np.cumsum(n_rows)[n_rows == 2] - 1] = True
+    actions = np.where(
+        is_second,
+        second_action[row_date, row_ticker],
+        first_action[row_date, row_ticker],
+    )
+
+    if action_dtype == 'str':
+        action_col = np.asarray(TRADE_ACTIONS, dtype=object)[actions]
+    elif action_dtype == 'category':
+        action_col = pd.Categorical.from_codes(actions, categories=TRADE_ACTIONS)
+    else:
+        action_col = actions
+
+    trade_log_df = pd.DataFrame({
+        'Date': final_signals.index[row_date],
+        'Ticker': final_signals.columns[row_ticker],
+        'Action': action_col,
+        'Price': price_data.to_numpy(dtype=np.float64)[row_date, row_ticker],
+    })
     trade_log_df.sort_values(by='Date', inplace=True)
     trade_log_df.reset_index(drop=True, inplace=True)
     return trade_log_df
 
-def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_trade_count=5, initial_capital=10000.0):
+def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_trade_count=5, initial_capital=10000.0, plot=True):
     """
     Filters 'trade_log_df' for a specific 'ticker', prints the total number
        of trades, and displays the first 'x' trades in chronological order.
@@ -125,6 +169,8 @@ def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_
        we ONLY traded this single ticker with the signals in 'final_signals'.
     On the same plot, also shows a "buy & hold" line for that ticker
        for direct comparison.
+    plot=False (or headless mode, see set_headless) skips the plot and only returns
+       the trades and curves.
     """
 
     # Filter trade log for this ticker
@@ -147,7 +193,7 @@ def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_
     ticker_signals = final_signals[ticker].reindex(price_data.index).fillna(0)
 
     # Daily returns for the ticker
-    daily_returns = price_data[ticker].pct_change().fillna(0)
+    daily_returns = price_data[ticker].ffill().pct_change(fill_method=None).fillna(0)
 
     # Strategy daily return = signal * daily return
     # Shift signals by 1 day
@@ -161,13 +207,8 @@ def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_
     price_series = price_data[ticker].dropna()
     if price_series.empty:
         print(f"\nNo valid price data found for {ticker}, cannot plot buy & hold.")
-        plt.figure(figsize=(10, 6))
-        plt.plot(equity_curve.index, equity_curve, label=f"{ticker} Strategy")
-        plt.title(f"Single-Ticker Strategy vs. Buy & Hold: {ticker}")
-        plt.xlabel("Date")
-        plt.ylabel("Portfolio Value ($)")
-        plt.legend()
-        plt.show()
+        if plot and not _headless:
+            _plot_equity_curves(ticker, equity_curve)
         return filtered, equity_curve
 
     start_price = price_series.iloc[0]
@@ -178,13 +219,115 @@ def get_trades_for_stock( trade_log_df, final_signals, price_data, ticker, show_
     buy_hold_equity = buy_hold_equity.reindex(equity_curve.index, method='ffill')
 
     # Plot both curves
-    plt.figure(figsize=(10, 6))
-    plt.plot(equity_curve.index, equity_curve, label=f"{ticker} Strategy")
-    plt.plot(buy_hold_equity.index, buy_hold_equity, label=f"{ticker} Buy & Hold", linestyle='--')
-    plt.title(f"Single-Ticker Strategy vs. Buy & Hold: {ticker}")
-    plt.xlabel("Date")
-    plt.ylabel("Portfolio Value ($)")
-    plt.legend()
-    plt.show()
+    if plot and not _headless:
+        _plot_equity_curves(ticker, equity_curve, buy_hold_equity)
+
+    return filtered, equity_curve, buy_hold_equity
+
+@profiled
+def compute_equity_curves(final_signals, price_data, initial_capital=10000.0):
+    """
+    Single-ticker equity curves of get_trades_for_stock for every ticker of
+    'final_signals' at once, as (index=price dates, columns=tickers) DataFrames:
+      strategy: trading only that ticker with its signals (entered the day after)
+      buy_hold: buying it at its first available price (NaN before it, and for tickers
+                without any price)
+    """
+    prices = price_data.reindex(columns=final_signals.columns)
+    signals = final_signals.reindex(prices.index).fillna(0).to_numpy(dtype=np.float64)
+
+    filled = prices.ffill()
+    daily_returns = filled.pct_change(fill_method=None).fillna(0).to_numpy()
+    positions = np.vstack([np.zeros((1, signals.shape[1])), signals[:-1]])
+    strategy = np.cumprod(1.0 + positions * daily_returns, axis=0) * initial_capital
+
+    # First valid price per ticker; the forward-filled panel lines buy & hold up with
+    # the strategy's dates
+    filled = filled.to_numpy(dtype=np.float64)
+    has_price = prices.notna().to_numpy()
+    first = has_price.argmax(axis=0)
+    start_price = np.where(has_price.any(axis=0), filled[first, np.arange(filled.shape[1])], np.nan)
+    buy_hold = filled / start_price * initial_capital
+
+    return (pd.DataFrame(strategy, index=prices.index, columns=prices.columns),
+            pd.DataFrame(buy_hold, index=prices.index, columns=prices.columns))
+
+def group_trades_by_ticker(trade_log_df):
+    """
+    Splits a build_trade_log DataFrame into {ticker: that ticker's trades} with one
+    groupby, instead of filtering the whole log once per ticker.
+    """
+    return {ticker: trades for ticker, trades in trade_log_df.groupby('Ticker', sort=False, observed=True)}
+
+def _report_filename(ticker):
+    return "".join(c if c.isalnum() or c in '.-_' else '_' for c in str(ticker))
+
+def _write_ticker_report(output_dir, ticker, trades, equity_curve, buy_hold_equity, image_format):
+    name = _report_filename(ticker)
+    if trades is not None:
+        trades.to_csv(os.path.join(output_dir, f"{name}_trades.csv"), index=False)
+    if equity_curve is not None:
+        if buy_hold_equity is not None and buy_hold_equity.isna().all():
+            buy_hold_equity = None
+        fig = _equity_figure(ticker, equity_curve, buy_hold_equity)
+        fig.savefig(os.path.join(output_dir, f"{name}.{image_format}"))
+    return ticker
+
+@profiled
+def export_ticker_reports(trade_log_df, final_signals, price_data, output_dir, initial_capital=10000.0,
+                          tickers=None, figures=True, tables=True, image_format='png', n_jobs=1):
+    """
+    Batch version of get_trades_for_stock for unattended runs: writes, for every ticker
+    (or the given 'tickers'),
+      - {ticker}_trades.csv:       its trades from 'trade_log_df' (tables=True)
+      - {ticker}.{image_format}:   the strategy vs. buy & hold chart (figures=True)
+    and, for all tickers,
+      - equity_curves.csv, buy_hold_curves.csv (tables=True)
+      - summary.csv: trades, final values and total returns per ticker
+
+    The curves come from one compute_equity_curves pass and the log is grouped once.
+    Figures are drawn on matplotlib's non-interactive Agg canvas, never shown, and
+    spread across 'n_jobs' processes (-1 = all cores).
+
+    Returns the summary DataFrame (index=tickers).
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if tickers is None:
+        tickers = list(final_signals.columns)
+    os.makedirs(output_dir, exist_ok=True)
+
+    strategy, buy_hold = compute_equity_curves(final_signals[tickers], price_data, initial_capital=initial_capital)
+    trades_by_ticker = group_trades_by_ticker(trade_log_df)
+    empty_trades = trade_log_df.iloc[:0]
+
+    summary = pd.DataFrame({
+        'Trades': [len(trades_by_ticker.get(t, empty_trades)) for t in tickers],
+        'Strategy': strategy.iloc[-1].to_numpy() if len(strategy) else np.nan,
+        'BuyHold': buy_hold.iloc[-1].to_numpy() if len(buy_hold) else np.nan,
+    }, index=pd.Index(tickers, name='Ticker'))
+    summary['Strategy_Return'] = summary['Strategy'] / initial_capital - 1
+    summary['BuyHold_Return'] = summary['BuyHold'] / initial_capital - 1
+
+    if tables:
+        strategy.to_csv(os.path.join(output_dir, "equity_curves.csv"))
+        buy_hold.to_csv(os.path.join(output_dir, "buy_hold_curves.csv"))
+    summary.to_csv(os.path.join(output_dir, "summary.csv"))
+
+    tasks = [
+        (output_dir, t,
+         trades_by_ticker.get(t, empty_trades) if tables else None,
+         strategy[t] if figures else None,
+         buy_hold[t] if figures else None,
+         image_format)
+        for t in tickers
+    ]
+    if n_jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _write_ticker_report(*task)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunksize = max(1, len(tasks) // (4 * n_jobs))
+            list(executor.map(_write_ticker_report, *zip(*tasks), chunksize=chunksize))
 
-    return filtered, equity_curve, buy_hold_equity
\ No newline at end of file
+    return summary
@@ -0,0 +1,240 @@
+# chunked.py
+
+import numpy as np
+import pandas as pd
+
+from functions.computing import compute_mean_reversion, compute_momentum
+from functions.risk_management import apply_stop_loss_array
+from functions.signals import generate_final_signal, generate_signals_meanreversion, generate_signals_momentum
+from functions.trading import build_feature_matrix, compute_rolling_return_stats
+
+RESULT_COLUMNS = ['Strategy', 'SPY_BuyHold', 'EqualWeight_BuyHold']
+
+class ChunkedPipeline:
+    """
+    Out-of-core version of the pipeline for histories too long to hold in memory,
+    e.g. 1-minute or 5-minute bars for a whole universe: the panel is fed in as
+    consecutive time chunks and only a bounded amount of state is kept between them.
+
+    Per chunk it runs compute_momentum, compute_mean_reversion, build_feature_matrix,
+    the two signal generators, generate_final_signal with a pre-trained 'clf', the
+    stop-loss and the track_strategy_chosen_signals backtest, with the same results as
+    running them on the whole panel (to floating-point tolerance):
+      - the last max(momentum_window, z_window - 1, vol_window) raw price rows are kept
+        and prepended to the next chunk, plus the forward-filled price before them, so
+        every rolling window and forward fill sees the same history;
+      - the last feature row carries the forward fill of generate_final_signal;
+      - the stop-loss resumes from its entry prices and sides (apply_stop_loss_array);
+      - the backtest credits each bar's return to the previous bar's signals, so the
+        last bar of a chunk is settled when the next chunk (or finish()) arrives, and
+        the equity curves continue from the last values.
+    On very long histories the whole-panel run itself drifts: pandas' rolling std keeps
+    running sums over the full history, whereas here each window is recomputed from the
+    overlap, so a handful of threshold decisions can come out differently.
+
+    Usage:
+        pipeline = ChunkedPipeline(clf, momentum_window=63, stop_loss_pct=0.05)
+        for chunk in iter_price_store("data/intraday_5m", chunk_size=20000):
+            out = pipeline.process(chunk)   # dict of DataFrames for this chunk's bars
+        last = pipeline.finish()
+
+    Chunks are DataFrames (index=bar timestamps, columns=tickers) in time order, all with
+    the same columns; a 'benchmark' column, if present, is used as the SPY benchmark and
+    not traded.
+    """
+
+    def __init__(self, clf, momentum_window=126, z_window=20, vol_window=20, threshold=0.05, z_entry=1.0,
+                 stop_loss_pct=0.05, initial_capital=10000.0, benchmark="SPY"):
+        self.clf = clf
+        self.momentum_window = momentum_window
+        self.z_window = z_window
+        self.vol_window = vol_window
+        self.threshold = threshold
+        self.z_entry = z_entry
+        self.stop_loss_pct = stop_loss_pct
+        self.initial_capital = initial_capital
+        self.benchmark = benchmark
+        self.overlap = max(momentum_window, z_window - 1, vol_window)
+
+        # Indicator state: raw price tail and the forward-filled prices just before it
+        self.tail = None
+        self.last_filled = None
+        self.last_features = None
+        self.stop_loss_state = {}
+
+        # Backtest state: the last bar, waiting for the next bar's return
+        self.pending = None
+        self.spy_last = np.nan
+        self.spy_first = None
+        self.strategy_value = 1.0
+        self.equal_weight_value = 1.0
+        self.n_bars = 0
+
+    def process(self, chunk):
+        """
+        Folds one chunk of prices into the pipeline. Returns a dict with
+            'final_signals': stop-lossed signals for the chunk's bars (int8)
+            'features':      the chooser features for the chunk's bars
+            'results':       portfolio values (Strategy, SPY_BuyHold, EqualWeight_BuyHold) for
+                             the bars settled so far: the previous chunk's last bar and all
+                             but the last bar of this chunk
+        """
+        if self.benchmark in chunk.columns:
+            spy = chunk[self.benchmark]
+            prices = chunk.drop(columns=[self.benchmark])
+        else:
+            spy = pd.Series(np.nan, index=chunk.index)
+            prices = chunk
+        if self.tail is not None and len(chunk) and chunk.index[0] <= self.tail.index[-1]:
+            raise ValueError("Chunks must be in time order and must not overlap.")
+
+        features, filled, momentum_df, zscore_df = self._indicators(prices)
+        final_signals = self._signals(features, filled, momentum_df, zscore_df)
+        results = self._backtest(prices, filled, final_signals, spy)
+        return {'final_signals': final_signals, 'features': features, 'results': results}
+
+    def finish(self):
+        """
+        Settles the last bar (no next bar, so its strategy return is 0) and returns its
+        portfolio values as a one-row DataFrame.
+        """
+        if self.pending is None:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        last, self.pending = self.pending, None
+        return self._results(pd.DatetimeIndex([last['date']]), np.zeros(1),
+                             np.array([last['equal_weight_return']]), np.array([last['spy']]))
+
+    def _indicators(self, prices):
+        # Prepend the kept history; seeding its first row with the forward-filled prices
+        # before it makes pct_change(fill_method='pad') see the whole-history fill
+        tail_len = 0 if self.tail is None else len(self.tail)
+        extended = prices if self.tail is None else pd.concat([self.tail, prices])
+        seeded = extended
+        if self.last_filled is not None and len(extended):
+            seeded = extended.copy()
+            seeded.iloc[0] = seeded.iloc[0].fillna(self.last_filled)
+
+        momentum_df = compute_momentum(seeded, window=self.momentum_window)
+        zscore_df = compute_mean_reversion(extended, window=self.z_window)
+        rolling_stats = compute_rolling_return_stats(seeded, self.vol_window)
+        features = build_feature_matrix(None, momentum_df, zscore_df, rolling_stats=rolling_stats)
+
+        filled = seeded.ffill()
+        if len(extended) > self.overlap:
+            self.last_filled = filled.iloc[-self.overlap - 1]
+        self.tail = extended.iloc[-self.overlap:]
+
+        return (features.iloc[tail_len:], filled.iloc[tail_len:],
+                momentum_df.iloc[tail_len:], zscore_df.iloc[tail_len:])
+
+    def _signals(self, features, filled, momentum_df, zscore_df):
+        momentum_signals = generate_signals_momentum(momentum_df, threshold=self.threshold)
+        meanrev_signals = generate_signals_meanreversion(zscore_df, z_entry=self.z_entry)
+
+        # Carry generate_final_signal's forward fill of missing features across chunks
+        if self.last_features is not None:
+            features = pd.concat([self.last_features.to_frame().T, features]).ffill().iloc[1:]
+        if len(features):
+            self.last_features = features.ffill().iloc[-1]
+
+        signals = generate_final_signal(self.clf, features, momentum_signals, meanrev_signals)
+        stopped = apply_stop_loss_array(signals.to_numpy(), filled.to_numpy(dtype=np.float64),
+                                        self.stop_loss_pct, state=self.stop_loss_state)
+        return pd.DataFrame(stopped, index=signals.index, columns=signals.columns)
+
+    def _backtest(self, prices, filled, final_signals, spy):
+        # Same arithmetic as trading.backtest_arrays, one bar behind for the strategy
+        available = prices.notna().to_numpy()
+        counts = available.sum(axis=1)
+        px = filled.to_numpy(dtype=np.float64)
+        signals = final_signals.to_numpy()
+
+        spy_filled = spy.astype(np.float64).ffill().fillna(self.spy_last).to_numpy()
+        if len(spy_filled):
+            self.spy_last = spy_filled[-1]
+
+        # Return into each bar of the chunk; the first bar ever has none
+        prev = self.pending
+        prev_px = np.full((1, px.shape[1]), np.nan) if prev is None else prev['price'][None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.vstack([prev_px, px])
+            returns = returns[1:] / returns[:-1] - 1
+        returns[np.isnan(returns)] = 0.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            equal_weight_return = np.where(counts > 0, returns.sum(axis=1) / counts, 0.0)
+
+        # Bar t earns its signals times the return into bar t+1, over the tickers priced on t
+        if prev is not None:
+            signals = np.vstack([prev['signals'][None], signals])
+            available = np.vstack([prev['available'][None], available])
+            counts = np.concatenate([[prev['count']], counts])
+            returns = np.vstack([returns, np.zeros((1, returns.shape[1]))])
+        else:
+            returns = np.vstack([returns[1:], np.zeros((1, returns.shape[1]))])
+        active = available & (signals != 0)
+        with np.errstate(invalid='ignore'):
+            strategy_sum = np.where(active, signals * returns, 0.0).sum(axis=1)
+            strategy_return = np.where(counts > 0, strategy_sum / counts, 0.0)
+
+        # Settled bars: the pending one plus all but the last bar of this chunk
+        dates = prices.index
+        if prev is not None:
+            dates = pd.DatetimeIndex([prev['date']]).append(dates)
+            equal_weight_return = np.concatenate([[prev['equal_weight_return']], equal_weight_return])
+            spy_filled = np.concatenate([[prev['spy']], spy_filled])
+        if len(dates) == 0:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+
+        self.pending = {
+            'date': dates[-1],
+            'signals': signals[-1],
+            'available': available[-1],
+            'price': px[-1] if len(px) else prev['price'],
+            'count': counts[-1],
+            'spy': spy_filled[-1],
+            'equal_weight_return': equal_weight_return[-1],
+        }
+        return self._results(dates[:-1], strategy_return[:-1], equal_weight_return[:-1], spy_filled[:-1])
+
+    def _results(self, dates, strategy_return, equal_weight_return, spy_filled):
+        if self.spy_first is None and len(spy_filled):
+            self.spy_first = spy_filled[0]
+        strategy = np.cumprod(np.concatenate([[self.strategy_value], 1 + strategy_return]))[1:]
+        equal_weight = np.cumprod(np.concatenate([[self.equal_weight_value], 1 + equal_weight_return]))[1:]
+        if len(dates):
+            self.strategy_value = strategy[-1]
+            self.equal_weight_value = equal_weight[-1]
+        self.n_bars += len(dates)
+
+        spy_first = np.nan if self.spy_first is None else self.spy_first
+        return pd.DataFrame({
+            'Strategy': strategy * self.initial_capital,
+            'SPY_BuyHold': spy_filled / spy_first * self.initial_capital,
+            'EqualWeight_BuyHold': equal_weight * self.initial_capital,
+        }, index=dates)
+
+def iter_frame_chunks(frame, chunk_size):
+    """
+    Splits an in-memory panel into consecutive chunks of 'chunk_size' rows.
+    """
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+def run_chunked(chunks, clf, on_chunk=None, **params):
+    """
+    Runs a ChunkedPipeline over an iterable of price chunks (e.g. iter_price_store) and
+    returns the portfolio values for every bar, like track_strategy_chosen_signals.
+
+    on_chunk: optional callback(outputs) called with each chunk's process() output,
+              e.g. to write the final signals to disk; they are not kept in memory.
+    params:   passed to ChunkedPipeline.
+    """
+    pipeline = ChunkedPipeline(clf, **params)
+    results = []
+    for chunk in chunks:
+        outputs = pipeline.process(chunk)
+        results.append(outputs['results'])
+        if on_chunk is not None:
+            on_chunk(outputs)
+    results.append(pipeline.finish())
+    return pd.concat(results)
@@ -1,16 +1,74 @@
 # computing.py
 
 import numpy as np
+import pandas as pd
 
+from functions.profiling import profiled
+
+# Panel dtype policy: price, indicator and return panels keep the float dtype of the
+# prices they are computed from. float64 prices (the default) run the pipeline exactly
+# as before; float32 prices (see as_panel_dtype) halve the memory and bandwidth of every
+# panel. Whatever the panel dtype, the numerically sensitive steps accumulate in float64
+# - rolling statistics, sums and means across tickers, cumulative products - and only
+# their results are stored in the panel dtype. Per-day series and the feature matrix
+# stay float64.
+PANEL_DTYPES = (np.float64, np.float32)
+
+def panel_dtype(frame):
+    """
+    The panel dtype of a DataFrame: float32 if every column is float32, float64 otherwise.
+    """
+    dtypes = set(frame.dtypes) if isinstance(frame, pd.DataFrame) else {frame.dtype}
+    return np.dtype(np.float32) if dtypes == {np.dtype(np.float32)} else np.dtype(np.float64)
+
+def as_panel_dtype(frame, dtype=np.float32):
+    """
+    Casts a price panel to one of PANEL_DTYPES, e.g. as_panel_dtype(prices) right after
+    loading to run the rest of the pipeline in float32.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in PANEL_DTYPES:
+        raise ValueError(f"Unsupported panel dtype: {dtype} (expected float64 or float32)")
+    return frame.astype(dtype)
+
+def row_sum(frame):
+    """
+    Sum across tickers for each date, skipping NaN (DataFrame.sum(axis=1)), accumulated
+    in float64 for float32 panels.
+    """
+    if panel_dtype(frame) == np.float64:
+        return frame.sum(axis=1)
+    values = frame.to_numpy()
+    return pd.Series(np.where(np.isnan(values), 0, values).sum(axis=1, dtype=np.float64), index=frame.index)
+
+def row_mean(frame):
+    """
+    Mean across tickers for each date, skipping NaN (DataFrame.mean(axis=1)), accumulated
+    in float64 for float32 panels. NaN where a date has no values.
+    """
+    if panel_dtype(frame) == np.float64:
+        return frame.mean(axis=1)
+    values = frame.to_numpy()
+    valid = ~np.isnan(values)
+    total = np.where(valid, values, 0).sum(axis=1, dtype=np.float64)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.Series(np.where(count > 0, total / count, np.nan), index=frame.index)
+
+@profiled
 def compute_momentum(data, window=126):
     """
     Compute momentum as the percentage change over a given window.
+    Keeps the panel dtype of 'data'.
     """
     return data.pct_change(periods=window, fill_method='pad')
 
+@profiled
 def compute_mean_reversion(data, window=20):
     """
     Compute mean reversion signals using z-scores.
+    The rolling statistics and the z-score are computed in float64 (pandas' rolling
+    always accumulates in float64) and returned in the panel dtype of 'data'.
     """
     # Calculate rolling mean and standard deviation
     rolling_mean = data.rolling(window=window).mean()
@@ -18,27 +76,70 @@ def compute_mean_reversion(data, window=20):
 
     # Calculate z-score
     z_score = (data - rolling_mean) / rolling_std
-    return z_score
+    return z_score.astype(panel_dtype(data), copy=False)
 
-def compute_signal_returns(data, signal_df):
+@profiled
+def compute_signal_returns(data, signal_df, daily_returns=None):
     """
     data: price DataFrame (each column is a ticker)
-    signal_df: signal DataFrame (matching index/tickers), with values in {-1,0,1}.
+    signal_df: signal DataFrame (matching index/tickers), with values in {-1,0,1} (int8 or float).
+    daily_returns: optional precomputed data.pct_change() (e.g. computed once for a whole
+                   universe and sliced per sample); 'data' is not used when given.
 
     Returns a Series of "portfolio daily return" for each day,
     assuming we equally weight all tickers that have a non-zero signal.
     """
-    # Daily returns
-    daily_returns = data.pct_change().shift(-1)  # shift(-1) so day t signal sees day t+1 return
+    # Next-day returns, so the day t signal sees the day t+1 return
+    if daily_returns is None:
+        returns = _next_day_returns(data)
+        labels = data
+    else:
+        returns = daily_returns.shift(-1)
+        labels = returns
+
+    if not (labels.index.equals(signal_df.index) and labels.columns.equals(signal_df.columns)):
+        # Labels differ: let pandas align them, as the original frame arithmetic did
+        if daily_returns is None:
+            returns = pd.DataFrame(returns, index=data.index, columns=data.columns)
+        combined_sum = row_sum(signal_df * returns)
+        count = (signal_df != 0).sum(axis=1).replace(0, np.nan)
+        return (combined_sum / count).fillna(0.0).rename('strategy_return')
 
     # If signal is +1 and daily_return is r, that's +r. If -1, it's -r. If 0, it's 0.
-    # Average across "active" tickers
-    combined = (signal_df * daily_returns)
+    # Average across "active" tickers (float64 sums, also for float32 panels)
+    signals = signal_df.to_numpy()
+    combined = signals * np.asarray(returns)
+    combined_sum = np.where(np.isnan(combined), 0, combined).sum(axis=1, dtype=np.float64)
+
+    # equal-weight average of all active signals, 0 on days without any:
+    count = (signals != 0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strategy_return = np.where(count > 0, combined_sum / count, 0.0)
+    return pd.Series(strategy_return, index=signal_df.index, name='strategy_return')
 
-    # equal-weight average of all active signals:
-    combined['sum'] = combined.sum(axis=1)
-    combined['count'] = (signal_df != 0).sum(axis=1).replace(0, np.nan)
-    combined['strategy_return'] = combined['sum'] / combined['count']
+def _next_day_returns(data):
+    # data.pct_change().shift(-1) as an array: returns of the forward-filled prices (what
+    # pct_change's deprecated default fill does), computed without the FutureWarning
+    filled = data.ffill().to_numpy()
+    returns = np.full(filled.shape, np.nan, dtype=filled.dtype)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[:-1] = filled[1:] / filled[:-1] - 1
+    return returns
+
+def compute_stacked_signal_returns(daily_returns, signal_stack):
+    """
+    compute_signal_returns for many signal variants at once.
+
+    daily_returns: (dates x tickers) array of data.pct_change()
+    signal_stack:  (variants x dates x tickers) array of signals in {-1,0,1}
+
+    Returns a (variants x dates) array of equal-weight daily strategy returns.
+    """
+    # shift(-1) so day t signal sees day t+1 return
+    next_returns = np.full_like(daily_returns, np.nan, dtype=np.float64)
+    next_returns[:-1] = daily_returns[1:]
 
-    # per-day return:
-    return combined['strategy_return'].fillna(0.0)
\ No newline at end of file
+    combined = np.nansum(signal_stack * next_returns[None], axis=2)
+    count = (signal_stack != 0).sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, combined / count, 0.0)
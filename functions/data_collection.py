@@ -1,18 +1,115 @@
 # data_collection.py
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-import yfinance as yf
 
-def get_historical_data(tickers, start="2015-01-01", end="2025-01-01", interval='1d'):
+from functions.price_store import (
+    load_price_store,
+    migrate_csv_to_price_store,
+    price_store_coverage,
+    price_store_exists,
+    price_store_info,
+    price_store_missing,
+    save_price_store,
+)
+from functions.universe import load_universe_index
+from functions.profiling import profiled
+
+@profiled
+def get_historical_data(tickers, start="2015-01-01", end="2025-01-01", interval='1d', fetcher=None):
     """
     This function returns a pd.DataFrame with the closing prices of the given tickers.
+    Tickers are downloaded in concurrent batches (see download_close_prices).
+    """
+    tickers = list(tickers)
+    data, failures = download_close_prices(tickers, start=start, end=end, interval=interval, fetcher=fetcher)
+    for ticker, reason in failures.items():
+        print(f"Error downloading data for {ticker}: {reason}")
+    return data.reindex(columns=tickers)
+
+def yfinance_fetcher(tickers, start, end, interval):
+    """
+    Default fetcher for download_close_prices: one multi-symbol yf.download call.
+    Returns a DataFrame of closing prices with one column per ticker.
+    """
+    import yfinance as yf  # imported on first download: it is slow to import and unused offline
+
+    df = yf.download(tickers, start=start, end=end, interval=interval, progress=False)
+    close = df['Close']
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=tickers[0])
+    return close
+
+def download_close_prices(tickers, start, end, interval='1d', fetcher=None, batch_size=50,
+                          max_workers=4, max_retries=3, backoff=1.0):
     """
-    data = pd.DataFrame()
-    for symbol in tickers:
-        df = yf.download(symbol, start=start, end=end, interval=interval)
-        data[symbol] = df['Close']
-    return data
+    Downloads closing prices for many tickers by splitting them into multi-symbol batches
+    and fetching the batches on a bounded thread pool.
+
+    Parameters:
+        tickers (list): Ticker symbols to download.
+        start, end (str): Date range passed to the fetcher.
+        interval (str): Bar interval passed to the fetcher.
+        fetcher (callable, optional): fetcher(tickers, start, end, interval) -> DataFrame of
+            closing prices, one column per ticker. Defaults to yfinance_fetcher; pass a local
+            stub to run offline.
+        batch_size (int): Number of tickers per request.
+        max_workers (int): Maximum number of concurrent requests.
+        max_retries (int): Total attempts per batch, the first one included. Tickers that
+            error out or come back empty are retried; the n-th retry waits
+            backoff * 2**(n - 1) seconds (backoff, 2 * backoff, 4 * backoff, ...).
+        backoff (float): Base delay in seconds between retries.
+
+    Returns:
+        (price_data_df, failures): DataFrame of closing prices (columns in 'tickers' order,
+            only tickers that returned data) and a dict {ticker: reason} for the rest.
+    """
+    if fetcher is None:
+        fetcher = yfinance_fetcher
+
+    tickers = list(dict.fromkeys(tickers))
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+    def fetch_batch(batch):
+        pending = list(batch)
+        frames = []
+        failures = {}
+        for attempt in range(max_retries):
+            if attempt > 0:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            try:
+                df = fetcher(pending, start, end, interval)
+            except Exception as e:
+                failures = {ticker: f"{type(e).__name__}: {e}" for ticker in pending}
+                continue
+
+            # Keep the tickers that came back with data, retry the rest
+            df = df.reindex(columns=pending).dropna(axis=1, how='all')
+            frames.append(df)
+            pending = [ticker for ticker in pending if ticker not in df.columns]
+            failures = {ticker: "No data returned" for ticker in pending}
+            if not pending:
+                break
+        return frames, failures
+
+    frames = []
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        for batch_frames, batch_failures in executor.map(fetch_batch, batches):
+            frames.extend(batch_frames)
+            failures.update(batch_failures)
+
+    if frames:
+        price_data_df = pd.concat(frames, axis=1)
+    else:
+        price_data_df = pd.DataFrame()
+    price_data_df = price_data_df.reindex(columns=[t for t in tickers if t in price_data_df.columns])
+
+    return price_data_df, failures
 
 def get_current_sp500_ticker_sample(n=10, seed=None):
     """
@@ -45,18 +142,29 @@ def get_current_sp500_ticker_sample(n=10, seed=None):
     
     return list(sample_tickers)
 
-def get_sp500_data_in_date_range(start_date, end_date, data_csv="data/SPY_500_data.csv", composition_csv="data/SPY_500_historical_stocks.csv"):
+@profiled
+def get_sp500_data_in_date_range(start_date, end_date, data_csv="data/SPY_500_data.csv", composition_csv="data/SPY_500_historical_stocks.csv", fetcher=None, store_path="data/SPY_500_data", tickers=None):
     """
-    Gets historical closing price data for the S&P 500 companies based on the composition
-    at the given start_date. If the data CSV already exists and covers the requested date range,
-    it simply loads and returns the sliced data. Otherwise, it downloads the data from yfinance,
-    saves it to the CSV, and returns the data.
+    Gets historical closing price data for the S&P 500 companies that were in the index at
+    any time in the date range (the composition at start_date plus the names added by later
+    composition rows before end_date). If the price store already covers the requested date range and
+    tickers, it simply loads and returns the sliced data. Otherwise, it downloads only what is
+    missing (earlier/later dates, tickers new to the composition) from yfinance, merges it into
+    the price store, and returns the data.
+
+    Tickers whose download fails (errors or no data while the rest of the range has bars)
+    are stored as NaN and recorded with the range they miss, so the next call requests them
+    again; they are printed at the end.
 
     Parameters:
         start_date (str): The start date (e.g., "2015-01-01").
         end_date (str): The end date (e.g., "2025-01-01").
-        data_csv (str): Filename for saving/loading the data.
+        data_csv (str): Legacy CSV cache; migrated once into the price store if the store is missing.
         composition_csv (str): Filename for the S&P 500 composition CSV.
+        fetcher (callable, optional): Price fetcher for download_close_prices (defaults to yfinance).
+        store_path (str): Price store location (see price_store.py). A path ending in '.parquet'
+            uses Parquet, anything else a memory-mapped NumPy directory.
+        tickers (list, optional): Only load these columns from the store (column projection).
 
     Returns:
         price_data_df (pd.DataFrame): DataFrame of historical closing prices for all tickers.
@@ -64,59 +172,162 @@ def get_sp500_data_in_date_range(start_date, end_date, data_csv="data/SPY_500_da
     # Convert dates to Timestamps
     start_ts = pd.to_datetime(start_date)
     end_ts   = pd.to_datetime(end_date)
-    
-    saved_data = pd.read_csv(data_csv, index_col=0, parse_dates=True)
-    # Check if the saved data covers the requested date range.
-    if not saved_data.empty:
-        data_start = saved_data.index.min()
-        data_end   = saved_data.index.max()
-        if data_start <= start_ts and data_end >= end_ts:
+
+    # One-time migration of the old CSV cache
+    if not price_store_exists(store_path) and os.path.isfile(data_csv):
+        migrate_csv_to_price_store(data_csv, store_path)
+
+    # Every ticker in the index during the range: the composition at start_date and later joiners.
+    composition_date, composition_tickers = get_sp500_composition(composition_csv, start_ts, end=end_ts)
+
+    # Ensure SPY is included for benchmarking.
+    if "SPY" not in composition_tickers:
+        composition_tickers.append("SPY")
+
+    if price_store_exists(store_path):
+        # Work out what the store is missing (reads only the metadata and date index).
+        _, saved_tickers = price_store_info(store_path)
+        coverage = price_store_coverage(store_path)
+        missing = price_store_missing(store_path)
+        requests = find_missing_price_ranges(coverage, saved_tickers, composition_tickers, start_ts, end_ts,
+                                             missing=missing)
+        if not requests:
             # Return the slice corresponding to the requested range.
             print("Data already downloaded. Returning existing data slice.")
-            return saved_data.loc[start_date:end_date]
-        else:
-            print("Existing data does not cover the requested date range. Redownloading data.")
+            return load_price_store(store_path, tickers=tickers, start=start_ts, end=end_ts)
+        print("Existing data does not cover the requested range. Downloading only the missing data.")
+        saved_data = load_price_store(store_path)
     else:
-        print("Saved data is empty. Redownloading data.")
-    
+        print("No saved data found. Downloading data.")
+        coverage = (None, None)
+        missing = {}
+        requests = [(composition_tickers, start_ts, end_ts)]
+        saved_data = pd.DataFrame()
 
-    # Downloading Data
-    # Read the S&P 500 composition CSV.
-    composition_df = pd.read_csv(composition_csv, parse_dates=["date"])
-    composition_df.sort_values("date", inplace=True)
-    
-    # Use the start_date as the reference for the composition.
-    composition_at_start = composition_df[composition_df["date"] <= start_ts].iloc[-1]
-    tickers_str = composition_at_start["tickers"]
-    tickers = [t.strip() for t in tickers_str.split(",") if t.strip()]
-    
-    # Ensure SPY is included for benchmarking.
-    if "SPY" not in tickers:
-        tickers.append("SPY")
-    
-    print("Using composition from:", composition_at_start["date"].date())
-    print(f"Found {len(tickers)} tickers in the composition.")
-    
-    # Download historical closing price data for each ticker.
-    price_series_list = []
-    for ticker in tickers:
-        try:
-            df = yf.download(ticker, start=start_date, end=end_date)
-            if not df.empty:
-                # Extract the 'Close' price series and set its name.
-                s = df["Close"]
-                s.name = ticker
-                price_series_list.append(s)
+    print("Using composition from:", composition_date.date())
+    print(f"Found {len(composition_tickers)} tickers in the composition over the date range.")
+
+    # Download each missing block in concurrent multi-ticker batches.
+    downloaded = []
+    for request_tickers, request_start, request_end in requests:
+        print(f"Downloading {len(request_tickers)} tickers from {request_start.date()} to {request_end.date()}.")
+        block, failures = download_close_prices(request_tickers, start=request_start, end=request_end, fetcher=fetcher)
+        downloaded.append(block.reindex(columns=request_tickers))
+
+        outside_coverage = (coverage[0] is None or request_end <= coverage[0] or request_start >= coverage[1])
+        if (outside_coverage and len(failures) == len(request_tickers)
+                and all(reason == "No data returned" for reason in failures.values())):
+            # New dates without any bars (e.g. a market holiday at the edge of the stored range)
+            print("No data returned for this range.")
+            continue
+
+        # A retry that covers a ticker's recorded gap clears it; failures (re)record theirs
+        for ticker in request_tickers:
+            gap = missing.get(ticker)
+            if ticker not in failures and gap is not None and request_start <= gap[0] and gap[1] <= request_end:
+                del missing[ticker]
+        for ticker, reason in failures.items():
+            print(f"Error downloading data for {ticker}: {reason}")
+            gap = missing.get(ticker)
+            if gap is not None:
+                missing[ticker] = (min(gap[0], request_start), max(gap[1], request_end))
             else:
-                print(f"No data returned for {ticker}.")
-        except Exception as e:
-            print(f"Error downloading data for {ticker}: {e}")
-    
-    # Combine all individual series into one DataFrame.
-    price_data_df = pd.concat(price_series_list, axis=1)
-    
-    # Save the downloaded data to CSV for future use.
-    price_data_df.to_csv(data_csv)
-    print(f"Downloaded data saved to {data_csv}")
-    
-    return price_data_df
\ No newline at end of file
+                missing[ticker] = (request_start, request_end)
+
+    # Merge into the saved data; existing values win over re-downloaded ones.
+    price_data_df = merge_price_blocks(saved_data, downloaded)
+
+    # Save the merged data to the price store for future use. Failed tickers are tracked
+    # in 'missing', so the covered range can advance over the requested one, but only up
+    # to the day after the last bar: later dates (in the future, or not published yet)
+    # stay uncovered and are requested again on the next call.
+    covered_start = start_ts if coverage[0] is None else min(start_ts, coverage[0])
+    covered_end = covered_data_end(price_data_df.index, covered_start, end_ts)
+    if coverage[1] is not None:
+        covered_end = max(covered_end, coverage[1])
+    save_price_store(price_data_df, store_path, coverage=(covered_start, covered_end), missing=missing)
+    print(f"Downloaded data saved to {store_path}")
+    if missing:
+        print(f"{len(missing)} tickers failed to download and will be requested again: {', '.join(missing)}")
+
+    return load_price_store(store_path, tickers=tickers, start=start_ts, end=end_ts)
+
+def get_sp500_composition(composition_csv, date, end=None):
+    """
+    Returns (composition_date, tickers) for the last S&P 500 composition row at or before 'date'.
+    With 'end', tickers also include the names added by later rows dated before 'end'.
+    The composition CSV is parsed once into a UniverseIndex (see universe.py) and reused.
+    """
+    universe_index = load_universe_index(composition_csv)
+    if end is not None:
+        return universe_index.snapshot_date(date), universe_index.members_between(date, end)
+    return universe_index.snapshot_date(date), universe_index.members(date)
+
+def find_missing_price_ranges(coverage, saved_tickers, tickers, start_ts, end_ts, missing=None):
+    """
+    Compares what a price store holds (its covered [start, end) range and tickers) with what
+    a request for 'tickers' over [start_ts, end_ts) needs. Returns a list of
+    (tickers, start, end) blocks to download:
+      - tickers not in the store, over the whole covered + requested range
+      - stored tickers before the covered range (head)
+      - stored tickers after the covered range (tail)
+      - requested tickers whose recorded gap in 'missing' ({ticker: (start, end)}, see
+        price_store_missing) overlaps the request, over that gap
+    Head/tail gaps without any business day (e.g. a weekend) are ignored.
+    """
+    covered_start, covered_end = coverage
+    saved_set = set(saved_tickers)
+    new_tickers = [t for t in tickers if t not in saved_set]
+
+    if covered_start is None:
+        return [(list(dict.fromkeys(list(saved_tickers) + new_tickers)), start_ts, end_ts)]
+
+    def has_business_day(first, stop):
+        # Any weekday in [first, stop)
+        return first < stop and len(pd.bdate_range(first, stop - pd.Timedelta(days=1))) > 0
+
+    requests = []
+    if new_tickers:
+        requests.append((new_tickers, min(start_ts, covered_start), max(end_ts, covered_end)))
+    if saved_tickers and has_business_day(start_ts, covered_start):
+        requests.append((list(saved_tickers), start_ts, covered_start))
+    if saved_tickers and has_business_day(covered_end, end_ts):
+        requests.append((list(saved_tickers), covered_end, end_ts))
+
+    def requested(ticker, gap):
+        return any(ticker in block and first <= gap[0] and gap[1] <= stop for block, first, stop in requests)
+
+    # Earlier failures not already part of a block above, one block per recorded gap
+    gaps = {}
+    for ticker in tickers:
+        gap = (missing or {}).get(ticker)
+        if (ticker in saved_set and gap is not None and gap[0] < end_ts and gap[1] > start_ts
+                and not requested(ticker, gap)):
+            gaps.setdefault(gap, []).append(ticker)
+    for (gap_start, gap_end), gap_tickers in gaps.items():
+        requests.append((gap_tickers, gap_start, gap_end))
+    return requests
+
+def covered_data_end(dates, start_ts, end_ts, today=None):
+    """
+    End (exclusive) of the range a download of [start_ts, end_ts) can be recorded as
+    covering: 'end_ts', clamped to the business day after the last bar in 'dates' (start_ts
+    if there is none) and to the day after 'today' (default: the current date). Dates
+    past the last bar may still get bars, so they are left for the next call.
+    """
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    end = min(pd.Timestamp(end_ts), today + pd.Timedelta(days=1))
+    last = pd.Timestamp(start_ts) if len(dates) == 0 else pd.Timestamp(dates.max()) + pd.offsets.BDay(1)
+    return max(pd.Timestamp(start_ts), min(end, last))
+
+def merge_price_blocks(saved_data, blocks):
+    """
+    Merges downloaded price blocks into 'saved_data'. Existing cells take priority,
+    new dates/tickers are added; columns keep their saved order with new tickers appended.
+    """
+    columns = list(saved_data.columns)
+    merged = saved_data
+    for block in blocks:
+        columns += [t for t in block.columns if t not in merged.columns]
+        merged = merged.combine_first(block)
+    return merged.reindex(columns=columns).sort_index()
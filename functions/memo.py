@@ -0,0 +1,292 @@
+# memo.py
+
+import ast
+import functools
+import hashlib
+import importlib.util
+import inspect
+import os
+import uuid
+import weakref
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from functions.computing import compute_mean_reversion, compute_momentum, compute_signal_returns
+from functions.risk_management import apply_stop_loss
+from functions.signals import generate_final_signal, generate_signals_meanreversion, generate_signals_momentum
+from functions.trading import build_feature_matrix, build_strategy_choice_label, compute_rolling_return_stats, track_strategy_chosen_signals
+from functions.training import train_strategy_chooser
+
+# Content hashes of artifacts returned by memoized functions, by id (weakly held, dropped
+# with the object), derived from their cache key so passing them downstream never rehashes
+# their data. Caller-supplied inputs are never registered: they are rehashed on every
+# call, so editing them in place (e.g. in a notebook cell) cannot bring back stale results.
+_known_hashes = {}
+
+def hash_value(value):
+    """
+    Content hash of a function argument: DataFrames/Series by their values, index,
+    columns and dtypes; arrays by their bytes, dtype and shape; tuples, lists and dicts
+    element-wise; anything else (e.g. a fitted classifier) with joblib.hash.
+
+    Objects produced by a memoized function reuse the hash recorded for them (copy
+    them before editing them in place); everything else is hashed on every call.
+    """
+    entry = _known_hashes.get(id(value))
+    if entry is not None and entry[0]() is value:
+        return entry[1]
+
+    h = hashlib.sha256()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(type(value).__name__.encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        if isinstance(value, pd.DataFrame):
+            h.update(repr(list(value.columns)).encode())
+            h.update(repr([str(d) for d in value.dtypes]).encode())
+        else:
+            h.update(repr((value.name, str(value.dtype))).encode())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (tuple, list)):
+        h.update(type(value).__name__.encode())
+        for item in value:
+            h.update(hash_value(item).encode())
+    elif isinstance(value, dict):
+        for k in sorted(value, key=repr):
+            h.update(repr(k).encode())
+            h.update(hash_value(value[k]).encode())
+    elif value is None or isinstance(value, (bool, int, float, str, bytes, np.generic)):
+        h.update(repr((type(value).__name__, value)).encode())
+    else:
+        h.update(joblib.hash(value).encode())
+
+    return h.hexdigest()[:32]
+
+def _remember_hash(value, digest):
+    try:
+        ref = weakref.ref(value, lambda _, key=id(value): _known_hashes.pop(key, None))
+    except TypeError:  # not weak-referenceable (e.g. int, tuple)
+        return
+    _known_hashes[id(value)] = (ref, digest)
+
+class ArtifactCache:
+    """
+    Directory of pickled pipeline artifacts (indicator and signal matrices, fitted
+    classifiers, ...) addressed by a content key, bounded to 'max_bytes' on disk.
+
+    Entries are written atomically (temp file + os.replace) so concurrent processes can
+    share the directory. Reading an entry refreshes its modification time, and once the
+    directory grows past 'max_bytes' the least recently used entries are deleted.
+    """
+
+    suffix = '.joblib'
+
+    def __init__(self, directory="cache/artifacts", max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key):
+        """
+        Returns (True, value) for a cached key, (False, None) otherwise.
+        """
+        path = self.path(key)
+        try:
+            value = joblib.load(path)
+        except (FileNotFoundError, EOFError):
+            self.misses += 1
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:  # evicted by another process in the meantime
+            pass
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self):
+        """
+        List of (path, size, mtime) of the cached artifacts, least recently used first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def _imported_modules(path):
+    # Names of the functions.* modules imported anywhere in the file (also inside functions)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            if node.module == 'functions':
+                names.update(f"functions.{alias.name}" for alias in node.names)
+            elif node.module.startswith('functions.'):
+                names.add(node.module)
+        elif isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names if alias.name.startswith('functions.'))
+    return names
+
+def code_version(module_name):
+    """
+    Hash of the source of 'module_name' and of every functions.* module it imports,
+    directly or through other functions.* modules. Part of every memoize key, so editing
+    a stage or any helper it relies on (in the same or another module) invalidates its
+    cached results.
+    """
+    sources = {}
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+            sources[name] = b''
+            continue
+        with open(spec.origin, 'rb') as f:
+            sources[name] = f.read()
+        pending.extend(_imported_modules(spec.origin))
+
+    h = hashlib.sha256()
+    for name in sorted(sources):
+        h.update(name.encode())
+        h.update(hashlib.sha256(sources[name]).digest())
+    return h.hexdigest()
+
+def memoize(func, cache, ignore=()):
+    """
+    Wraps 'func' so each call is looked up in 'cache' by a key made of the function's
+    name, the code_version of its module (its source and that of the functions.* modules
+    it imports) and the content hashes of its arguments after defaults are applied
+    ('ignore' lists arguments that do not change the result, e.g. n_jobs).
+    On a miss the result is computed and stored.
+
+    Results are registered with a hash derived from the key, so memoized functions
+    chained together only ever hash the raw inputs once. The original function is
+    available as wrapper.uncached.
+    """
+    signature = inspect.signature(func)
+    target = inspect.unwrap(func)
+    try:
+        source = inspect.getsource(target)
+    except (OSError, TypeError):
+        source = ''
+    if target.__module__ == 'functions' or target.__module__.startswith('functions.'):
+        source += code_version(target.__module__)
+    salt = hashlib.sha256(f"{target.__module__}.{target.__qualname__}\n{source}".encode()).hexdigest()
+    ignore = set(ignore)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        h = hashlib.sha256(salt.encode())
+        for name, value in bound.arguments.items():
+            if name in ignore:
+                continue
+            h.update(name.encode())
+            h.update(hash_value(value).encode())
+        key = f"{target.__name__}-{h.hexdigest()[:32]}"
+
+        hit, result = cache.get(key)
+        if not hit:
+            result = func(*args, **kwargs)
+            cache.put(key, result)
+
+        _remember_result(result, key)
+        return result
+
+    wrapper.uncached = func
+    return wrapper
+
+def _remember_result(result, key):
+    if isinstance(result, tuple):
+        for i, item in enumerate(result):
+            _remember_result(item, f"{key}:{i}")
+        return
+    _remember_hash(result, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+class MemoizedPipeline:
+    """
+    The pipeline functions of computing.py, signals.py, trading.py, training.py and
+    risk_management.py, memoized on a shared ArtifactCache. Calls take the same
+    arguments as the originals.
+
+    Usage:
+        pipeline = MemoizedPipeline("cache/artifacts")
+        momentum_df = pipeline.compute_momentum(price_data, window=63)
+        ...
+        final_signals = pipeline.apply_stop_loss(signals, price_data, stop_loss_pct=0.03)
+
+    Rerunning the notebook with one changed parameter (say stop_loss_pct) loads every
+    upstream artifact from the cache and only recomputes the stages downstream of it.
+    """
+
+    FUNCTIONS = {
+        'compute_momentum': (compute_momentum, ()),
+        'compute_mean_reversion': (compute_mean_reversion, ()),
+        'compute_signal_returns': (compute_signal_returns, ()),
+        'generate_signals_momentum': (generate_signals_momentum, ()),
+        'generate_signals_meanreversion': (generate_signals_meanreversion, ()),
+        'generate_final_signal': (generate_final_signal, ('chunk_size',)),
+        'build_strategy_choice_label': (build_strategy_choice_label, ()),
+        'compute_rolling_return_stats': (compute_rolling_return_stats, ()),
+        'build_feature_matrix': (build_feature_matrix, ()),
+        'track_strategy_chosen_signals': (track_strategy_chosen_signals, ('backend',)),
+        'train_strategy_chooser': (train_strategy_chooser, ('n_jobs', 'verbose', 'cache_dir')),
+        'apply_stop_loss': (apply_stop_loss, ('backend',)),
+    }
+
+    def __init__(self, cache_dir="cache/artifacts", max_bytes=2 * 1024 ** 3):
+        self.cache = ArtifactCache(cache_dir, max_bytes=max_bytes)
+        for name, (func, ignore) in self.FUNCTIONS.items():
+            setattr(self, name, memoize(func, self.cache, ignore=ignore))
@@ -0,0 +1,252 @@
+# online.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['momentum_mean', 'zscore_mean', 'rolling_vol', 'rolling_mean_ret']
+
+class RollingMoments:
+    """
+    Rolling mean and sample standard deviation over the last 'window' values of
+    several series at once (one per ticker), updated in O(tickers) per step.
+
+    Keeps a ring buffer of the last 'window' values plus a running count, mean and
+    sum of squared deviations (Welford add/remove). NaN values are skipped, and
+    like pandas' rolling(window) the result is NaN until the window holds
+    'window' valid values.
+    """
+
+    def __init__(self, window, n_series):
+        self.window = window
+        self.buffer = np.full((window, n_series), np.nan)
+        self.pos = 0
+        self.count = np.zeros(n_series)
+        self.mean = np.zeros(n_series)
+        self.m2 = np.zeros(n_series)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+
+        # Remove the value leaving the window
+        old = self.buffer[self.pos]
+        leaving = ~np.isnan(old)
+        count = self.count - leaving
+        delta = np.where(leaving, old - self.mean, 0.0)
+        mean = np.where(count > 0, self.mean - delta / np.maximum(count, 1), 0.0)
+        m2 = np.where(count > 0, self.m2 - delta * (np.where(leaving, old, 0.0) - mean), 0.0)
+
+        # Add the new value
+        entering = ~np.isnan(x)
+        count = count + entering
+        delta = np.where(entering, x - mean, 0.0)
+        mean = mean + delta / np.maximum(count, 1)
+        m2 = m2 + delta * (np.where(entering, x, 0.0) - mean)
+
+        self.count, self.mean, self.m2 = count, mean, np.maximum(m2, 0.0)
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+
+    def refresh(self):
+        # Recompute exactly from the buffer, dropping accumulated rounding drift
+        valid = ~np.isnan(self.buffer)
+        self.count = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(self.count > 0, np.nansum(self.buffer, axis=0) / self.count, 0.0)
+            self.m2 = np.nansum(np.where(valid, (self.buffer - self.mean) ** 2, 0.0), axis=0)
+
+    def result(self):
+        """
+        Returns (mean, std), NaN where the window is not full of valid values.
+        """
+        full = self.count == self.window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        return np.where(full, self.mean, np.nan), np.where(full, std, np.nan)
+
+    def state(self):
+        return {'buffer': self.buffer, 'pos': self.pos, 'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls(state['buffer'].shape[0], state['buffer'].shape[1])
+        moments.buffer = state['buffer'].copy()
+        moments.pos = int(state['pos'])
+        moments.count = state['count'].copy()
+        moments.mean = state['mean'].copy()
+        moments.m2 = state['m2'].copy()
+        return moments
+
+class OnlineIndicatorEngine:
+    """
+    Streaming version of compute_momentum, compute_mean_reversion, build_feature_matrix
+    and the two signal generators, for daily production runs: each new price bar is
+    folded into O(window) per-ticker state in O(tickers) time instead of recomputing
+    the whole history. Outputs match the batch functions to floating-point tolerance.
+
+    Usage:
+        engine = OnlineIndicatorEngine.from_history(price_data, momentum_window=63)
+        row = engine.update(date, todays_prices)   # Series indexed by ticker
+        signals = engine.final_signal(clf)
+        engine.save("state.npz"); engine = OnlineIndicatorEngine.load("state.npz")
+    """
+
+    # Recompute rolling moments from their buffers this often, to bound rounding drift
+    refresh_every = 1000
+
+    def __init__(self, tickers, momentum_window=126, z_window=20, vol_window=20, threshold=0.05, z_entry=1.0):
+        self.tickers = list(tickers)
+        self.params = {
+            'momentum_window': momentum_window,
+            'z_window': z_window,
+            'vol_window': vol_window,
+            'threshold': threshold,
+            'z_entry': z_entry,
+        }
+        n = len(self.tickers)
+
+        # Lagged forward-filled prices for momentum (pct_change with fill_method='pad')
+        self.lagged_prices = np.full((momentum_window + 1, n), np.nan)
+        self.lag_pos = 0
+        self.last_price = np.full(n, np.nan)
+
+        self.price_moments = RollingMoments(z_window, n)
+        self.return_moments = RollingMoments(vol_window, n)
+
+        self.last_features = np.full(len(FEATURE_COLUMNS), np.nan)
+        self.last_date = None
+        self.n_updates = 0
+        self.latest = None
+
+    @classmethod
+    def from_history(cls, price_data, **params):
+        """
+        Builds an engine and warms it up on every row of 'price_data'.
+        """
+        engine = cls(price_data.columns, **params)
+        for date, values in zip(price_data.index, price_data.to_numpy(dtype=np.float64)):
+            engine.update(date, values)
+        return engine
+
+    def update(self, date, prices):
+        """
+        Folds one bar into the state. 'prices' is a Series indexed by ticker
+        (missing tickers count as NaN) or an array in self.tickers order.
+
+        Returns a dict with this bar's 'momentum', 'zscore', 'momentum_signal' and
+        'meanrev_signal' (Series by ticker) and 'features' (Series, as one row of
+        build_feature_matrix).
+        """
+        if isinstance(prices, pd.Series):
+            prices = prices.reindex(self.tickers)
+        x = np.asarray(prices, dtype=np.float64)
+        p = self.params
+
+        # Forward-filled price and one-day return (build_feature_matrix's daily returns)
+        filled = np.where(np.isnan(x), self.last_price, x)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily_return = filled / self.last_price - 1
+        self.last_price = filled
+
+        # Momentum: filled price vs. the filled price momentum_window bars ago
+        self.lagged_prices[self.lag_pos] = filled
+        lagged = self.lagged_prices[(self.lag_pos + 1) % len(self.lagged_prices)]
+        self.lag_pos = (self.lag_pos + 1) % len(self.lagged_prices)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            momentum = filled / lagged - 1
+
+        # Z-score of the raw price against its rolling mean/std
+        self.price_moments.update(x)
+        self.return_moments.update(daily_return)
+        self.n_updates += 1
+        if self.n_updates % self.refresh_every == 0:
+            self.price_moments.refresh()
+            self.return_moments.refresh()
+
+        rolling_mean, rolling_std = self.price_moments.result()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            zscore = (x - rolling_mean) / rolling_std
+        return_mean, return_std = self.return_moments.result()
+
+        features = np.array([
+            _nanmean(momentum),
+            _nanmean(zscore),
+            _nanmean(return_std),
+            _nanmean(return_mean),
+        ])
+        # generate_final_signal forward-fills missing feature values
+        self.last_features = np.where(np.isnan(features), self.last_features, features)
+
+        # int8 {-1, 0, +1}, as generate_signals_momentum / generate_signals_meanreversion
+        momentum_signal = (momentum > p['threshold']).astype(np.int8) - (momentum < -p['threshold']).astype(np.int8)
+        meanrev_signal = (zscore < -p['z_entry']).astype(np.int8) - (zscore > p['z_entry']).astype(np.int8)
+
+        self.last_date = date
+        self.latest = {
+            'momentum': pd.Series(momentum, index=self.tickers, name=date),
+            'zscore': pd.Series(zscore, index=self.tickers, name=date),
+            'momentum_signal': pd.Series(momentum_signal, index=self.tickers, name=date),
+            'meanrev_signal': pd.Series(meanrev_signal, index=self.tickers, name=date),
+            'features': pd.Series(features, index=FEATURE_COLUMNS, name=date),
+        }
+        return self.latest
+
+    def final_signal(self, clf):
+        """
+        generate_final_signal for the latest bar: momentum signals if clf predicts 1,
+        mean-reversion signals if it predicts 0.
+        """
+        X = pd.DataFrame([self.last_features], columns=FEATURE_COLUMNS, index=[self.last_date])
+        if clf.predict(X)[0] == 0:
+            return self.latest['meanrev_signal']
+        return self.latest['momentum_signal']
+
+    def save(self, path):
+        """
+        Checkpoints the engine state to a .npz file.
+        """
+        arrays = {
+            'lagged_prices': self.lagged_prices,
+            'last_price': self.last_price,
+            'last_features': self.last_features,
+        }
+        for prefix, moments in (('price', self.price_moments), ('return', self.return_moments)):
+            for key, value in moments.state().items():
+                arrays[f"{prefix}_{key}"] = np.asarray(value)
+        meta = {
+            'tickers': self.tickers,
+            'params': self.params,
+            'lag_pos': self.lag_pos,
+            'n_updates': self.n_updates,
+            'last_date': None if self.last_date is None else pd.Timestamp(self.last_date).isoformat(),
+        }
+        with open(path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restores an engine saved with save(). The per-bar outputs of the last update are
+        not stored; final_signal needs one update() after loading.
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            engine = cls(meta['tickers'], **meta['params'])
+            engine.lagged_prices = data['lagged_prices'].copy()
+            engine.last_price = data['last_price'].copy()
+            engine.last_features = data['last_features'].copy()
+            for prefix, attr in (('price', 'price_moments'), ('return', 'return_moments')):
+                state = {key: data[f"{prefix}_{key}"] for key in ('buffer', 'pos', 'count', 'mean', 'm2')}
+                setattr(engine, attr, RollingMoments.from_state(state))
+        engine.lag_pos = meta['lag_pos']
+        engine.n_updates = meta['n_updates']
+        engine.last_date = None if meta['last_date'] is None else pd.Timestamp(meta['last_date'])
+        return engine
+
+def _nanmean(values):
+    # Mean across tickers, skipping NaN (DataFrame.mean(axis=1)); NaN if all are missing
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.nan
+    return values[valid].mean()
@@ -0,0 +1,143 @@
+# prediction.py
+
+import hashlib
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from functions.profiling import profiled
+
+@profiled
+def batched_predict_proba(clf, X, chunk_size=None):
+    """
+    clf.predict_proba over the rows of X, 'chunk_size' rows at a time (all at once if
+    None), written into one preallocated (rows x classes) array so the classifier's
+    per-call temporaries stay bounded on very large feature frames.
+    """
+    n_rows = len(X)
+    if chunk_size is None or n_rows <= chunk_size:
+        return np.asarray(clf.predict_proba(X), dtype=np.float64)
+
+    proba = np.empty((n_rows, len(clf.classes_)), dtype=np.float64)
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        proba[start:stop] = clf.predict_proba(X.iloc[start:stop])
+    return proba
+
+def prepare_features(features):
+    """
+    The feature matrix the chooser is evaluated on: gaps are forward-filled from the
+    previous day (what generate_final_signal has always done), leading gaps stay NaN.
+    """
+    return features.ffill().replace({None: 0})
+
+def _model_state(clf):
+    # Identity (and length, for lists grown in place by warm_start) of the fitted
+    # attributes: refitting replaces or grows them, which invalidates cached entries
+    return tuple(
+        (name, id(value), len(value) if isinstance(value, list) else None)
+        for name, value in sorted(vars(clf).items())
+        if name.endswith('_') and not name.startswith('__')
+    )
+
+def _features_key(features):
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(features, index=True).values.tobytes())
+    h.update(repr(list(features.columns)).encode())
+    return h.hexdigest()
+
+class ChooserPredictions:
+    """
+    Prediction service around a fitted strategy chooser: one batched predict_proba per
+    feature matrix, cached, so generate_final_signal, count_strategy_choices and any
+    other consumer read the same probabilities instead of each re-running the model on
+    its own copy of the features.
+
+    The service only holds a weak reference to 'clf', so it never keeps a model (or
+    the probabilities cached for it) alive on its own.
+
+    Probabilities are computed on prepare_features(features) and cached by the content
+    hash of 'features' and the state of the fitted model, so refitting the model (also
+    in place, as sklearn's fit does) recomputes them. The last 'max_entries' matrices
+    are kept. Class predictions are the argmax of the probabilities, which is how
+    sklearn classifiers predict.
+
+    Usage:
+        chooser = chooser_predictions(clf)      # shared per fitted model
+        p_momentum = chooser.momentum_probability(features)
+        signals = generate_final_signal(chooser, features, momentum_signals, meanrev_signals)
+    """
+
+    def __init__(self, clf, chunk_size=None, max_entries=8):
+        """
+        chunk_size:  rows per predict_proba call (None: the whole matrix at once)
+        max_entries: number of feature matrices whose probabilities are kept
+        """
+        self._clf_ref = weakref.ref(clf)
+        self.chunk_size = chunk_size
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+
+    @property
+    def clf(self):
+        clf = self._clf_ref()
+        if clf is None:
+            raise ReferenceError("The model of this ChooserPredictions has been garbage collected.")
+        return clf
+
+    def predict_proba(self, features):
+        """
+        DataFrame of class probabilities (index=features.index, columns=classes_).
+        """
+        clf = self.clf
+        key = (_model_state(clf), _features_key(features))
+        proba = self._cache.get(key)
+        if proba is None:
+            proba = batched_predict_proba(clf, prepare_features(features), self.chunk_size)
+            proba = pd.DataFrame(proba, index=features.index, columns=np.asarray(clf.classes_))
+            self._cache[key] = proba
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return proba
+
+    def predict(self, features):
+        """
+        Series of predicted classes (1 = momentum, 0 = mean reversion) per day.
+        """
+        proba = self.predict_proba(features)
+        return pd.Series(proba.columns.to_numpy()[proba.to_numpy().argmax(axis=1)], index=proba.index)
+
+    def momentum_probability(self, features):
+        """
+        Series of P(momentum) per day; 0 if the classifier never saw class 1.
+        """
+        proba = self.predict_proba(features)
+        if 1 not in proba.columns:
+            return pd.Series(0.0, index=proba.index)
+        return proba[1]
+
+    def clear(self):
+        self._cache.clear()
+
+# One shared service per fitted model, dropped with the model
+_services = weakref.WeakKeyDictionary()
+
+def chooser_predictions(clf, chunk_size=None):
+    """
+    Returns the ChooserPredictions shared by every consumer of 'clf' (created on first
+    use). A ChooserPredictions passed in is returned as is, so functions can accept
+    either a fitted classifier or a service.
+    """
+    if isinstance(clf, ChooserPredictions):
+        return clf
+    service = _services.get(clf)
+    if service is None:
+        service = ChooserPredictions(clf, chunk_size=chunk_size)
+        _services[clf] = service
+    elif chunk_size is not None:
+        service.chunk_size = chunk_size
+    return service
@@ -0,0 +1,223 @@
+# price_store.py
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# A price store is either
+#   - a directory of memory-mapped NumPy files (default, no extra dependencies):
+#       index.npy    datetime64[ns] dates
+#       prices.npy   float64 (dates x tickers), column-major so each ticker is contiguous
+#       meta.json    column names, index name and covered date range
+#   - a single '.parquet' file (needs pyarrow), read with column projection.
+#
+# The covered range [start, end) records which dates have already been requested,
+# so ranges that returned no bars (holidays, before a listing) are not fetched again.
+# Tickers whose download failed inside that range are recorded with the range they
+# are still missing, so they are requested again instead of staying empty.
+
+def is_parquet_store(path):
+    return str(path).endswith('.parquet')
+
+def price_store_exists(path):
+    """
+    True if a price store has been written at 'path'.
+    """
+    if is_parquet_store(path):
+        return os.path.isfile(path)
+    return os.path.isfile(os.path.join(path, 'prices.npy'))
+
+def save_price_store(price_data, path, coverage=None, missing=None):
+    """
+    Writes a DataFrame of prices (index=dates, columns=tickers) to the store at 'path'.
+    The new store is written next to the old one and swapped in, so an interrupted
+    write never leaves a half-written store behind.
+
+    coverage : optional (start, end) date range the data was requested for, end exclusive.
+               Defaults to the first date up to the day after the last date.
+    missing : optional {ticker: (start, end)} of ranges inside the coverage that failed
+              to download for that ticker (see price_store_missing).
+    """
+    price_data = price_data.sort_index()
+    if coverage is None:
+        coverage = _default_coverage(price_data.index)
+    coverage = [None if d is None else pd.Timestamp(d).isoformat() for d in coverage]
+    missing = {str(t): [pd.Timestamp(d).isoformat() for d in r] for t, r in (missing or {}).items()}
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+
+    if is_parquet_store(path):
+        frame = price_data.astype(np.float64)
+        frame.columns = frame.columns.astype(str)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'price_store'] = json.dumps({'coverage': coverage, 'missing': missing}).encode()
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, path)
+        return
+
+    os.makedirs(tmp_path)
+    index = pd.DatetimeIndex(price_data.index).as_unit('ns').values
+    np.save(os.path.join(tmp_path, 'index.npy'), index)
+    np.save(os.path.join(tmp_path, 'prices.npy'), np.asfortranarray(price_data.to_numpy(dtype=np.float64)))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({
+            'tickers': [str(c) for c in price_data.columns],
+            'index_name': price_data.index.name,
+            'coverage': coverage,
+            'missing': missing,
+        }, f)
+
+    # Swap directories: old -> backup, new -> path, then drop the backup
+    backup_path = None
+    if os.path.exists(path):
+        backup_path = f"{path}.old-{uuid.uuid4().hex}"
+        os.rename(path, backup_path)
+    os.rename(tmp_path, path)
+    if backup_path is not None:
+        shutil.rmtree(backup_path)
+
+def price_store_info(path):
+    """
+    Returns (dates, tickers) of the store without reading any prices.
+    """
+    if is_parquet_store(path):
+        import pyarrow.parquet as pq
+
+        # Row index is stored as its own column; read just that one
+        schema = pq.read_schema(path)
+        index_name = json.loads(schema.metadata[b'pandas'])['index_columns'][0]
+        dates = pd.DatetimeIndex(pq.read_table(path, columns=[index_name]).column(0).to_pandas())
+        tickers = [name for name in schema.names if name != index_name]
+        return dates, tickers
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    dates = pd.DatetimeIndex(np.load(os.path.join(path, 'index.npy')), name=meta['index_name'])
+    return dates, meta['tickers']
+
+def _store_metadata(path):
+    if is_parquet_store(path):
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata.get(b'price_store', b'{}'))
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)
+
+def price_store_coverage(path):
+    """
+    Returns the (start, end) date range the store has been requested for, end exclusive.
+    """
+    coverage = _store_metadata(path).get('coverage')
+    if not coverage or coverage[0] is None:
+        dates, _ = price_store_info(path)
+        return _default_coverage(dates)
+    return pd.Timestamp(coverage[0]), pd.Timestamp(coverage[1])
+
+def price_store_missing(path):
+    """
+    Returns {ticker: (start, end)}: the range (end exclusive) each ticker still lacks
+    because its download failed. Empty for stores written without this record.
+    """
+    missing = _store_metadata(path).get('missing') or {}
+    return {t: (pd.Timestamp(r[0]), pd.Timestamp(r[1])) for t, r in missing.items()}
+
+def _default_coverage(dates):
+    if len(dates) == 0:
+        return None, None
+    return dates.min(), dates.max() + pd.Timedelta(days=1)
+
+def load_price_store(path, tickers=None, start=None, end=None, copy=True):
+    """
+    Loads prices from the store at 'path'.
+
+    tickers : optional list of columns to read; only those columns are touched on disk.
+              Tickers missing from the store are ignored.
+    start, end : optional date bounds (inclusive), like DataFrame.loc[start:end].
+    copy : if False (NumPy store only), the DataFrame is a read-only view over the
+           memory-mapped file instead of an in-memory copy (zero-copy load).
+    """
+    if is_parquet_store(path):
+        columns = None
+        if tickers is not None:
+            _, stored = price_store_info(path)
+            stored = set(stored)
+            columns = [t for t in tickers if t in stored]
+        return pd.read_parquet(path, columns=columns).loc[start:end]
+
+    dates, stored = price_store_info(path)
+    position = {t: i for i, t in enumerate(stored)}
+    if tickers is None:
+        columns = list(stored)
+    else:
+        columns = [t for t in tickers if t in position]
+
+    # Row bounds from the sorted date index
+    row_start = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+    row_end = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+
+    prices = np.load(os.path.join(path, 'prices.npy'), mmap_mode='r')
+    if tickers is None:
+        # Plain slice: a view over the mapped file
+        values = prices[row_start:row_end]
+    else:
+        # Column-major layout, so this reads only the requested tickers' pages
+        values = prices[row_start:row_end, [position[t] for t in columns]]
+    if copy:
+        values = np.array(values)
+
+    return pd.DataFrame(values, index=dates[row_start:row_end], columns=pd.Index(columns, dtype=object), copy=False)
+
+def iter_price_store(path, chunk_size=10000, tickers=None, start=None, end=None):
+    """
+    Yields the prices of the store at 'path' as consecutive DataFrames of at most
+    'chunk_size' rows, in date order, without loading the whole panel: the NumPy store
+    is sliced from its memory map, a Parquet store is read batch by batch.
+
+    tickers, start, end : as in load_price_store.
+    """
+    if is_parquet_store(path):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        index_name = json.loads(parquet.schema_arrow.metadata[b'pandas'])['index_columns'][0]
+        columns = None
+        if tickers is not None:
+            stored = set(parquet.schema_arrow.names)
+            columns = [t for t in tickers if t in stored] + [index_name]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            chunk = batch.to_pandas()
+            if index_name in chunk.columns:
+                chunk = chunk.set_index(index_name)
+            if columns is not None:
+                chunk = chunk[columns[:-1]]
+            chunk = chunk.loc[start:end]
+            if len(chunk):
+                yield chunk
+        return
+
+    dates, _ = price_store_info(path)
+    row_start = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+    row_end = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+    for first in range(row_start, row_end, chunk_size):
+        last = dates[min(first + chunk_size, row_end) - 1]
+        yield load_price_store(path, tickers=tickers, start=dates[first], end=last)
+
+def migrate_csv_to_price_store(data_csv, path):
+    """
+    One-time migration of a cached price CSV (e.g. data/SPY_500_data.csv) into a price store.
+    Returns the migrated DataFrame.
+    """
+    price_data = pd.read_csv(data_csv, index_col=0, parse_dates=True)
+    save_price_store(price_data, path)
+    print(f"Migrated {data_csv} to price store {path}")
+    return price_data
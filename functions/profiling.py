@@ -0,0 +1,297 @@
+# profiling.py
+
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# The Profiler currently recording, if any. Pipeline functions decorated with
+# @profiled only check this and call straight through when it is None.
+_active = None
+
+RECORD_COLUMNS = ['run', 'stage', 'path', 'depth', 'wall_s', 'cpu_s', 'peak_mem_bytes', 'shapes']
+
+class Profiler:
+    """
+    Records wall time, CPU time, peak memory and input shapes of each pipeline stage
+    (every function decorated with @profiled, plus explicit profiler.stage(...) blocks).
+
+    Usage:
+        with Profiler() as profiler:
+            with profiler.run("sim 0"):
+                ...pipeline calls...
+        print(profiler.flame_summary())
+        profiler.to_csv("profile.csv")
+
+    Stages called from inside other stages are recorded with their full path
+    ("precompute_universe;compute_momentum"), so nested time is not double counted in
+    the flame summary. Records from several runs (e.g. simulations) are aggregated by
+    summary().
+
+    memory: trace peak memory with tracemalloc (Python and NumPy allocations). Tracing
+            slows allocation-heavy code down, so it can be turned off; peak_mem_bytes
+            is then NaN.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+        self._stack = []
+        self._run = None
+        self._previous = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """
+        Makes this the active profiler.
+        """
+        global _active
+        self._previous, _active = _active, self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        global _active
+        _active = self._previous
+        self._previous = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def run(self, label):
+        """
+        Tags the stages recorded inside the block with 'label' (e.g. a simulation number).
+        """
+        previous, self._run = self._run, label
+        try:
+            yield self
+        finally:
+            self._run = previous
+
+    @contextmanager
+    def stage(self, name, *inputs):
+        """
+        Records the block as a stage called 'name'; 'inputs' are only used for their shapes.
+        """
+        self._enter(name, inputs)
+        try:
+            yield self
+        finally:
+            self._exit()
+
+    def _enter(self, name, inputs):
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the enclosing stage's peak so far before resetting it for this one
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+        self._stack.append({
+            'name': name,
+            'shapes': _shapes(inputs),
+            'mem_start': current,
+            'peak': current,
+            'tracing': tracing,
+            'cpu_start': time.process_time(),
+            'wall_start': time.perf_counter(),
+        })
+
+    def _exit(self):
+        wall_end = time.perf_counter()
+        cpu_end = time.process_time()
+        frame = self._stack.pop()
+
+        peak_mem = float('nan')
+        if frame['tracing'] and tracemalloc.is_tracing():
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            peak_mem = peak - frame['mem_start']
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+        path = ";".join([f['name'] for f in self._stack] + [frame['name']])
+        self.records.append({
+            'run': self._run,
+            'stage': frame['name'],
+            'path': path,
+            'depth': len(self._stack),
+            'wall_s': wall_end - frame['wall_start'],
+            'cpu_s': cpu_end - frame['cpu_start'],
+            'peak_mem_bytes': peak_mem,
+            'shapes': frame['shapes'],
+        })
+
+    def merge(self, records, run=None):
+        """
+        Adds records from another profiler (e.g. one in a worker process).
+        'run' overrides their run label when given.
+        """
+        for record in records:
+            record = dict(record)
+            if run is not None:
+                record['run'] = run
+            self.records.append(record)
+
+    def to_frame(self):
+        """
+        One row per recorded call: run, stage, path, depth, wall_s, cpu_s, peak_mem_bytes, shapes.
+        """
+        return pd.DataFrame(self.records, columns=RECORD_COLUMNS)
+
+    def summary(self):
+        """
+        Aggregates the calls by stage path across runs: number of calls and runs,
+        total/mean/max wall time, total CPU time, max peak memory and the input shapes
+        seen. Sorted by total wall time.
+        """
+        frame = self.to_frame()
+        if frame.empty:
+            return pd.DataFrame(columns=['path', 'stage', 'depth', 'calls', 'runs', 'wall_total_s', 'wall_mean_s',
+                                         'wall_max_s', 'cpu_total_s', 'peak_mem_max_bytes', 'shapes'])
+        frame['run'] = frame['run'].astype(object).where(frame['run'].notna(), '')
+        grouped = frame.groupby('path', sort=False)
+        summary = pd.DataFrame({
+            'stage': grouped['stage'].first(),
+            'depth': grouped['depth'].first(),
+            'calls': grouped.size(),
+            'runs': grouped['run'].nunique(),
+            'wall_total_s': grouped['wall_s'].sum(),
+            'wall_mean_s': grouped['wall_s'].mean(),
+            'wall_max_s': grouped['wall_s'].max(),
+            'cpu_total_s': grouped['cpu_s'].sum(),
+            'peak_mem_max_bytes': grouped['peak_mem_bytes'].max(),
+            'shapes': grouped['shapes'].agg(lambda s: sorted(set(s))),
+        })
+        return summary.sort_values('wall_total_s', ascending=False).reset_index()
+
+    def to_json(self, path):
+        """
+        Writes the raw records and the aggregated summary to a JSON file.
+        """
+        summary = self.summary().astype(object)
+        summary = summary.where(summary.notna(), None)
+        records = [
+            {k: None if isinstance(v, float) and v != v else v for k, v in record.items()}
+            for record in self.records
+        ]
+        with open(path, 'w') as f:
+            json.dump({'records': records, 'summary': summary.to_dict(orient='records')}, f, indent=2, default=str)
+
+    def to_csv(self, path, aggregate=True):
+        """
+        Writes the summary (aggregate=True) or the raw per-call records to a CSV file.
+        """
+        frame = self.summary() if aggregate else self.to_frame()
+        frame.to_csv(path, index=False)
+
+    def collapsed_stacks(self):
+        """
+        Self time per stage path in the "folded" format read by flamegraph.pl and
+        speedscope: one "outer;inner <microseconds>" line per path.
+        """
+        totals = self._self_times()
+        return "\n".join(f"{path} {int(round(seconds * 1e6))}" for path, seconds in totals.items())
+
+    def flame_summary(self, width=40):
+        """
+        Text flame view: the stage tree with total wall time, share of the profiled
+        time and a bar, children indented under their callers.
+        """
+        summary = self.summary()
+        if summary.empty:
+            return "(no stages recorded)"
+        totals = dict(zip(summary['path'], summary['wall_total_s']))
+        calls = dict(zip(summary['path'], summary['calls']))
+        root_total = sum(t for p, t in totals.items() if ';' not in p) or 1.0
+
+        def children(parent):
+            prefix = parent + ';' if parent else ''
+            depth = parent.count(';') + 1 if parent else 0
+            kids = [p for p in totals if p.startswith(prefix) and p.count(';') == depth]
+            return sorted(kids, key=totals.get, reverse=True)
+
+        lines = []
+        def walk(path):
+            share = totals[path] / root_total
+            name = path.rsplit(';', 1)[-1]
+            indent = '  ' * path.count(';')
+            bar = '#' * max(1, int(round(share * width)))
+            lines.append(f"{indent + name:<45} {totals[path]:10.4f} s {share:7.1%} x{calls[path]:<5} {bar}")
+            for child in children(path):
+                walk(child)
+
+        for root in children(''):
+            walk(root)
+        return "\n".join(lines)
+
+    def _self_times(self):
+        # Wall time of each path minus the time spent in its direct children
+        totals = {}
+        for record in self.records:
+            totals[record['path']] = totals.get(record['path'], 0.0) + record['wall_s']
+        self_times = dict(totals)
+        for path, seconds in totals.items():
+            if ';' in path:
+                parent = path.rsplit(';', 1)[0]
+                if parent in self_times:
+                    self_times[parent] -= seconds
+        return {path: max(seconds, 0.0) for path, seconds in self_times.items()}
+
+def _shapes(inputs):
+    # Shapes of the array-like inputs, e.g. "(2500, 500),(2500,)"
+    shapes = [str(tuple(value.shape)) for value in inputs if hasattr(value, 'shape')]
+    return ",".join(shapes)
+
+def active_profiler():
+    """
+    Returns the Profiler currently recording, or None.
+    """
+    return _active
+
+def profiled(func=None, name=None):
+    """
+    Decorator that records each call of a pipeline function as a stage of the active
+    Profiler. With no active profiler the call goes straight through (one global check).
+    """
+    if func is None:
+        return functools.partial(profiled, name=name)
+    stage_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return func(*args, **kwargs)
+        profiler._enter(stage_name, args)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler._exit()
+
+    return wrapper
+
+@contextmanager
+def stage(name, *inputs):
+    """
+    Records the block as a stage of the active Profiler; does nothing when none is active.
+    """
+    profiler = _active
+    if profiler is None:
+        yield None
+        return
+    with profiler.stage(name, *inputs):
+        yield profiler
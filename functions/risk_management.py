@@ -1,58 +1,153 @@
 # risk_management.py
 
-def apply_stop_loss(final_signals, price_data, stop_loss_pct=0.05):
+import numpy as np
+import pandas as pd
+
+from functions.computing import panel_dtype
+from functions.profiling import profiled
+
+# numba is optional (the NumPy backend is always available) and is only imported when
+# the 'numba' backend is first used
+_numba_kernel = None
+
+@profiled
+def apply_stop_loss(final_signals, price_data, stop_loss_pct=0.05, backend='numpy'):
     """
     Applies a daily stop-loss rule to the existing final_signals:
       - If a long position loses more than stop_loss_pct, we close it that day (signal=0).
       - If a short position loses more than stop_loss_pct, we close it that day (signal=0).
-    
+
     final_signals : DataFrame of {-1,0,+1}, index=dates, columns=tickers
     price_data    : DataFrame of prices, same shape or superset
     stop_loss_pct : e.g. 0.05 for 5% max adverse move
-    
-    Returns a modified copy of final_signals with stop-loss enforced.
+    backend       : 'numpy' (vectorized across tickers) or 'numba' (compiled loop, needs numba)
+
+    Returns a modified copy of final_signals with stop-loss enforced, in the same dtype.
+    Integer (e.g. int8) signals are processed as they are, without a float64 copy.
     """
-    signals_sl = final_signals.copy()
-    prices = price_data.reindex(signals_sl.index, columns=signals_sl.columns).ffill()
+    prices = price_data.reindex(final_signals.index, columns=final_signals.columns).ffill()
+
+    # Ensure dates are in ascending order
+    order = np.argsort(final_signals.index.values, kind='stable')
+
+    sig = final_signals.to_numpy(dtype=_signal_dtype(final_signals.dtypes))[order]
+    # float32 prices are used as they are: entry prices are kept in float64, so the
+    # stop levels are the same as for the float64 copy of the prices
+    px  = prices.to_numpy(dtype=panel_dtype(prices))[order]
+
+    if backend == 'numpy':
+        _stop_loss_numpy(sig, px, stop_loss_pct)
+    elif backend == 'numba':
+        _get_numba_kernel()(sig, px, stop_loss_pct)
+    else:
+        raise ValueError(f"Unknown stop-loss backend: {backend!r}")
+
+    # Write the stopped-out cells back in the original row order
+    values = np.empty_like(sig)
+    values[order] = sig
+    signals_sl = pd.DataFrame(values, index=final_signals.index, columns=final_signals.columns)
+
+    return signals_sl.astype(final_signals.dtypes)
+
+def apply_stop_loss_array(signals, prices, stop_loss_pct=0.05, state=None):
+    """
+    apply_stop_loss on plain arrays: 'signals' and forward-filled 'prices' are
+    (dates x columns) arrays in ascending date order. 'stop_loss_pct' may be a scalar
+    or one value per column, so several signal variants stacked side by side
+    (e.g. a parameter sweep) are stopped out in a single pass.
+
+    state: optional dict to resume from and update in place (entry_price, entry_side,
+           prev_signal), so consecutive chunks of one long history can be processed
+           one after another with the same result as a single call. Start with {}.
+
+    Returns a stopped-out copy of 'signals', int8/integer signals keep their dtype,
+    anything else is returned as float64.
+    """
+    sig = np.array(signals, dtype=_signal_dtype([np.asarray(signals).dtype]))
+    _stop_loss_numpy(sig, np.asarray(prices, dtype=np.float64), np.asarray(stop_loss_pct, dtype=np.float64), state)
+    return sig
+
+def _signal_dtype(dtypes):
+    # One integer dtype (e.g. int8 signals) is kept; mixed or float signals run as float64
+    dtypes = set(dtypes)
+    if len(dtypes) == 1:
+        dtype = dtypes.pop()
+        if isinstance(dtype, np.dtype) and np.issubdtype(dtype, np.integer):
+            return dtype
+    return np.float64
+
+def _stop_loss_numpy(sig, px, stop_loss_pct, state=None):
+    """
+    Walks the (dates x tickers) arrays one date at a time, vectorized across tickers.
+    'sig' is modified in place; 'state' (see apply_stop_loss_array) is resumed and updated.
+    """
+    n_tickers = sig.shape[1]
 
     # Store the entry price + side for each ticker
-    entry_price = {}
-    entry_side  = {}
+    if state:
+        entry_price = state['entry_price']
+        entry_side  = state['entry_side']
+        prev_signal = state['prev_signal']
+    else:
+        entry_price = np.full(n_tickers, np.nan)
+        entry_side  = np.zeros(n_tickers)
+        prev_signal = np.zeros(n_tickers)
 
-    # Ensure dates are in ascending order
-    dates = signals_sl.index.sort_values()
-
-    for i, date in enumerate(dates):
-        row_signals = signals_sl.loc[date]
-
-        for ticker, signal in row_signals.items():
-            px = prices.at[date, ticker]
-
-            # Look at the previous day's signal for that ticker
-            if i > 0:
-                prev_signal = signals_sl[ticker].iloc[i-1]
-            else:
-                prev_signal = 0
-
-            # Check if a new position was opened today
-            if signal != 0 and prev_signal == 0:
-                # record entry
-                entry_price[ticker] = px
-                entry_side[ticker]  = signal
-
-            # If we are still in a position, check stop-loss
-            if signal != 0:
-                side = entry_side.get(ticker, signal)
-                ep   = entry_price.get(ticker, px)
-
-                # If we're long, and px <= ep*(1 - stop_loss_pct), close
-                if side == 1 and px <= ep * (1 - stop_loss_pct):
-                    signals_sl.at[date, ticker] = 0
-                # If we're short, and px >= ep*(1 + stop_loss_pct), close
-                elif side == -1 and px >= ep * (1 + stop_loss_pct):
-                    signals_sl.at[date, ticker] = 0
-
-            # If signal == 0, that means we’re not holding a position now
-            # so next day, if we reopen, new entry price will be recorded.
-    
-    return signals_sl
+    long_mult  = 1 - stop_loss_pct
+    short_mult = 1 + stop_loss_pct
+
+    for i in range(sig.shape[0]):
+        signal = sig[i]
+        row_px = px[i]
+        in_position = signal != 0
+
+        # Record entry for positions opened today
+        opened = in_position & (prev_signal == 0)
+        entry_price[opened] = row_px[opened]
+        entry_side[opened]  = signal[opened]
+
+        # Close longs below ep*(1 - stop_loss_pct) and shorts above ep*(1 + stop_loss_pct)
+        stopped = in_position & (
+            ((entry_side == 1) & (row_px <= entry_price * long_mult)) |
+            ((entry_side == -1) & (row_px >= entry_price * short_mult))
+        )
+        signal[stopped] = 0
+
+        # The (possibly stopped-out) row is tomorrow's previous signal
+        prev_signal = signal
+
+    if state is not None:
+        state.update(entry_price=entry_price, entry_side=entry_side, prev_signal=np.array(prev_signal))
+
+def _stop_loss_loop(sig, px, stop_loss_pct):
+    """
+    Scalar version of _stop_loss_numpy, compiled by numba for the 'numba' backend.
+    """
+    n_dates, n_tickers = sig.shape
+    entry_price = np.full(n_tickers, np.nan)
+    entry_side  = np.zeros(n_tickers)
+
+    for i in range(n_dates):
+        for j in range(n_tickers):
+            signal = sig[i, j]
+            if signal == 0:
+                continue
+
+            if i == 0 or sig[i - 1, j] == 0:
+                entry_price[j] = px[i, j]
+                entry_side[j]  = signal
+
+            if entry_side[j] == 1 and px[i, j] <= entry_price[j] * (1 - stop_loss_pct):
+                sig[i, j] = 0
+            elif entry_side[j] == -1 and px[i, j] >= entry_price[j] * (1 + stop_loss_pct):
+                sig[i, j] = 0
+
+def _get_numba_kernel():
+    global _numba_kernel
+    if _numba_kernel is None:
+        try:
+            import numba
+        except ImportError:
+            raise ImportError("The 'numba' stop-loss backend requires numba to be installed.") from None
+        _numba_kernel = numba.njit(cache=True)(_stop_loss_loop)
+    return _numba_kernel
@@ -0,0 +1,277 @@
+# scheduler.py
+
+import abc
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from functions.analysis import build_trade_log
+from functions.online import OnlineIndicatorEngine
+from functions.price_store import load_price_store, price_store_exists
+from functions.risk_management import apply_stop_loss_array
+
+class PriceFeed(abc.ABC):
+    """
+    Source of daily bars for DailyRunner. Implementations override both coroutines:
+      next_date(after): waits until a bar dated after 'after' (None: the first bar) is
+                        available and returns its date, or None once the feed has ended
+      fetch(ticker, date): that ticker's close on 'date' (NaN if it has none)
+
+    fetch is awaited for every ticker of a day concurrently, each under its own timeout,
+    so a live implementation can query a vendor API per symbol. A fetch that times out
+    or raises OSError (connection errors) or ValueError (a bad payload) marks the ticker
+    as missing for the day; any other exception stops the runner.
+    """
+
+    @abc.abstractmethod
+    async def next_date(self, after):
+        ...
+
+    @abc.abstractmethod
+    async def fetch(self, ticker, date):
+        ...
+
+class ReplayFeed(PriceFeed):
+    """
+    PriceFeed that replays a local price history (a DataFrame, the cached
+    SPY_500_data.csv or a price store path) one trading day at a time, so the daily
+    loop can run offline.
+
+    start:       only dates after 'start' are replayed (earlier ones are the history the
+                 indicators were warmed up on)
+    day_seconds: wall-clock seconds per replayed day (0 = as fast as possible)
+    latency:     simulated seconds per fetch, one value for every ticker or a dict of
+                 {ticker: seconds} (e.g. to exercise the runner's timeouts)
+    """
+
+    def __init__(self, source, start=None, day_seconds=0.0, latency=None):
+        if isinstance(source, pd.DataFrame):
+            data = source
+        elif price_store_exists(source):
+            data = load_price_store(source)
+        else:
+            data = pd.read_csv(source, index_col=0, parse_dates=True)
+        data = data.sort_index()
+        if start is not None:
+            data = data.loc[data.index > pd.Timestamp(start)]
+
+        self.dates = data.index
+        self.values = data.to_numpy(dtype=np.float64)
+        self.columns = {ticker: i for i, ticker in enumerate(data.columns)}
+        self.day_seconds = day_seconds
+        self.latency = latency
+
+    async def next_date(self, after):
+        pos = 0 if after is None else self.dates.searchsorted(pd.Timestamp(after), side='right')
+        if pos >= len(self.dates):
+            return None
+        if self.day_seconds:
+            await asyncio.sleep(self.day_seconds)
+        return self.dates[pos]
+
+    async def fetch(self, ticker, date):
+        latency = self.latency.get(ticker, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            await asyncio.sleep(latency)
+        column = self.columns.get(ticker)
+        if column is None:
+            return np.nan
+        return self.values[self.dates.get_loc(date), column]
+
+class DailyRunner:
+    """
+    Production loop around the pipeline: for every new trading day from a PriceFeed it
+    fetches the bar, folds it into an OnlineIndicatorEngine, picks the strategy with
+    'clf', applies the stop-loss and emits orders (trade-log rows, as build_trade_log).
+
+      - The next day's fetch runs while the current day is computed (in a worker
+        thread), so I/O and computation overlap.
+      - Every ticker is fetched under its own 'fetch_timeout', at most 'max_concurrency'
+        at a time; a ticker that times out or fails is missing (NaN) for that day,
+        which the indicators and stop-loss treat like any other gap.
+      - After each day the engine, the stop-loss positions and the last signals are
+        committed to 'state_dir' in one step (see _save_state), and the orders and a
+        daily report are appended to trade_log.csv and daily_report.csv there. A new
+        runner on the same 'state_dir' resumes after the last processed day.
+
+    Usage:
+        engine = OnlineIndicatorEngine.from_history(history, momentum_window=63)
+        feed = ReplayFeed("data/SPY_500_data.csv", start=history.index[-1])
+        runner = DailyRunner(feed, clf, "state/daily", engine=engine)
+        report = asyncio.run(runner.run())
+
+    'engine' (or 'tickers' and 'indicator_params' for a cold start) is only used when
+    'state_dir' holds no saved state. 'stop_loss_pct' defaults to 0.05 for a new run and
+    to the saved value on resume; a different value raises, since the saved positions
+    were stopped out with the saved one.
+    """
+
+    def __init__(self, feed, clf, state_dir, engine=None, tickers=None, stop_loss_pct=None,
+                 fetch_timeout=5.0, max_concurrency=64, **indicator_params):
+        self.feed = feed
+        self.clf = clf
+        self.state_dir = state_dir
+        self.stop_loss_pct = 0.05 if stop_loss_pct is None else stop_loss_pct
+        self.fetch_timeout = fetch_timeout
+        self.max_concurrency = max_concurrency
+
+        self.version = 0
+        if os.path.isfile(self._path('runner.json')):
+            self._load_state()
+            if stop_loss_pct is not None and stop_loss_pct != self.stop_loss_pct:
+                raise ValueError(f"The state in {state_dir!r} was run with stop_loss_pct={self.stop_loss_pct}, "
+                                 f"not {stop_loss_pct}; resume it with the same value or use a new state_dir.")
+        else:
+            if engine is None:
+                if tickers is None:
+                    raise ValueError("Pass an engine or tickers when there is no saved state to resume.")
+                engine = OnlineIndicatorEngine(tickers, **indicator_params)
+            self.engine = engine
+            self.stop_loss_state = {}
+            self.signals = np.zeros(len(engine.tickers), dtype=np.int8)
+
+    @property
+    def tickers(self):
+        return self.engine.tickers
+
+    @property
+    def last_date(self):
+        return self.engine.last_date
+
+    async def run(self, max_days=None, on_day=None):
+        """
+        Processes new days until the feed ends (or 'max_days' have been processed).
+        on_day: optional callback(report, orders) called after each day.
+        Returns a DataFrame with one report row per processed day.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        reports = []
+
+        async def fetch_next(after):
+            date = await self.feed.next_date(after)
+            if date is None:
+                return None
+            return (date, *await self._fetch_day(date, semaphore))
+
+        pending = asyncio.create_task(fetch_next(self.last_date))
+        try:
+            while max_days is None or len(reports) < max_days:
+                fetched = await pending
+                if fetched is None:
+                    pending = None
+                    break
+                date, prices, failed, fetch_seconds = fetched
+
+                # Prefetch the next day while this one is computed
+                pending = None
+                if max_days is None or len(reports) + 1 < max_days:
+                    pending = asyncio.create_task(fetch_next(date))
+
+                start = time.perf_counter()
+                orders = await asyncio.to_thread(self.process_day, date, prices)
+                report = {
+                    'Date': date,
+                    'Tickers': len(prices),
+                    'Failed': len(failed),
+                    'Failed_Tickers': " ".join(map(str, failed)),
+                    'Orders': len(orders),
+                    'Fetch_Seconds': fetch_seconds,
+                    'Compute_Seconds': time.perf_counter() - start,
+                }
+                self._append_csv('daily_report.csv', pd.DataFrame([report]))
+                reports.append(report)
+                if on_day is not None:
+                    on_day(report, orders)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+        return pd.DataFrame(reports, columns=['Date', 'Tickers', 'Failed', 'Failed_Tickers', 'Orders',
+                                              'Fetch_Seconds', 'Compute_Seconds'])
+
+    async def _fetch_day(self, date, semaphore):
+        # One task per ticker, each with its own timeout; timeouts and I/O or data errors
+        # become NaN, anything else (a bug in the feed) propagates
+        async def fetch_one(ticker):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.feed.fetch(ticker, date), self.fetch_timeout)
+                except (asyncio.TimeoutError, OSError, ValueError):
+                    return None
+
+        start = time.perf_counter()
+        values = await asyncio.gather(*(fetch_one(t) for t in self.tickers))
+        failed = [t for t, v in zip(self.tickers, values) if v is None]
+        prices = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return prices, failed, time.perf_counter() - start
+
+    def process_day(self, date, prices):
+        """
+        Runs one day through the pipeline and persists the state. 'prices' is an array
+        in self.tickers order. Returns the day's orders as trade-log rows.
+        """
+        self.engine.update(date, prices)
+        chosen = self.engine.final_signal(self.clf).to_numpy()
+        filled = self.engine.last_price
+        signals = apply_stop_loss_array(chosen[None], filled[None], self.stop_loss_pct,
+                                        state=self.stop_loss_state)[0]
+
+        # build_trade_log over (yesterday, today): only today's transitions are kept
+        pair = pd.DataFrame(np.vstack([self.signals, signals]), columns=self.tickers)
+        orders = build_trade_log(pair, pd.DataFrame(np.vstack([filled, filled]), columns=self.tickers))
+        orders = orders[orders['Date'] == 1].assign(Date=date).reset_index(drop=True)
+
+        # Orders are written before the state is committed: after a crash in between the
+        # day is processed again and its orders are repeated rather than lost
+        if len(orders):
+            self._append_csv('trade_log.csv', orders)
+        self.signals = signals
+        self._save_state()
+        return orders
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _save_state(self):
+        # Engine and positions go to files of a new version; rewriting runner.json to
+        # point at them commits both at once, so a crash leaves the previous day intact
+        os.makedirs(self.state_dir, exist_ok=True)
+        version = self.version + 1
+        with open(self._path(f'positions-{version}.npz'), 'wb') as f:
+            np.savez(f, signals=self.signals, **{k: np.asarray(v) for k, v in self.stop_loss_state.items()})
+        self.engine.save(self._path(f'engine-{version}.npz'))
+
+        tmp_path = self._path(f'runner.json.tmp-{os.getpid()}')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': version,
+                'last_date': pd.Timestamp(self.last_date).isoformat(),
+                'stop_loss_pct': self.stop_loss_pct,
+            }, f)
+        os.replace(tmp_path, self._path('runner.json'))
+
+        for name in (f'positions-{self.version}.npz', f'engine-{self.version}.npz'):
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+        self.version = version
+
+    def _load_state(self):
+        with open(self._path('runner.json')) as f:
+            saved = json.load(f)
+        self.version = saved['version']
+        self.stop_loss_pct = saved['stop_loss_pct']
+        self.engine = OnlineIndicatorEngine.load(self._path(f'engine-{self.version}.npz'))
+        with np.load(self._path(f'positions-{self.version}.npz')) as data:
+            self.signals = data['signals'].copy()
+            self.stop_loss_state = {k: data[k].copy() for k in ('entry_price', 'entry_side', 'prev_signal') if k in data}
+
+    def _append_csv(self, name, frame):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._path(name)
+        frame.to_csv(path, mode='a', header=not os.path.isfile(path), index=False)
@@ -0,0 +1,130 @@
+# shared_panel.py
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+class SharedPanel:
+    """
+    A set of (dates x tickers) matrices sharing one index and column set,
+    held once in memory-mapped files so several processes can read them without
+    each pickling and copying the full panel.
+
+    The creating process writes the matrices (SharedPanel.create) and passes the small,
+    picklable 'handle' to workers, which map the same files (SharedPanel.attach).
+    Matrices are stored column-major, so each ticker's history is contiguous and a
+    worker only touches the pages of the columns it reads.
+
+    Each matrix keeps its dtype when all its columns share one (e.g. int8 signals,
+    1 byte per cell); anything else is stored as float64.
+
+    Worker-side frames are read-only views: the functions in computing.py, trading.py
+    and signals.py only read their inputs, so they accept them directly.
+    """
+
+    def __init__(self, directory, names, index, columns, owner=False):
+        self.directory = directory
+        self.names = list(names)
+        self.index = index
+        self.columns = columns
+        self.owner = owner
+        self._positions = {t: i for i, t in enumerate(columns)}
+        self._arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+            for name in self.names
+        }
+
+    @classmethod
+    def create(cls, frames, directory=None):
+        """
+        frames: dict {name: DataFrame}, all with the same index and columns as the first one.
+        directory: where to put the backing files. Defaults to a new directory under
+                   /dev/shm (RAM-backed) when available, else the system temp directory.
+        """
+        first = next(iter(frames.values()))
+        index, columns = first.index, first.columns
+
+        if directory is None:
+            base = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            directory = tempfile.mkdtemp(prefix='shared_panel-', dir=base)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        for name, frame in frames.items():
+            frame = frame.reindex(index=index, columns=columns)
+            dtypes = set(frame.dtypes)
+            dtype = dtypes.pop() if len(dtypes) == 1 else np.float64
+            if not isinstance(dtype, np.dtype) or dtype == object:
+                dtype = np.float64
+            out = np.lib.format.open_memmap(
+                os.path.join(directory, f"{name}.npy"),
+                mode='w+',
+                dtype=dtype,
+                shape=frame.shape,
+                fortran_order=True,
+            )
+            out[:] = frame.to_numpy(dtype=dtype)
+            out.flush()
+            del out
+
+        return cls(directory, frames.keys(), index, columns, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Maps an existing panel from the handle of the creating process.
+        """
+        return cls(handle['directory'], handle['names'], handle['index'], handle['columns'])
+
+    @property
+    def handle(self):
+        """
+        Small picklable description of the panel, to send to worker processes.
+        """
+        return {
+            'directory': self.directory,
+            'names': self.names,
+            'index': self.index,
+            'columns': self.columns,
+        }
+
+    def column_indices(self, tickers):
+        return np.array([self._positions[t] for t in tickers], dtype=np.intp)
+
+    def array(self, name, col_idx=None):
+        """
+        Returns the (dates x tickers) NumPy array for 'name'.
+        Zero-copy for the whole matrix or a slice of columns; an index array
+        copies just those columns.
+        """
+        values = self._arrays[name]
+        if col_idx is None:
+            return values
+        return values[:, col_idx]
+
+    def frame(self, name, tickers=None):
+        """
+        Returns matrix 'name' as a DataFrame, optionally restricted to 'tickers'.
+        The full frame wraps the mapped array without copying.
+        """
+        if tickers is None:
+            return pd.DataFrame(self.array(name), index=self.index, columns=self.columns, copy=False)
+        tickers = list(tickers)
+        return pd.DataFrame(self.array(name, self.column_indices(tickers)), index=self.index, columns=tickers, copy=False)
+
+    def close(self):
+        """
+        Drops this process's mappings; the owner also deletes the backing files.
+        """
+        self._arrays = {}
+        if self.owner and os.path.isdir(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,52 +1,87 @@
 # signals.py
 
-def generate_signals_momentum(momentum_df, threshold=0.05):
+import numpy as np
+import pandas as pd
+
+from functions.computing import panel_dtype
+from functions.prediction import chooser_predictions
+from functions.profiling import profiled
+
+# Signals are stored as int8 {-1, 0, +1}: 1 byte per cell instead of 8 for float64
+SIGNAL_DTYPE = np.int8
+
+@profiled
+def generate_signals_momentum(momentum_df, threshold=0.05, dtype=SIGNAL_DTYPE):
     """
     Returns a +1/-1 signal for each ticker/day if momentum is above/below 'threshold'.
     0 otherwise.
+    Signals are int8 by default; pass dtype=np.float64 for the old float frames.
     """
-    signals = momentum_df.copy()
-    signals[:] = 0  # initialize
-
-    signals[momentum_df > threshold] = 1
-    signals[momentum_df < -threshold] = -1
-
-    return signals
+    # float32 panels are compared as they are, against the float64 threshold
+    values = momentum_df.to_numpy(dtype=panel_dtype(momentum_df))
+    threshold = np.float64(threshold)
+    signals = (values > threshold).astype(dtype) - (values < -threshold).astype(dtype)
+    return pd.DataFrame(signals, index=momentum_df.index, columns=momentum_df.columns)
 
-def generate_signals_meanreversion(zscore_df, z_entry=1.0):
+@profiled
+def generate_signals_meanreversion(zscore_df, z_entry=1.0, dtype=SIGNAL_DTYPE):
     """
     Returns a +1 (long) signal if zscore < -z_entry,
            a -1 (short) signal if zscore > z_entry,
            and 0 if inside the neutral zone (|zscore| < z_exit).
+    Signals are int8 by default; pass dtype=np.float64 for the old float frames.
     """
-    signals = zscore_df.copy()
-    signals[:] = 0  # initialize
+    values = zscore_df.to_numpy(dtype=panel_dtype(zscore_df))
+    z_entry = np.float64(z_entry)
+    signals = (values < -z_entry).astype(dtype) - (values > z_entry).astype(dtype)
+    return pd.DataFrame(signals, index=zscore_df.index, columns=zscore_df.columns)
 
-    signals[zscore_df < -z_entry] = 1
-    signals[zscore_df > z_entry] = -1
-    return signals
+def compact_signals(signals):
+    """
+    Converts a signal DataFrame in {-1, 0, +1} (e.g. float64, possibly with NaN for
+    "no position") to the compact int8 representation. NaN becomes 0.
+    """
+    return signals.fillna(0).astype(SIGNAL_DTYPE)
 
-def generate_final_signal(clf, features, momentum_signals, meanrev_signals):
+@profiled
+def generate_final_signal(clf, features, momentum_signals, meanrev_signals, mode='hard', chunk_size=None):
     """
     For each day, if clf predicts 1 -> use momentum_signals,
                      if clf predicts 0 -> use meanrev_signals.
     Returns a DataFrame with the chosen signals day by day.
+
+    mode='soft' blends instead of choosing: each day's signal is
+        P(momentum) * momentum_signals + (1 - P(momentum)) * meanrev_signals
+    using clf.predict_proba, so values lie anywhere in [-1, +1]
+    (apply_stop_loss and build_trade_log expect whole {-1,0,+1} signals).
+
+    In 'hard' mode the result keeps the signals' dtype (int8 from the generators above);
+    'soft' mode returns float64.
+
+    clf may be a fitted classifier or a ChooserPredictions; either way the probabilities
+    come from the model's shared prediction cache (see prediction.py), so both modes and
+    count_strategy_choices reuse a single batched predict_proba over 'features'.
+    chunk_size: rows per predict_proba call, to bound memory on huge feature frames.
     """
-    # Predict
-    X = features.loc[momentum_signals.index]  # ensure same dates
-    # For days we have missing features, fill or drop
-    X = X.ffill().replace({None: 0})
+    # Predict on the whole feature matrix (missing features forward-filled), then
+    # line the days up with the signals
+    chooser = chooser_predictions(clf, chunk_size=chunk_size)
 
-    predictions = clf.predict(X)
+    # Line mean-reversion signals up with the momentum dates/tickers
+    momentum = momentum_signals.to_numpy()
+    meanrev = meanrev_signals.loc[momentum_signals.index, momentum_signals.columns].to_numpy()
 
-    # Combine
-    final_signals = momentum_signals.copy()
-    for i, date in enumerate(final_signals.index):
-        if predictions[i] == 0:
-            # use mean-reversion signals for this day
-            final_signals.loc[date] = meanrev_signals.loc[date]
-        else:
-            # use momentum signals
-            final_signals.loc[date] = momentum_signals.loc[date]
+    if mode == 'hard':
+        # Pick whole rows: 0 -> mean reversion, else momentum
+        predictions = chooser.predict(features).loc[momentum_signals.index].to_numpy()
+        combined = np.where((predictions == 0)[:, None], meanrev, momentum)
+        dtype = momentum_signals.dtypes
+    elif mode == 'soft':
+        p_momentum = chooser.momentum_probability(features).loc[momentum_signals.index].to_numpy()
+        combined = p_momentum[:, None] * momentum + (1.0 - p_momentum[:, None]) * meanrev
+        dtype = np.float64
+    else:
+        raise ValueError(f"Unknown mode: {mode!r}")
 
-    return final_signals
+    final_signals = pd.DataFrame(combined, index=momentum_signals.index, columns=momentum_signals.columns)
+    return final_signals.astype(dtype)
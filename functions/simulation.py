@@ -0,0 +1,218 @@
+# simulation.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from functions.computing import compute_momentum, compute_mean_reversion, compute_signal_returns
+from functions.signals import generate_signals_momentum, generate_signals_meanreversion, generate_final_signal
+from functions.trading import build_strategy_choice_label, build_feature_matrix, compute_rolling_return_stats, track_strategy_chosen_signals
+from functions.training import train_strategy_chooser
+from functions.risk_management import apply_stop_loss
+from functions.shared_panel import SharedPanel
+from functions.profiling import Profiler, active_profiler, profiled
+
+# Per-process universe panels, set once per worker by _init_worker
+_universe = None
+
+@profiled
+def precompute_universe(data_all, benchmark="SPY", momentum_window=63, threshold=0.10,
+                        z_window=20, z_entry=1.0, vol_window=20, universe_index=None):
+    """
+    Computes every per-ticker input of the strategy once for the whole universe.
+    All of these are column-wise, so slicing a sample's columns gives exactly what
+    the pipeline would compute on that sample alone.
+
+    universe_index: optional UniverseIndex (see universe.py); signals are then 0 on the
+    days a ticker was not in the index, so no position is taken outside membership.
+
+    Returns a dict of DataFrames (prices, momentum, zscore, momentum_signals,
+    meanrev_signals, daily_returns, rolling_std, rolling_mean) plus the benchmark series.
+    """
+    prices = data_all.drop(columns=[benchmark])
+
+    momentum_df = compute_momentum(prices, window=momentum_window)
+    zscore_df   = compute_mean_reversion(prices, window=z_window)
+    rolling_std, rolling_mean = compute_rolling_return_stats(prices, vol_window)
+
+    momentum_signals = generate_signals_momentum(momentum_df, threshold=threshold)
+    meanrev_signals  = generate_signals_meanreversion(zscore_df, z_entry=z_entry)
+    if universe_index is not None:
+        momentum_signals = universe_index.mask(momentum_signals)
+        meanrev_signals  = universe_index.mask(meanrev_signals)
+
+    return {
+        'prices': prices,
+        'benchmark': data_all[benchmark],
+        'momentum': momentum_df,
+        'zscore': zscore_df,
+        'momentum_signals': momentum_signals,
+        'meanrev_signals': meanrev_signals,
+        'daily_returns': prices.pct_change(),
+        'rolling_std': rolling_std,
+        'rolling_mean': rolling_mean,
+    }
+
+def run_simulations(data_all, n_simulations=10, sample_size=15, seed=None, n_jobs=1,
+                    initial_capital=10000.0, stop_loss_pct=0.05, benchmark="SPY", train_mode='grid',
+                    model_cache_dir=None, universe_index=None, **indicator_params):
+    """
+    Runs the full strategy on 'n_simulations' random samples of 'sample_size' tickers
+    drawn from the columns of 'data_all' (the benchmark column is never sampled).
+
+    Indicators, signals and returns are computed once for the whole universe
+    (precompute_universe) and each sample slices its columns. Samples are spread
+    across a process pool of 'n_jobs' workers (-1 = all cores); the universe panels are
+    held once in a SharedPanel that every worker maps, instead of a copy per worker.
+    Each sample draws its
+    tickers from its own seed spawned from 'seed', so results are reproducible and do
+    not depend on n_jobs.
+
+    universe_index: optional UniverseIndex (see universe.py) for survivorship-aware runs.
+    Samples are then drawn from the tickers in the index on the first date of 'data_all'
+    (rather than from every column, which only holds names that survived to be downloaded),
+    and signals are masked to index membership on each date.
+
+    train_mode and model_cache_dir are passed to train_strategy_chooser as mode and cache_dir.
+    indicator_params are passed to precompute_universe (momentum_window, threshold,
+    z_window, z_entry, vol_window).
+
+    If a Profiler is active (see profiling.py), each sample's stages are recorded with
+    the simulation number as their run label, including samples run in worker processes.
+
+    Returns a DataFrame with one row per simulation: simulation, tickers, final_date,
+    Strategy, SPY_BuyHold, EqualWeight_BuyHold (final portfolio values) and error.
+    """
+    universe = precompute_universe(data_all, benchmark=benchmark, universe_index=universe_index, **indicator_params)
+
+    # Tickers available for sampling
+    prices = universe['prices']
+    has_data = prices.notna().any(axis=0).to_numpy()
+    if universe_index is not None:
+        has_data &= universe_index.member_mask(prices.index[:1], prices.columns)[0]
+    available_tickers = list(prices.columns[has_data])
+    if len(available_tickers) < sample_size:
+        raise ValueError(f"Not enough tickers available for simulation ({len(available_tickers)} < {sample_size}).")
+
+    # Reproducible per-sample seeds
+    sample_seeds = np.random.SeedSequence(seed).spawn(n_simulations)
+    samples = [
+        list(np.random.default_rng(s).choice(available_tickers, size=sample_size, replace=False))
+        for s in sample_seeds
+    ]
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    # Serial runs let the grid search use every core; pool workers train single-threaded
+    train_kwargs = {
+        'n_jobs': -1 if n_jobs == 1 else 1,
+        'mode': train_mode,
+        'cache_dir': model_cache_dir,
+    }
+    # Workers profile into their own Profiler and send the records back with the row
+    profiler = active_profiler()
+    profile_memory = None if profiler is None or n_jobs == 1 else profiler.memory
+    tasks = [(sim, tickers, initial_capital, stop_loss_pct, train_kwargs, profile_memory) for sim, tickers in enumerate(samples)]
+
+    if n_jobs == 1:
+        _init_worker(universe)
+        try:
+            rows = [_run_sample(task) for task in tasks]
+        finally:
+            _init_worker(None)
+    else:
+        matrices = {name: frame for name, frame in universe.items() if name != 'benchmark'}
+        with SharedPanel.create(matrices) as panel:
+            initargs = (panel.handle, universe['benchmark'])
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_shared_worker, initargs=initargs) as executor:
+                rows = list(executor.map(_run_sample, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs))))
+        for row in rows:
+            records = row.pop('_profile', None)
+            if profiler is not None and records:
+                profiler.merge(records)
+
+    return pd.DataFrame(rows)
+
+def _init_worker(universe):
+    global _universe
+    _universe = universe
+
+def _init_shared_worker(handle, benchmark):
+    # Zero-copy frames over the shared panel; samples slice their columns from these
+    panel = SharedPanel.attach(handle)
+    universe = {name: panel.frame(name) for name in panel.names}
+    universe['benchmark'] = benchmark
+    _init_worker(universe)
+
+def _run_sample(task):
+    """
+    Runs the strategy on one sample of tickers, slicing the precomputed universe panels.
+    """
+    sim, tickers, initial_capital, stop_loss_pct, train_kwargs, profile_memory = task
+
+    # Pool worker: record into a fresh Profiler (a forked worker also inherits the parent's)
+    if profile_memory is not None:
+        with Profiler(memory=profile_memory) as profiler, profiler.run(sim):
+            row = _run_strategy(sim, tickers, initial_capital, stop_loss_pct, train_kwargs)
+        row['_profile'] = profiler.records
+        return row
+    profiler = active_profiler()
+    if profiler is not None:
+        with profiler.run(sim):
+            return _run_strategy(sim, tickers, initial_capital, stop_loss_pct, train_kwargs)
+    return _run_strategy(sim, tickers, initial_capital, stop_loss_pct, train_kwargs)
+
+def _run_strategy(sim, tickers, initial_capital, stop_loss_pct, train_kwargs):
+    u = _universe
+
+    row = {
+        'simulation': sim,
+        'tickers': ",".join(tickers),
+        'final_date': pd.NaT,
+        'Strategy': np.nan,
+        'SPY_BuyHold': np.nan,
+        'EqualWeight_BuyHold': np.nan,
+        'error': None,
+    }
+
+    sample_data      = u['prices'][tickers]
+    momentum_df      = u['momentum'][tickers]
+    zscore_df        = u['zscore'][tickers]
+    momentum_signals = u['momentum_signals'][tickers]
+    meanrev_signals  = u['meanrev_signals'][tickers]
+    daily_returns    = u['daily_returns'][tickers]
+
+    # Build a label: 1 if momentum outperformed mean-reversion; 0 otherwise
+    momentum_returns = compute_signal_returns(sample_data, momentum_signals, daily_returns=daily_returns)
+    meanrev_returns  = compute_signal_returns(sample_data, meanrev_signals, daily_returns=daily_returns)
+    label = build_strategy_choice_label(momentum_returns, meanrev_returns)
+
+    # Build the feature matrix for the strategy chooser
+    rolling_stats = (u['rolling_std'][tickers], u['rolling_mean'][tickers])
+    features = build_feature_matrix(sample_data, momentum_df, zscore_df, rolling_stats=rolling_stats)
+
+    # Train the strategy chooser classifier
+    try:
+        clf = train_strategy_chooser(features, label, verbose=False, **train_kwargs)
+    except Exception as e:
+        row['error'] = f"Error training classifier: {e}"
+        return row
+
+    # Generate final signals and apply the stop-loss rule
+    signals = generate_final_signal(clf, features, momentum_signals, meanrev_signals)
+    final_signals = apply_stop_loss(signals, sample_data, stop_loss_pct=stop_loss_pct)
+
+    # Track strategy performance
+    result_df = track_strategy_chosen_signals(sample_data, final_signals, u['benchmark'], initial_capital=initial_capital)
+    if result_df.empty:
+        row['error'] = "No results available from tracking performance."
+        return row
+
+    final_date = result_df.index[-1]
+    row['final_date'] = final_date
+    for column in ('Strategy', 'SPY_BuyHold', 'EqualWeight_BuyHold'):
+        row[column] = result_df.at[final_date, column]
+    return row
@@ -0,0 +1,142 @@
+# sweep.py
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from functions.computing import compute_momentum, compute_mean_reversion, compute_stacked_signal_returns
+from functions.risk_management import apply_stop_loss_array
+
+# Prices for the sweep tasks, set once per worker by _init_worker
+_prices = None
+
+def run_parameter_sweep(data, momentum_windows=(63,), thresholds=(0.10,), z_windows=(20,), z_entries=(1.0,),
+                        stop_loss_pcts=(None, 0.05), n_jobs=1, periods_per_year=252):
+    """
+    Evaluates every combination of
+        momentum (momentum_window x threshold) and mean reversion (z_window x z_entry)
+    signal parameters, each with every stop_loss_pct (None = no stop-loss), and ranks them.
+
+    Work is shared across the grid: each distinct rolling window is computed once,
+    every threshold/z_entry variant is derived from it with one broadcast comparison
+    into a stacked (variants x dates x tickers) signal tensor, the stop-loss runs on all
+    variants side by side, and compute_signal_returns is evaluated for the whole stack
+    in one vectorized pass. Windows are spread across 'n_jobs' processes (-1 = all cores).
+
+    The two signal families are evaluated on their own (no strategy chooser), with the
+    same equal-weight daily returns as compute_signal_returns.
+
+    Returns a DataFrame with one row per variant, best Sharpe ratio first:
+    strategy, momentum_window, threshold, z_window, z_entry, stop_loss_pct,
+    total_return, annual_return, sharpe, max_drawdown.
+    """
+    tasks = [('momentum', window, list(thresholds), list(stop_loss_pcts)) for window in momentum_windows]
+    tasks += [('meanrev', window, list(z_entries), list(stop_loss_pcts)) for window in z_windows]
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs == 1:
+        _init_worker(data)
+        try:
+            results = [_evaluate_window(task, periods_per_year) for task in tasks]
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(data,)) as executor:
+            results = list(executor.map(_evaluate_window, tasks, itertools.repeat(periods_per_year)))
+
+    table = pd.DataFrame([row for rows in results for row in rows])
+    table = table.sort_values('sharpe', ascending=False, na_position='last', kind='stable')
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+def build_signal_stack(indicator, levels, strategy):
+    """
+    Broadcasts one indicator matrix (dates x tickers) against several levels into a
+    (levels x dates x tickers) int8 signal tensor:
+        momentum: +1 above +level, -1 below -level (generate_signals_momentum)
+        meanrev:  +1 below -level, -1 above +level (generate_signals_meanreversion)
+    """
+    values = np.asarray(indicator, dtype=np.float64)[None]
+    levels = np.asarray(levels, dtype=np.float64)[:, None, None]
+    if strategy == 'momentum':
+        return (values > levels).astype(np.int8) - (values < -levels).astype(np.int8)
+    return (values < -levels).astype(np.int8) - (values > levels).astype(np.int8)
+
+def _init_worker(data):
+    global _prices
+    _prices = data
+
+def _evaluate_window(task, periods_per_year):
+    """
+    Evaluates every level and stop-loss for one strategy family and rolling window.
+    """
+    strategy, window, levels, stop_loss_pcts = task
+    data = _prices
+
+    if strategy == 'momentum':
+        indicator = compute_momentum(data, window=window)
+    else:
+        indicator = compute_mean_reversion(data, window=window)
+
+    stack = build_signal_stack(indicator, levels, strategy)
+    n_levels, n_dates, n_tickers = stack.shape
+
+    daily_returns = data.pct_change().to_numpy(dtype=np.float64)
+    filled_prices = data.ffill().to_numpy(dtype=np.float64)
+
+    rows = []
+    for stop_loss_pct in stop_loss_pcts:
+        if stop_loss_pct is None:
+            signals = stack
+        else:
+            # All levels side by side: (dates x levels*tickers)
+            wide = stack.transpose(1, 0, 2).reshape(n_dates, n_levels * n_tickers)
+            wide = apply_stop_loss_array(wide, np.tile(filled_prices, n_levels), stop_loss_pct)
+            signals = wide.reshape(n_dates, n_levels, n_tickers).transpose(1, 0, 2)
+
+        returns = compute_stacked_signal_returns(daily_returns, signals)
+        metrics = performance_metrics(returns, periods_per_year)
+
+        for i, level in enumerate(levels):
+            row = {
+                'strategy': strategy,
+                'momentum_window': window if strategy == 'momentum' else np.nan,
+                'threshold': level if strategy == 'momentum' else np.nan,
+                'z_window': window if strategy == 'meanrev' else np.nan,
+                'z_entry': level if strategy == 'meanrev' else np.nan,
+                'stop_loss_pct': np.nan if stop_loss_pct is None else stop_loss_pct,
+            }
+            row.update({name: values[i] for name, values in metrics.items()})
+            rows.append(row)
+    return rows
+
+def performance_metrics(returns, periods_per_year=252):
+    """
+    Summary statistics for a (variants x dates) array of daily returns.
+    Returns a dict of arrays: total_return, annual_return, sharpe, max_drawdown.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    equity = np.cumprod(1.0 + returns, axis=1)
+    n_periods = returns.shape[1]
+
+    total_return = equity[:, -1] - 1.0
+    annual_return = equity[:, -1] ** (periods_per_year / max(n_periods, 1)) - 1.0
+
+    std = returns.std(axis=1, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=1) / std * np.sqrt(periods_per_year), np.nan)
+
+    running_max = np.maximum.accumulate(equity, axis=1)
+    max_drawdown = (equity / running_max - 1.0).min(axis=1)
+
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+    }
@@ -3,6 +3,14 @@
 import numpy as np
 import pandas as pd
 
+from functions.computing import panel_dtype, row_mean
+from functions.profiling import profiled
+
+# numba is optional (the NumPy backend is always available) and is only imported when
+# the 'numba' backend is first used
+_numba_kernel = None
+
+@profiled
 def build_strategy_choice_label(momentum_returns, meanrev_returns):
     """
     Returns a Series of {0,1} for each date:
@@ -12,7 +20,23 @@ def build_strategy_choice_label(momentum_returns, meanrev_returns):
     label = (momentum_returns > meanrev_returns).astype(int)
     return label
 
-def build_feature_matrix(price_data, momentum_df, zscore_df, vol_window=20):
+def compute_rolling_return_stats(price_data, vol_window=20):
+    """
+    Per-ticker rolling standard deviation and rolling mean of daily returns,
+    the inputs to the volatility/return features in build_feature_matrix.
+
+    Returns (rolling_std_df, rolling_mean_df).
+    """
+    # daily returns
+    daily_returns = price_data.pct_change(fill_method='pad')
+
+    # Accumulated in float64 by pandas, stored in the panel dtype of price_data
+    dtype = panel_dtype(price_data)
+    rolling = daily_returns.rolling(vol_window)
+    return rolling.std().astype(dtype, copy=False), rolling.mean().astype(dtype, copy=False)
+
+@profiled
+def build_feature_matrix(price_data, momentum_df, zscore_df, vol_window=20, rolling_stats=None):
     """
     Creates daily features for the strategy chooser:
       1. Average momentum across tickers
@@ -24,20 +48,24 @@ def build_feature_matrix(price_data, momentum_df, zscore_df, vol_window=20):
     momentum_df: DataFrame of momentum values for all tickers
     zscore_df: DataFrame of z-scores for all tickers
     vol_window: int, rolling window for volatility
+    rolling_stats: optional precomputed compute_rolling_return_stats(price_data, vol_window)
+                   output; 'price_data' is not used when given.
     """
-    # daily returns
-    daily_returns = price_data.pct_change(fill_method='pad')
+    if rolling_stats is None:
+        rolling_stats = compute_rolling_return_stats(price_data, vol_window)
+    rolling_std, rolling_mean = rolling_stats
 
     # rolling volatility (mean across all tickers)
     # 20-day rolling std, then average across tickers
-    rolling_volatility = daily_returns.rolling(vol_window).std().mean(axis=1)
+    # (row_mean: float64 means, also for float32 panels)
+    rolling_volatility = row_mean(rolling_std)
 
     # rolling average of daily returns (20-day), across all tickers
-    rolling_mean_returns = daily_returns.rolling(vol_window).mean().mean(axis=1)
+    rolling_mean_returns = row_mean(rolling_mean)
 
     # average momentum & zscore across all tickers
-    daily_momentum_mean = momentum_df.mean(axis=1)
-    daily_zscore_mean   = zscore_df.mean(axis=1)
+    daily_momentum_mean = row_mean(momentum_df)
+    daily_zscore_mean   = row_mean(zscore_df)
 
     # Build the feature DataFrame
     features = pd.DataFrame({
@@ -49,39 +77,174 @@ def build_feature_matrix(price_data, momentum_df, zscore_df, vol_window=20):
 
     return features
 
-def track_strategy_chosen_signals(price_data, final_signals, spy_series, initial_capital=10000.0):
+@profiled
+def track_strategy_chosen_signals(price_data, final_signals, spy_series, initial_capital=10000.0, backend='numpy'):
+    """
+    Backtests 'final_signals' against the prices and two buy & hold benchmarks.
+
+    price_data:    DataFrame of prices (index=dates, columns=tickers)
+    final_signals: DataFrame of signals in {-1, 0, +1}, int8 or float
+    spy_series:    benchmark price Series
+    backend:       'numpy' (vectorized) or 'numba' (compiled single-pass loop, needs numba)
+
+    Each day the strategy earns the next day's return of every signalled ticker,
+    averaged over the tickers with a price that day; the equal-weight benchmark
+    holds every ticker with a price. Everything is computed from the price and signal
+    arrays in one call to backtest_arrays, without intermediate DataFrames.
+
+    Returns a DataFrame of portfolio values: Strategy, SPY_BuyHold, EqualWeight_BuyHold.
+    """
     # Reindex to match signals without forward filling
     price_data = price_data.reindex(final_signals.index)
-    
-    # Compute daily returns using available data only
-    daily_returns = price_data.pct_change().shift(-1)
-    daily_returns = daily_returns.fillna(0)
-    
-    # Ensure signals are only used when the corresponding price is available
-    final_signals_aligned = final_signals.where(price_data.notna(), 0)
-    
-    available_counts = price_data.notna().sum(axis=1).replace(0, np.nan)
-    strategy_daily_return = (final_signals_aligned * daily_returns).sum(axis=1) / available_counts
-    strategy_daily_return = strategy_daily_return.fillna(0)
-    
-    strategy_cumulative = (1 + strategy_daily_return).cumprod() * initial_capital
-    
-    # SPY Buy & Hold calculation remains as before
-    spy_aligned = spy_series.reindex(strategy_cumulative.index).ffill()
-    first_spy_price = spy_aligned.iloc[0]
-    spy_cumulative = (spy_aligned / first_spy_price) * initial_capital
-    
-    # For Equal Weight Buy & Hold, calculate returns only where data exists
-    daily_returns_eq = price_data.pct_change().fillna(0)
-    available_counts_eq = price_data.notna().sum(axis=1).replace(0, np.nan)
-    equal_weight_daily_return = daily_returns_eq.sum(axis=1) / available_counts_eq
-    equal_weight_daily_return = equal_weight_daily_return.fillna(0)
-    equal_weight_buy_hold = (1 + equal_weight_daily_return).cumprod() * initial_capital
-    
+
+    # Signals for tickers without prices are never used; missing signals are no position
+    signals = final_signals.reindex(columns=price_data.columns)
+    spy = spy_series.reindex(final_signals.index)
+
+    curves = backtest_arrays(
+        price_data.to_numpy(dtype=panel_dtype(price_data)),
+        signals.to_numpy(),
+        spy.to_numpy(dtype=np.float64),
+        initial_capital=initial_capital,
+        backend=backend,
+    )
+
     result_df = pd.DataFrame({
-        'Strategy': strategy_cumulative,
-        'SPY_BuyHold': spy_cumulative,
-        'EqualWeight_BuyHold': equal_weight_buy_hold
-    }, index=strategy_cumulative.index)
-    
+        'Strategy': curves['Strategy'],
+        'SPY_BuyHold': curves['SPY_BuyHold'],
+        'EqualWeight_BuyHold': curves['EqualWeight_BuyHold']
+    }, index=final_signals.index)
+
     return result_df
+
+def backtest_arrays(prices, signals, spy, initial_capital=10000.0, backend='numpy'):
+    """
+    track_strategy_chosen_signals on plain arrays in date order:
+        prices  (dates x tickers) float64 or float32, NaN where a ticker has no price
+        signals (dates x tickers) in {-1, 0, +1}, any numeric dtype (NaN = no position)
+        spy     (dates,) benchmark prices, forward-filled here
+
+    Daily returns are taken on forward-filled prices (pct_change), a signal on day t
+    earns the return of day t+1, and only tickers with a price on day t count.
+
+    Returns a dict of (dates,) float64 arrays: strategy_return, equal_weight_return
+    and the portfolio values Strategy, SPY_BuyHold and EqualWeight_BuyHold. float32
+    prices are not copied to float64: returns are taken in float32, the sums across
+    tickers and the cumulative products in float64.
+    """
+    prices = np.asarray(prices)
+    if prices.dtype != np.float32:
+        prices = prices.astype(np.float64, copy=False)
+    signals = np.asarray(signals)
+    if signals.dtype.kind not in 'biuf':
+        signals = signals.astype(np.float64)
+    if signals.dtype.kind == 'f' and np.isnan(signals).any():
+        signals = np.where(np.isnan(signals), 0.0, signals)
+    spy = np.asarray(spy, dtype=np.float64)
+
+    if backend == 'numpy':
+        strategy_return, equal_weight_return, spy_filled = _backtest_numpy(prices, signals, spy)
+    elif backend == 'numba':
+        n_dates = prices.shape[0]
+        strategy_return = np.zeros(n_dates)
+        equal_weight_return = np.zeros(n_dates)
+        spy_filled = np.empty(n_dates)
+        _get_numba_kernel()(prices, signals, spy, strategy_return, equal_weight_return, spy_filled)
+    else:
+        raise ValueError(f"Unknown backtest backend: {backend!r}")
+
+    first_spy_price = spy_filled[0] if len(spy_filled) else np.nan
+    return {
+        'strategy_return': strategy_return,
+        'equal_weight_return': equal_weight_return,
+        'Strategy': np.cumprod(1 + strategy_return) * initial_capital,
+        'SPY_BuyHold': spy_filled / first_spy_price * initial_capital,
+        'EqualWeight_BuyHold': np.cumprod(1 + equal_weight_return) * initial_capital,
+    }
+
+def _ffill(values):
+    # Forward-fills NaN down the first axis
+    valid = ~np.isnan(values)
+    last = np.where(valid, np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1)), 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = np.take_along_axis(values, last, axis=0) if values.ndim > 1 else values[last]
+    return filled
+
+def _backtest_numpy(prices, signals, spy):
+    """
+    Vectorized backtest; returns (strategy_return, equal_weight_return, spy_filled).
+    """
+    n_dates = prices.shape[0]
+    available = ~np.isnan(prices)
+    counts = available.sum(axis=1)
+
+    # One-day returns on forward-filled prices; day i's return is at row i - 1
+    filled = _ffill(prices)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = filled[1:] / filled[:-1] - 1
+    returns[np.isnan(returns)] = 0.0
+
+    strategy_sum = np.zeros(n_dates)
+    equal_weight_sum = np.zeros(n_dates)
+    if n_dates > 1:
+        # Signal on day t earns the return of day t+1, if the ticker had a price on day t
+        active = available[:-1] & (signals[:-1] != 0)
+        with np.errstate(invalid='ignore'):
+            strategy_sum[:-1] = np.where(active, signals[:-1] * returns, 0.0).sum(axis=1, dtype=np.float64)
+        equal_weight_sum[1:] = returns.sum(axis=1, dtype=np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strategy_return = np.where(counts > 0, strategy_sum / counts, 0.0)
+        equal_weight_return = np.where(counts > 0, equal_weight_sum / counts, 0.0)
+    return strategy_return, equal_weight_return, _ffill(spy)
+
+def _backtest_loop(prices, signals, spy, strategy_return, equal_weight_return, spy_filled):
+    """
+    Single pass over the dates for the 'numba' backend: each price is read once,
+    and the day's return is credited to the previous day's signals.
+    """
+    n_dates, n_tickers = prices.shape
+    last_price = np.full(n_tickers, np.nan)
+    last_spy = np.nan
+    prev_count = 0
+
+    for i in range(n_dates):
+        strategy_sum = 0.0
+        equal_weight_sum = 0.0
+        count = 0
+        for j in range(n_tickers):
+            price = prices[i, j]
+            if price == price:
+                count += 1
+            else:
+                price = last_price[j]
+
+            r = price / last_price[j] - 1
+            if r == r:
+                equal_weight_sum += r
+                if i > 0:
+                    signal = signals[i - 1, j]
+                    if signal != 0 and prices[i - 1, j] == prices[i - 1, j]:
+                        strategy_sum += signal * r
+            last_price[j] = price
+
+        if i > 0 and prev_count > 0:
+            strategy_return[i - 1] = strategy_sum / prev_count
+        if count > 0:
+            equal_weight_return[i] = equal_weight_sum / count
+        prev_count = count
+
+        if spy[i] == spy[i]:
+            last_spy = spy[i]
+        spy_filled[i] = last_spy
+
+def _get_numba_kernel():
+    global _numba_kernel
+    if _numba_kernel is None:
+        try:
+            import numba
+        except ImportError:
+            raise ImportError("The 'numba' backtest backend requires numba to be installed.") from None
+        # NumPy error model: a zero price gives inf/NaN like the numpy backend instead of raising
+        _numba_kernel = numba.njit(cache=True, error_model='numpy')(_backtest_loop)
+    return _numba_kernel
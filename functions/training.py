@@ -1,13 +1,50 @@
 # training.py
 
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV, train_test_split
-from sklearn.ensemble import RandomForestClassifier
+import hashlib
+import os
 
-def train_strategy_chooser(features, label):
+import numpy as np
+import pandas as pd
+
+from functions.profiling import profiled
+
+# scikit-learn and joblib are imported inside the functions that use them: sklearn alone
+# takes over a second to import, which every worker process and scheduled run paid
+# even when it only loads a cached model or never trains
+
+# Grid searched by the 'grid', 'warm_start' and 'halving' modes
+CHOOSER_PARAM_GRID = {
+    'n_estimators': [50, 100],
+    'max_depth': [None, 3, 5],
+    'min_samples_split': [2, 5],
+}
+
+# Smaller grid for the 'hgb' (HistGradientBoosting) mode
+HGB_PARAM_GRID = {
+    'max_depth': [None, 3, 5],
+    'learning_rate': [0.05, 0.1],
+}
+
+CHOOSER_MODES = ('grid', 'warm_start', 'halving', 'hgb')
+
+@profiled
+def train_strategy_chooser(features, label, n_jobs=-1, verbose=True, mode='grid', cache_dir=None):
     """
     Train a binary classifier that predicts whether
     momentum (1) or mean-reversion (0) will be better next day,
     using time-series cross validation and grid search.
+
+    n_jobs: parallel jobs for the grid search (use 1 inside worker processes).
+    verbose: print the best parameters and CV score.
+    mode: how the model is searched (see search_strategy_chooser):
+        'grid'       - full GridSearchCV over RandomForest (default)
+        'warm_start' - same grid and same result, but each fold grows one forest
+                       from 50 to 100 trees instead of fitting both sizes
+        'halving'    - successive halving over the same grid, using n_estimators
+                       as the resource
+        'hgb'        - HistGradientBoosting backend with a small grid
+    cache_dir: optional directory for a model cache keyed on a hash of
+               features + label + mode/params; identical reruns load the fitted model.
     """
 
     # Align features & label
@@ -16,41 +53,149 @@ def train_strategy_chooser(features, label):
     X = X.dropna()
     y = y.loc[X.index]
 
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, f"chooser-{chooser_cache_key(X, y, mode)}.joblib")
+        if os.path.isfile(cache_path):
+            import joblib
+            if verbose:
+                print("Loaded cached model:", cache_path)
+            return joblib.load(cache_path)
+
+    best_model, best_params, best_score = search_strategy_chooser(X, y, mode=mode, n_jobs=n_jobs)
+    if verbose:
+        print("Best Params:", best_params)
+        print("Best CV Score:", best_score)
+
+    if cache_path is not None:
+        import joblib
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+        joblib.dump(best_model, tmp_path)
+        os.replace(tmp_path, cache_path)
+
+    return best_model
+
+def search_strategy_chooser(X, y, mode='grid', n_jobs=-1):
+    """
+    Runs the model search for train_strategy_chooser on aligned, NaN-free X and y.
+    Returns (best_model, best_params, best_cv_score).
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+    from sklearn.model_selection import TimeSeriesSplit, GridSearchCV, HalvingGridSearchCV
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
     # Time-series cross-validation, 4 splits
     tscv = TimeSeriesSplit(n_splits=4)
 
-    # Define a parameter grid
-    param_grid = {
-        'n_estimators': [50, 100],
-        'max_depth': [None, 3, 5],
-        'min_samples_split': [2, 5],
-    }
-
-    # Create the RandomForest and GridSearch
-    rf = RandomForestClassifier(random_state=42)
-    grid_search = GridSearchCV(
-        estimator=rf,
-        param_grid=param_grid,
-        cv=tscv,
-        scoring='accuracy',
-        n_jobs=-1
+    if mode == 'warm_start':
+        return _warm_start_search(X, y, tscv, CHOOSER_PARAM_GRID, n_jobs)
+
+    if mode == 'grid':
+        search = GridSearchCV(
+            estimator=RandomForestClassifier(random_state=42),
+            param_grid=CHOOSER_PARAM_GRID,
+            cv=tscv,
+            scoring='accuracy',
+            n_jobs=n_jobs
+        )
+    elif mode == 'halving':
+        # n_estimators is the halving resource: every combination starts with the
+        # smallest forest, and only the better half is refitted with the largest one
+        n_estimators = CHOOSER_PARAM_GRID['n_estimators']
+        search = HalvingGridSearchCV(
+            estimator=RandomForestClassifier(random_state=42),
+            param_grid={k: v for k, v in CHOOSER_PARAM_GRID.items() if k != 'n_estimators'},
+            cv=tscv,
+            scoring='accuracy',
+            resource='n_estimators',
+            min_resources=min(n_estimators),
+            max_resources=max(n_estimators),
+            factor=2,
+            random_state=42,
+            n_jobs=n_jobs
+        )
+    elif mode == 'hgb':
+        search = GridSearchCV(
+            estimator=HistGradientBoostingClassifier(max_iter=100, random_state=42),
+            param_grid=HGB_PARAM_GRID,
+            cv=tscv,
+            scoring='accuracy',
+            n_jobs=n_jobs
+        )
+    else:
+        raise ValueError(f"Unknown mode: {mode!r} (expected one of {CHOOSER_MODES})")
+
+    # Fit the search
+    search.fit(X, y)
+
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+def _warm_start_search(X, y, cv, param_grid, n_jobs):
+    """
+    Grid search over RandomForest where n_estimators is grown with warm_start:
+    for every other parameter combination and fold, one forest is fitted with the
+    smallest n_estimators and trees are added for each larger value. A warm-started
+    forest draws the same tree seeds as a fresh one, so the scores equal GridSearchCV's.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import ParameterGrid
+
+    n_estimators = sorted(param_grid['n_estimators'])
+    other_grid = {k: v for k, v in param_grid.items() if k != 'n_estimators'}
+    combos = list(ParameterGrid(other_grid))
+    splits = list(cv.split(X, y))
+
+    def fit_fold(params, train_idx, test_idx):
+        rf = RandomForestClassifier(random_state=42, warm_start=True, **params)
+        scores = []
+        for n in n_estimators:
+            rf.set_params(n_estimators=n)
+            rf.fit(X.iloc[train_idx], y.iloc[train_idx])
+            scores.append(rf.score(X.iloc[test_idx], y.iloc[test_idx]))
+        return scores
+
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(params, train_idx, test_idx)
+        for params in combos
+        for train_idx, test_idx in splits
     )
+    # (combos, folds, n_estimators) -> mean over folds
+    mean_scores = np.asarray(fold_scores).reshape(len(combos), len(splits), len(n_estimators)).mean(axis=1)
 
-    # Fit the grid search
-    grid_search.fit(X, y)
+    # Candidates in GridSearchCV's order, so ties resolve the same way
+    candidates = []
+    for params in ParameterGrid(param_grid):
+        i = combos.index({k: v for k, v in params.items() if k != 'n_estimators'})
+        candidates.append((params, mean_scores[i, n_estimators.index(params['n_estimators'])]))
+    best_params, best_score = max(candidates, key=lambda c: c[1])
 
-    # Best model & best params
-    best_model = grid_search.best_estimator_
-    print("Best Params:", grid_search.best_params_)
-    print("Best CV Score:", grid_search.best_score_)
+    best_model = RandomForestClassifier(random_state=42, **best_params)
+    best_model.fit(X, y)
+    return best_model, best_params, best_score
 
-    return best_model
+def chooser_cache_key(X, y, mode):
+    """
+    Content hash of the training data and search settings, used as the model cache key.
+    """
+    import sklearn
+
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(X, index=True).values.tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=True).values.tobytes())
+    h.update(repr(list(X.columns)).encode())
+    h.update(repr((mode, CHOOSER_PARAM_GRID, HGB_PARAM_GRID, sklearn.__version__)).encode())
+    return h.hexdigest()[:32]
 
 def train_momentum_classifier(momentum, future_returns):
     """
     Trains a Random Forest classifier to predict the likelihood of positive future returns 
     based on past momentum data.
     """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
     features = momentum.shift(1)
     target = (future_returns > 0).astype(int)
 
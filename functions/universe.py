@@ -0,0 +1,167 @@
+# universe.py
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+class UniverseIndex:
+    """
+    Point-in-time index membership (e.g. the S&P 500 from SPY_500_historical_stocks.csv),
+    parsed once into a (snapshots x tickers) boolean matrix.
+
+    Each row is one composition snapshot and holds until the next one, so the members
+    on any date are the row of the last snapshot at or before it. Looking up a date is
+    a binary search over the snapshot dates; masks for a whole panel of dates are one
+    searchsorted plus a row gather, with no string parsing after construction.
+
+    Tickers that were in the index at any point are columns, so delisted and removed
+    names are kept (survivorship-aware).
+    """
+
+    def __init__(self, dates, tickers, membership, row_positions=None):
+        """
+        dates:         sorted snapshot dates
+        tickers:       every ticker that appears in any snapshot
+        membership:    bool array (len(dates) x len(tickers))
+        row_positions: optional per-snapshot arrays of column positions in listing order
+                       (used by members()); defaults to column order
+        """
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers, dtype=object)
+        self.membership = np.asarray(membership, dtype=bool)
+        if row_positions is None:
+            row_positions = [np.flatnonzero(row) for row in self.membership]
+        self._row_positions = row_positions
+        self._positions = {t: i for i, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_composition(cls, composition_df):
+        """
+        Builds the index from a DataFrame with a 'date' column and a comma-joined 'tickers'
+        column (the layout of SPY_500_historical_stocks.csv). Snapshots on the same date
+        keep the last one, as a stable sort followed by .iloc[-1] would.
+        """
+        composition_df = composition_df.sort_values("date", kind="stable")
+        composition_df = composition_df.drop_duplicates("date", keep="last")
+
+        positions = {}
+        row_positions = []
+        for tickers in composition_df["tickers"]:
+            row = [t.strip() for t in str(tickers).split(",") if t.strip()]
+            row_positions.append(np.array(
+                [positions.setdefault(t, len(positions)) for t in dict.fromkeys(row)],
+                dtype=np.intp,
+            ))
+
+        membership = np.zeros((len(row_positions), len(positions)), dtype=bool)
+        for i, row in enumerate(row_positions):
+            membership[i, row] = True
+
+        return cls(pd.to_datetime(composition_df["date"]), list(positions), membership, row_positions)
+
+    @classmethod
+    def from_csv(cls, composition_csv):
+        return cls.from_composition(pd.read_csv(composition_csv, parse_dates=["date"]))
+
+    def _row(self, date):
+        # Last snapshot at or before 'date'
+        row = self.dates.searchsorted(pd.Timestamp(date), side='right') - 1
+        if row < 0:
+            raise ValueError(f"No composition at or before {pd.Timestamp(date).date()} "
+                             f"(first snapshot is {self.dates[0].date()}).")
+        return row
+
+    def snapshot_date(self, date):
+        """
+        Date of the composition snapshot in effect on 'date'.
+        """
+        return self.dates[self._row(date)]
+
+    def members(self, date):
+        """
+        List of tickers in the index on 'date', in the order the snapshot lists them.
+        """
+        return list(self.tickers[self._row_positions[self._row(date)]])
+
+    def members_between(self, start, end):
+        """
+        List of tickers in the index at any time in [start, end): the members on 'start'
+        in listing order, then the names added by later snapshots dated before 'end'.
+        """
+        first = self._row(start)
+        last = max(first, self.dates.searchsorted(pd.Timestamp(end), side='left') - 1)
+        positions = pd.unique(np.concatenate(self._row_positions[first:last + 1]))
+        return list(self.tickers[positions])
+
+    def is_member(self, ticker, date):
+        """
+        True if 'ticker' was in the index on 'date'.
+        """
+        position = self._positions.get(ticker)
+        row = self.dates.searchsorted(pd.Timestamp(date), side='right') - 1
+        return position is not None and row >= 0 and bool(self.membership[row, position])
+
+    def member_mask(self, dates, tickers):
+        """
+        Returns a bool array (len(dates) x len(tickers)): True where the ticker was in the
+        index on that date. Tickers never in the index, and dates before the first
+        snapshot, are False.
+        """
+        rows = self.dates.searchsorted(pd.DatetimeIndex(dates), side='right') - 1
+        columns = np.array([self._positions.get(t, -1) for t in tickers], dtype=np.intp)
+
+        mask = self.membership[np.maximum(rows, 0)][:, np.maximum(columns, 0)]
+        mask &= (rows >= 0)[:, None]
+        mask &= (columns >= 0)[None, :]
+        return mask
+
+    def member_frame(self, frame):
+        """
+        member_mask for the index and columns of a panel, as a bool DataFrame.
+        """
+        return pd.DataFrame(self.member_mask(frame.index, frame.columns), index=frame.index, columns=frame.columns)
+
+    def mask(self, frame, fill=0):
+        """
+        Replaces the cells of 'frame' where the ticker was not in the index with 'fill'.
+        Keeps the dtype of integer signal frames (int8 stays int8 for fill=0).
+        """
+        values = frame.to_numpy()
+        masked = np.where(self.member_mask(frame.index, frame.columns), values, np.asarray(fill, dtype=values.dtype))
+        return pd.DataFrame(masked, index=frame.index, columns=frame.columns)
+
+    def intervals(self):
+        """
+        Membership as an interval table: one row per continuous spell in the index,
+        with columns ticker, start and end (date of the first snapshot without the
+        ticker, NaT if it is still a member).
+        """
+        padded = np.zeros((len(self.dates) + 2, len(self.tickers)), dtype=np.int8)
+        padded[1:-1] = self.membership
+        changes = np.diff(padded, axis=0)
+
+        # Ordered by ticker then date, so the n-th entry pairs with the n-th exit
+        enter_tickers, enter_rows = np.nonzero(changes.T == 1)
+        _, exit_rows = np.nonzero(changes.T == -1)
+
+        # Exit row len(dates) means the ticker is still a member
+        bounds = self.dates.append(pd.DatetimeIndex([pd.NaT]))
+        return pd.DataFrame({
+            'ticker': np.asarray(self.tickers)[enter_tickers],
+            'start': self.dates[enter_rows],
+            'end': bounds[exit_rows],
+        })
+
+def load_universe_index(composition_csv="data/SPY_500_historical_stocks.csv"):
+    """
+    Returns the UniverseIndex for 'composition_csv', parsed once per process and reused
+    until the file changes.
+    """
+    path = os.path.abspath(composition_csv)
+    return _load_universe_index(path, os.path.getmtime(path))
+
+@lru_cache(maxsize=8)
+def _load_universe_index(path, mtime):
+    return UniverseIndex.from_csv(path)
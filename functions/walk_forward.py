@@ -0,0 +1,140 @@
+# walk_forward.py
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from functions.signals import generate_final_signal
+from functions.training import train_strategy_chooser
+
+def walk_forward_final_signal(features, label, momentum_signals, meanrev_signals, retrain_every=21,
+                              min_train=252, window='expanding', train_window=252, incremental=True,
+                              trees_per_update=10, max_trees=None, search_mode='grid', signal_mode='hard',
+                              n_jobs=-1, verbose=False):
+    """
+    Walk-forward version of train_strategy_chooser + generate_final_signal without look-ahead:
+    the chooser only ever predicts days after the labels it was trained on.
+
+    The history is cut into blocks of 'retrain_every' days. Before each block the model is
+    updated with every label dated before the block starts, then predicts only that block.
+    Days before the first block (less than 'min_train' labelled rows) get a 0 signal.
+
+    The first block runs the full hyperparameter search (train_strategy_chooser with
+    mode=search_mode). After that:
+      incremental=True  (RandomForest only): 'trees_per_update' new trees are added, fitted on
+                        the last 'train_window' labelled rows, so each update costs the same and
+                        the total fitting cost grows linearly with history length. Once the
+                        forest holds 'max_trees' trees the oldest are dropped; max_trees defaults
+                        to the searched size for window='rolling' and no limit for 'expanding'.
+      incremental=False: the searched model is refitted from scratch on all rows so far
+                        (window='expanding') or the last 'train_window' rows (window='rolling').
+
+    signal_mode is passed to generate_final_signal as 'mode' ('hard' or 'soft').
+
+    Returns (final_signals, retrain_log): the signals for every day, and a DataFrame with one
+    row per block (block_start, block_end, train_rows, last_train_date, n_trees, fit_seconds).
+    """
+    if window not in ('expanding', 'rolling'):
+        raise ValueError(f"Unknown window: {window!r}")
+
+    # Imported here, like in training.py, so importing the module stays cheap
+    from sklearn.base import clone
+    from sklearn.ensemble import RandomForestClassifier
+
+    dates = momentum_signals.index
+
+    # Features are forward-filled once over the whole history (causal, no look-ahead)
+    features = features.reindex(dates).ffill()
+
+    # Align features & label, drop NaN rows, as in train_strategy_chooser
+    X, y = features.align(label, join='inner', axis=0)
+    X = X.dropna()
+    y = y.loc[X.index]
+    if len(X) <= min_train:
+        raise ValueError(f"Not enough labelled rows for walk-forward training ({len(X)} <= {min_train}).")
+
+    # First block starts the day after the min_train-th labelled row
+    first_block = dates.searchsorted(X.index[min_train - 1], side='right')
+
+    # Hard choices keep the (int8) signal dtype, soft blends are float64
+    dtype = np.float64 if signal_mode == 'soft' else np.result_type(*momentum_signals.dtypes)
+    final_signals = pd.DataFrame(np.zeros(momentum_signals.shape, dtype=dtype), index=dates, columns=momentum_signals.columns)
+    log = []
+    clf = None
+    searched_trees = None
+    base_seed = None
+
+    for block_start in range(first_block, len(dates), retrain_every):
+        block = dates[block_start:block_start + retrain_every]
+
+        # Only labels dated before the block are known when it is traded
+        n_known = X.index.searchsorted(block[0], side='left')
+        X_known, y_known = X.iloc[:n_known], y.iloc[:n_known]
+
+        start = time.perf_counter()
+        if clf is None:
+            clf = train_strategy_chooser(X_known, y_known, n_jobs=n_jobs, verbose=verbose, mode=search_mode)
+            train_rows = n_known
+            if isinstance(clf, RandomForestClassifier):
+                searched_trees = clf.n_estimators
+                base_seed = clf.random_state
+                if max_trees is None and window == 'rolling':
+                    max_trees = searched_trees
+        else:
+            add_trees = incremental and searched_trees is not None
+            X_fit, y_fit = X_known, y_known
+            if window == 'rolling' or add_trees:
+                X_fit, y_fit = X_known.iloc[-train_window:], y_known.iloc[-train_window:]
+            train_rows = len(X_fit)
+
+            if add_trees:
+                clf = _add_trees(clf, X_fit, y_fit, trees_per_update, max_trees=max_trees,
+                                 seed=_update_seed(base_seed, block_start))
+            else:
+                clf = clone(clf).fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - start
+
+        final_signals.loc[block] = generate_final_signal(
+            clf, features.loc[block], momentum_signals.loc[block], meanrev_signals.loc[block], mode=signal_mode
+        )
+
+        log.append({
+            'block_start': block[0],
+            'block_end': block[-1],
+            'train_rows': train_rows,
+            'last_train_date': X_known.index[-1],
+            'n_trees': len(getattr(clf, 'estimators_', [])) or None,
+            'fit_seconds': fit_seconds,
+        })
+
+    if signal_mode == 'hard':
+        final_signals = final_signals.astype(momentum_signals.dtypes)
+    return final_signals, pd.DataFrame(log)
+
+def _update_seed(base_seed, step):
+    # Warm-start seeds new trees by their position in the forest, which repeats once the
+    # forest is capped at max_trees; an integer seed is re-derived for every update instead
+    if not isinstance(base_seed, (int, np.integer)):
+        return None
+    return int(np.random.SeedSequence([int(base_seed), step]).generate_state(1)[0])
+
+def _add_trees(rf, X, y, n_new, max_trees=None, seed=None):
+    """
+    Grows a fitted RandomForest by 'n_new' trees fitted on (X, y), keeping the existing trees.
+    If max_trees is set, the oldest trees are dropped to keep at most that many.
+    seed: random_state for this update's trees (None keeps the forest's own).
+    """
+    # New trees need both classes, otherwise the forest's classes would change
+    if np.unique(y).size < 2:
+        return rf
+
+    rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + n_new)
+    if seed is not None:
+        rf.set_params(random_state=seed)
+    rf.fit(X, y)
+
+    if max_trees is not None and len(rf.estimators_) > max_trees:
+        rf.estimators_ = rf.estimators_[-max_trees:]
+        rf.n_estimators = max_trees
+    return rf